@@ -2,9 +2,22 @@
 import gradio as gr
 from ui.audio_interface import create_combined_interface
 from ui.settings_interface import create_settings_interface
+from ui.batch_interface import create_batch_interface
 from ui.txt2img_interface import create_text2image_interface  # Добавлен новый импорт для text-to-image
+from classes.settings import Settings
+from classes.model_registry import whisper_registry
+from classes.voice import silero_pool
+from classes.workspace import workspaces
 
 def main():
+    # Прогреваем модель Whisper из настроек в фоне, чтобы первый запрос не ждал загрузки
+    if Settings().get_setting('whisper_warmup'):
+        whisper_registry.warm_up()
+    if Settings().get_setting('silero_preload'):
+        silero_pool.preload([Settings().get_setting('tts_language')])
+    # Фоновая очистка рабочих каталогов и старых результатов
+    workspaces.start_gc()
+
     with gr.Blocks() as demo:
         gr.Markdown("# Audio and Image Processing App")
 
@@ -12,6 +25,9 @@ def main():
             with gr.TabItem("Audio Processing", id="audio_tab"):
                 audio_interface = create_combined_interface()
 
+            with gr.TabItem("Batch Jobs", id="batch_tab"):
+                batch_interface = create_batch_interface()
+
             with gr.TabItem("Text to Image", id="text2image_tab"):  # Добавлена новая вкладка
                 text2image_interface = create_text2image_interface()
             
@@ -27,6 +43,8 @@ def main():
 
         tabs.select(on_tab_select, None, None)
 
+        # Несколько пользователей обрабатываются параллельно, длинная обработка не блокирует остальных
+        demo.queue(default_concurrency_limit=Settings().get_setting('ui_concurrency'))
         demo.launch(share=False, server_name="0.0.0.0", server_port=7861)
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+# benchmarks/chunking.py
+# Сколько запросов к LLM уходит на час аудио при прежнем делении транскрипта
+# по 1000 символов и при делении по бюджету токенов каждого провайдера.
+#
+#   python benchmarks/chunking.py transcripts/lecture_ru.txt:95 transcripts/talk_en.txt
+#   python benchmarks/chunking.py --overlap 1 --system-prompt prompts/editor.txt
+#
+# Длительность записи задаётся после двоеточия в минутах; без неё оценивается
+# по числу слов. Без файлов используются синтетические часовые транскрипты.
+import os
+import re
+import sys
+import argparse
+import importlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classes.chunker import count_tokens
+from classes.text import Text, PROMPT_OVERHEAD_TOKENS
+from llm.providers.registry import PROVIDERS
+
+# Темп речи, слов в минуту, для оценки длительности
+WORDS_PER_MINUTE = {'ru': 110, 'en': 150}
+LEGACY_CHUNK_SIZE = 1000
+
+SAMPLE_TEXT = {
+    'ru': "Итак, давайте начнём с того, на чём мы остановились в прошлый раз. Модель обрабатывает запись "
+          "окнами по тридцать секунд, и на границах окон иногда теряются слова. Т. е. нам нужно склеивать "
+          "сегменты аккуратно! Почему это важно? Потому что ошибки накапливаются, и к концу часа текст "
+          "становится заметно хуже, чем в начале.",
+    'en': "So let's pick up where we left off last time. The model processes the recording in thirty second "
+          "windows, and words are sometimes lost at window boundaries. That is, we need to stitch segments "
+          "carefully! Why does it matter? Because errors accumulate, and by the end of the hour the text is "
+          "noticeably worse than at the beginning.",
+}
+
+
+def detect_language(text):
+    cyrillic = len(re.findall(r'[Ѐ-ӿ]', text))
+    latin = len(re.findall(r'[A-Za-z]', text))
+    return 'ru' if cyrillic > latin else 'en'
+
+
+def load_transcripts(specs):
+    if not specs:
+        for language, sample in SAMPLE_TEXT.items():
+            words = len(sample.split())
+            repeats = WORDS_PER_MINUTE[language] * 60 // words + 1
+            yield f"synthetic-{language}", ' '.join([sample] * repeats), 60.0
+        return
+    for spec in specs:
+        path, _, minutes = spec.partition(':')
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        if not minutes:
+            minutes = len(text.split()) / WORDS_PER_MINUTE[detect_language(text)]
+        yield os.path.basename(path), text, float(minutes)
+
+
+def make_text(provider, overlap):
+    # Модуль провайдера импортируется напрямую: для подсчёта чанков SDK не нужен
+    text = Text(provider)
+    text._llm = importlib.import_module(PROVIDERS[provider][0]).provider
+    text.overlap_sentences = overlap
+    return text
+
+
+def measure(text, transcript, system_prompt, chunk_size=None):
+    llm = text.llm
+    encoding = llm.tokenizer_encoding
+    if chunk_size:
+        chunks = text.create_chunks(text.split_into_sentences(transcript), chunk_size)
+        messages = chunks
+    else:
+        chunks = text.plan_chunks(transcript, system_prompt=system_prompt)
+        messages = [text.chunk_message(chunk) for chunk in chunks]
+    prompt_tokens = count_tokens(llm.prompt_text(system_prompt), encoding) + PROMPT_OVERHEAD_TOKENS
+    sizes = [count_tokens(message, encoding) for message in messages]
+    return {
+        'calls': len(messages),
+        'mean_tokens': sum(sizes) / max(1, len(sizes)),
+        'max_tokens': max(sizes, default=0),
+        'input_tokens': sum(sizes) + prompt_tokens * len(messages),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM calls per hour of audio for transcript chunking strategies")
+    parser.add_argument('transcripts', nargs='*', help="transcript files, optionally path:minutes")
+    parser.add_argument('--providers', nargs='+', default=['ollama', 'groq', 'openAI', 'together'])
+    parser.add_argument('--overlap', type=int, default=0, help="sentences of preceding context per chunk")
+    parser.add_argument('--system-prompt', help="file with the system prompt sent with every chunk")
+    args = parser.parse_args()
+
+    system_prompt = None
+    if args.system_prompt:
+        with open(args.system_prompt, 'r', encoding='utf-8') as f:
+            system_prompt = f.read()
+
+    print(f"{'transcript':<24} {'strategy':<28} {'calls/h':>8} {'tokens/chunk':>13} {'max':>6} {'input tok/h':>12}")
+    for name, transcript, minutes in load_transcripts(args.transcripts):
+        hours = minutes / 60
+        rows = [(f"chars-{LEGACY_CHUNK_SIZE} ({args.providers[0]})",
+                 measure(make_text(args.providers[0], 0), transcript, system_prompt, LEGACY_CHUNK_SIZE))]
+        for provider in args.providers:
+            text = make_text(provider, args.overlap)
+            budget_name = f"tokens ({provider}, {text.llm.context_window()})"
+            rows.append((budget_name, measure(text, transcript, system_prompt)))
+        for strategy, result in rows:
+            print(f"{name:<24} {strategy:<28} {result['calls'] / hours:8.1f} {result['mean_tokens']:13.0f} "
+                  f"{result['max_tokens']:6d} {result['input_tokens'] / hours:12.0f}")
+
+
+if __name__ == '__main__':
+    main()
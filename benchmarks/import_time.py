@@ -0,0 +1,103 @@
+# benchmarks/import_time.py
+# Время импорта модулей приложения. Каждый модуль импортируется в отдельном
+# чистом интерпретаторе с -X importtime; для него выводится суммарное время,
+# самые дорогие зависимости и тяжёлые пакеты, попавшие в импорт.
+#
+#   python benchmarks/import_time.py
+#   python benchmarks/import_time.py classes.audio --top 5 --repeat 3
+#   python benchmarks/import_time.py --json > import_time.json
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    'app',
+    'ui.audio_interface',
+    'ui.batch_interface',
+    'ui.settings_interface',
+    'ui.txt2img_interface',
+    'classes.audio',
+    'classes.txt2img',
+    'modules.transcription_processor',
+    'llm.providers.registry',
+]
+
+# Пакеты, которые не должны загружаться при старте приложения
+HEAVY_PACKAGES = ['torch', 'whisper', 'resemble_enhance', 'groq', 'openai', 'together', 'stable_diffusion_cpp']
+
+
+def measure(code):
+    # Возвращает (список (пакет, собственное, суммарное время в мкс, уровень), ошибка)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), level))
+    error = None
+    if result.returncode != 0:
+        error = (result.stderr.strip().splitlines() or ['unknown error'])[-1]
+    return entries, error
+
+
+def summarize(module, repeat, top, baseline):
+    # baseline — модули, которые интерпретатор импортирует сам при запуске
+    parents = {'.'.join(module.split('.')[:i]) for i in range(1, module.count('.') + 2)}
+    best = None
+    for _ in range(repeat):
+        entries, error = measure(f"import {module}")
+        if error:
+            return {'module': module, 'error': error}
+        entries = [entry for entry in entries if entry[0] not in baseline]
+        total = sum(cumulative for _, _, cumulative, level in entries if level == 0)
+        if best is None or total < best[0]:
+            best = (total, entries)
+    total, entries = best
+    imported = {name.split('.')[0] for name, _, _, _ in entries}
+    dependencies = sorted(
+        ((cumulative, name) for name, _, cumulative, level in entries if level <= 1 and name not in parents),
+        reverse=True
+    )
+    return {
+        'module': module,
+        'total_ms': round(total / 1000, 1),
+        'top': [{'module': name, 'ms': round(cumulative / 1000, 1)} for cumulative, name in dependencies[:top]],
+        'heavy': [package for package in HEAVY_PACKAGES if package in imported],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of application modules")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--repeat', type=int, default=1, help="runs per module, the fastest is reported")
+    parser.add_argument('--top', type=int, default=3, help="most expensive top-level imports to show")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    baseline = {name for name, _, _, _ in measure('pass')[0]}
+    results = [summarize(module, max(1, args.repeat), args.top, baseline) for module in args.modules]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    width = max(len(module) for module in args.modules)
+    for result in results:
+        if 'error' in result:
+            print(f"{result['module']:<{width}}  FAILED: {result['error']}")
+            continue
+        top = ', '.join(f"{entry['module']} {entry['ms']:.0f}ms" for entry in result['top'])
+        heavy = f"  heavy: {', '.join(result['heavy'])}" if result['heavy'] else ""
+        print(f"{result['module']:<{width}}  {result['total_ms']:8.1f} ms  [{top}]{heavy}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,143 +1,193 @@
 # classes/audio.py
 import subprocess
 import os
-from datetime import datetime
+import copy
+import hashlib
 import soundfile as sf
 import shutil
 import numpy as np
-import whisper
 from classes.text import Text
 import json
-from llm.providers.together import process_chunk as together_process_chunk
-from llm.providers.groq import improve_text as groq_process_chunk
-from llm.providers.openAI import improve_text as openAI_process_chunk
+from llm.providers.registry import PROVIDERS, ProviderUnavailable
 from classes.settings import Settings
+from classes.model_registry import whisper_registry
+from classes.enhancer import enhancer
+from classes.workspace import workspaces
+from classes import dsp
 #settings = Settings()
+
+# Параметры входа Whisper (whisper.audio): константы, чтобы не импортировать whisper и torch заранее
+WHISPER_SAMPLE_RATE = 16000
+WHISPER_HOP_LENGTH = 160
+
 class Audio:
+    CODEC_ARGS = {
+        'wav': ['-acodec', 'pcm_s16le'],
+        'mp3': ['-acodec', 'libmp3lame', '-b:a', '192k'],
+        'ogg': ['-acodec', 'libvorbis', '-q:a', '4'],
+        'flac': ['-acodec', 'flac', '-compression_level', '5'],
+        'aac': ['-acodec', 'aac', '-b:a', '192k'],
+        'm4a': ['-acodec', 'aac', '-b:a', '192k', '-f', 'mp4'],
+    }
+
     def __init__(self, input_audio):
         self.settings = Settings()
-        self.temp_dir = "/tmp/resemble-enhance"
-        self.temp_file = self._create_temp_file(input_audio)
+        # Уникальный каталог запроса; небольшие записи попадают на tmpfs
+        self.work_dir = workspaces.create('audio', expected_mb=self._estimate_scratch_mb(input_audio))
+        # Сигнал из Gradio остаётся в памяти (signal = (частота, массив)); temp_file
+        # появляется только когда файл действительно нужен, и None, пока текущее
+        # состояние есть лишь в памяти
+        self.signal = self._load_signal(input_audio)
+        self.temp_file = None
         self.sample_rate = input_audio[0]
-        self.channels = 1 if input_audio[1].ndim == 1 else 2
+        self.channels = 1 if input_audio[1].ndim == 1 else input_audio[1].shape[1]
         self.duration = input_audio[1].shape[0] / self.sample_rate
+        # Соответствие времени текущего сигнала времени исходной записи после вырезания пауз
+        self.time_map = dsp.TimeMap()
+        # Отложенные ffmpeg-фильтры, выполняются одним проходом в _render()
+        self.plan = []
+        # history — все операции, применённые к исходному сигналу; checkpoints хранит
+        # промежуточные состояния по (history, формат) и общий для форков объекта.
+        # Формат None — состояние в памяти.
+        self.history = ()
+        self.checkpoints = {}
+        self._save_checkpoint(None)
+
+    def fork(self):
+        # Новый конвейер над тем же исходным сигналом, переиспользующий промежуточные результаты
+        audio = copy.copy(self)
+        audio.plan = []
+        audio._restore_checkpoint((), None)
+        return audio
+
+    def _add_to_plan(self, operation):
+        self.plan.append(operation)
+        self.history += (operation,)
+
+    def _save_checkpoint(self, output_format):
+        self.checkpoints[(self.history, output_format)] = (self.temp_file, self.sample_rate, self.channels, self.signal, self.time_map)
+
+    def _restore_checkpoint(self, history, output_format='wav'):
+        checkpoint = self.checkpoints.get((history, output_format))
+        if checkpoint is None:
+            return False
+        if output_format is not None and not os.path.exists(checkpoint[0]):
+            return False
+        self.temp_file, self.sample_rate, self.channels, self.signal, self.time_map = checkpoint
+        self.history = history
+        return True
+
+    def _restore_longest_prefix(self, formats=(None,)):
+        # Другая ветка могла уже выполнить начало плана: продолжаем с самого
+        # длинного общего состояния и выполняем только оставшиеся операции.
+        # Частота и каналы — целевые значения всего плана, они не откатываются.
+        base = len(self.history) - len(self.plan)
+        history, sample_rate, channels = self.history, self.sample_rate, self.channels
+        for length in range(len(history), base, -1):
+            for output_format in formats:
+                if self._restore_checkpoint(history[:length], output_format):
+                    self.plan = list(history[length:])
+                    self.history, self.sample_rate, self.channels = history, sample_rate, channels
+                    return True
+        return False
+
+    @staticmethod
+    def _estimate_scratch_mb(input_audio):
+        # Промежуточные WAV и результаты обработки — порядка нескольких копий входа
+        if isinstance(input_audio, tuple):
+            return input_audio[1].nbytes * 4 / (1024 * 1024)
+        return None
 
-    def _create_temp_file(self, input_audio):
+    def _load_signal(self, input_audio):
         if isinstance(input_audio, tuple):
             rate, data = input_audio
-            temp_dir = f"{self.temp_dir}/{datetime.now().strftime('%d%m%y_%H%M%S')}"
-            os.makedirs(temp_dir, exist_ok=True)
-            temp_file_path = os.path.join(temp_dir, "input_audio.wav")
-            sf.write(temp_file_path, data, rate)
-            return temp_file_path
+            return rate, dsp.to_float(data)
         else:
             print(f"Unknown file format: {str(input_audio)}")
 
+    def _path(self, history, output_format):
+        # Имя зависит от истории операций, чтобы ветки-форки не перезаписывали файлы друг друга
+        os.makedirs(self.work_dir, exist_ok=True)
+        if not history:
+            return os.path.join(self.work_dir, f"input_audio.{output_format}")
+        history_digest = hashlib.sha1(repr(history).encode()).hexdigest()[:8]
+        return os.path.join(self.work_dir, f"input_audio_processed_{history_digest}.{output_format}")
+
     def change_sample_rate(self, new_sample_rate):
-        output_file = f"{self.temp_file[:-4]}_{new_sample_rate}.wav"
-        subprocess.run(["ffmpeg", "-i", self.temp_file, "-ar", str(new_sample_rate), output_file])
-        self.temp_file = output_file
+        new_sample_rate = int(new_sample_rate)
+        self._add_to_plan(f"aresample={new_sample_rate}")
         self.sample_rate = new_sample_rate
 
     def stereo_to_mono(self):
-        if self.channels == 2:
-            output_file = f"{self.temp_file[:-4]}_mono.wav"
-            subprocess.run(["ffmpeg", "-i", self.temp_file, "-ac", "1", output_file])
-            self.temp_file = output_file
+        if self.channels > 1:
+            self._add_to_plan("aformat=channel_layouts=mono")
             self.channels = 1
 
     def apply_filter(self, filter_str):
-        output_file = f"{self.temp_file[:-4]}_filtered.wav"
-        subprocess.run(["ffmpeg", "-i", self.temp_file, "-af", filter_str, output_file])
-        self.temp_file = output_file
+        self._add_to_plan(filter_str)
 
     def remove_silence(self, silence_duration=1, silence_threshold=-50, output_callback=None):
-        output_file = f"{self.temp_file[:-4]}_silenced.wav"
-        result = self._remove_silence(self.temp_file, output_file, silence_duration, silence_threshold)
-        if result != self.temp_file:
-            self.temp_file = result
-        if output_callback:
-            output_callback("Silence removal completed.\n")
-
-    def denoise_audio(self, lambd, tau, solver, nfe, output_callback):
-        input_file = os.path.abspath(self.temp_file)
-        output_callback(f"Input file: {input_file}\n")
-        output_callback(f"File exists: {os.path.exists(input_file)}\n")
-        output_callback(f"File size: {os.path.getsize(input_file)} bytes\n")
-
-        # Создаем директорию для входного файла
-        input_dir = os.path.join(os.path.dirname(input_file), "denoise_input")
-        os.makedirs(input_dir, exist_ok=True)
-
-        # Копируем входной файл в новую директорию
-        input_file_copy = os.path.join(input_dir, os.path.basename(input_file))
-        shutil.copy2(input_file, input_file_copy)
-        output_callback(f"Copied input file to: {input_file_copy}\n")
-
-        # Создаем директорию для выходного файла
-        output_dir = os.path.join(os.path.dirname(input_file), "denoise_output")
-        os.makedirs(output_dir, exist_ok=True)
-
-        resemble_enhance_path = shutil.which("resemble-enhance")
-        if resemble_enhance_path is None:
-            resemble_enhance_path = self.settings.get_setting('resemble_enhance_path')
-
-        output_callback(f"resemble-enhance path: {resemble_enhance_path}\n")
-
-        if not resemble_enhance_path:
-            output_callback("Error: resemble-enhance not found in system path or settings.\n")
+        # Паузы вырезаются детектором речи в памяти, а не ffmpeg silenceremove,
+        # чтобы сохранить карту времени для таймкодов транскрипции
+        threshold = self._silence_threshold(silence_threshold)
+        if threshold is None:
+            return
+        stage = ('silence', float(silence_duration), threshold)
+        self._load_signal_from_plan()
+        if self._restore_checkpoint(self.history + (stage,), None):
+            if output_callback:
+                output_callback("Reusing silence-trimmed audio from a previous stage.\n")
             return
 
-        command_denoise = [
-            resemble_enhance_path,
-            "--denoise_only",
-            input_dir,
-            output_dir,
-            "--lambd", str(lambd),
-            "--tau", str(tau),
-            "--solver", solver,
-            "--nfe", str(nfe)
-        ]
+        rate, samples = self.signal
+        trimmed, segments = dsp.remove_silence(samples, rate, float(silence_duration), threshold)
+        self.signal = (rate, trimmed)
+        self.temp_file = None
+        self.time_map = self.time_map.cut(segments / rate)
+        self.history += (stage,)
+        self._save_checkpoint(None)
+        if output_callback:
+            output_callback(f"Silence removed: kept {len(segments)} speech segments, "
+                            f"{len(trimmed) / rate:.1f} of {len(samples) / rate:.1f} seconds.\n")
 
-        output_callback(f"Running command: {' '.join(command_denoise)}\n")
+    def _load_signal_from_plan(self):
+        # Выполняет накопленный план и держит результат в памяти
+        if self._run_plan_in_memory():
+            return
+        self._render('wav')
+        samples, rate = sf.read(self.temp_file, dtype='float32', always_2d=True)
+        self.signal = (rate, samples)
+        self._save_checkpoint(None)
 
-        try:
-            output_callback("Starting denoise process...\n")
-            result = subprocess.run(command_denoise, check=True, capture_output=True, text=True)
-            output_callback(f"Command output:\n{result.stdout}\n")
-            output_callback(f"Command errors:\n{result.stderr}\n")
-            
-            # Находим выходной файл
-            output_files = [f for f in os.listdir(output_dir) if f.endswith('.wav')]
-            if output_files:
-                output_file = os.path.join(output_dir, output_files[0])
-                output_callback(f"Output file: {output_file}\n")
-                output_callback(f"Output file size: {os.path.getsize(output_file)} bytes\n")
-                if os.path.getsize(output_file) > 0:
-                    self.temp_file = output_file
-                    output_callback("Denoise process completed successfully.\n")
-                else:
-                    output_callback("Error: Output file is empty.\n")
-            else:
-                output_callback("Error: No output file was created.\n")
-        except subprocess.CalledProcessError as e:
-            output_callback(f"Error during denoise process: {e.stderr}\n")
-        except Exception as e:
-            output_callback(f"Unexpected error: {str(e)}\n")
+    def denoise_audio(self, lambd, tau, solver, nfe, output_callback):
+        self._resemble_enhance(('denoise', lambd, tau, solver, nfe), output_callback)
 
-        # Очистка временных директорий
-        shutil.rmtree(input_dir)
-        if not os.listdir(output_dir):
-            shutil.rmtree(output_dir)
-            
     def enhance_audio(self, lambd, tau, solver, nfe, output_callback):
+        self._resemble_enhance(('enhance', lambd, tau, solver, nfe), output_callback)
+
+    def _resemble_enhance(self, stage, output_callback):
+        # Шумоподавление и улучшение: сначала движок в процессе, при его
+        # недоступности или ошибке — CLI resemble-enhance
+        if not self._run_plan_in_memory():
+            self._render('wav')
+        operation = stage[0]
+        if self._restore_checkpoint(self.history + (stage,), None) or self._restore_checkpoint(self.history + (stage,)):
+            output_callback(f"Reusing {operation}d audio from a previous stage.\n")
+            return
+        if self.settings.get_setting('enhancer_in_process') and self._enhance_in_process(stage, output_callback):
+            return
+        self._enhance_with_cli(stage, output_callback)
+
+    def _enhance_with_cli(self, stage, output_callback):
+        operation, lambd, tau, solver, nfe = stage
+        self._render('wav')
         input_file = os.path.abspath(self.temp_file)
         output_callback(f"Input file: {input_file}\n")
         output_callback(f"File exists: {os.path.exists(input_file)}\n")
         output_callback(f"File size: {os.path.getsize(input_file)} bytes\n")
 
         # Создаем директорию для входного файла
-        input_dir = os.path.join(os.path.dirname(input_file), "enhance_input")
+        input_dir = os.path.join(os.path.dirname(input_file), f"{operation}_input")
         os.makedirs(input_dir, exist_ok=True)
 
         # Копируем входной файл в новую директорию
@@ -146,14 +196,12 @@ class Audio:
         output_callback(f"Copied input file to: {input_file_copy}\n")
 
         # Создаем директорию для выходного файла
-        output_dir = os.path.join(os.path.dirname(input_file), "enhance_output")
+        output_dir = os.path.join(os.path.dirname(input_file), f"{operation}_output")
         os.makedirs(output_dir, exist_ok=True)
 
         resemble_enhance_path = shutil.which("resemble-enhance")
-        output_callback(f"resemble-enhance path from shutil: {shutil.which('resemble-enhance')}\n")
         if resemble_enhance_path is None:
             resemble_enhance_path = self.settings.get_setting('resemble_enhance_path')
-            output_callback(f"resemble-enhance path from settings: {self.settings.get_setting('resemble_enhance_path')}\n")
 
         output_callback(f"resemble-enhance path: {resemble_enhance_path}\n")
 
@@ -161,8 +209,9 @@ class Audio:
             output_callback("Error: resemble-enhance not found in system path or settings.\n")
             return
 
-        command_enhance = [
+        command = [
             resemble_enhance_path,
+            *(["--denoise_only"] if operation == 'denoise' else []),
             input_dir,
             output_dir,
             "--lambd", str(lambd),
@@ -171,29 +220,36 @@ class Audio:
             "--nfe", str(nfe)
         ]
 
-        output_callback(f"Running command: {' '.join(command_enhance)}\n")
+        output_callback(f"Running command: {' '.join(command)}\n")
 
         try:
-            output_callback("Starting enhance process...\n")
-            result = subprocess.run(command_enhance, check=True, capture_output=True, text=True)
+            output_callback(f"Starting {operation} process...\n")
+            result = subprocess.run(command, check=True, capture_output=True, text=True)
             output_callback(f"Command output:\n{result.stdout}\n")
             output_callback(f"Command errors:\n{result.stderr}\n")
-            
+
             # Находим выходной файл
-            output_files = [f for f in os.listdir(output_dir) if f.endswith('.wav')]
+            # В выходной папке могут лежать результаты других веток обработки
+            output_files = [f for f in os.listdir(output_dir) if f == os.path.basename(input_file)]
             if output_files:
                 output_file = os.path.join(output_dir, output_files[0])
                 output_callback(f"Output file: {output_file}\n")
                 output_callback(f"Output file size: {os.path.getsize(output_file)} bytes\n")
                 if os.path.getsize(output_file) > 0:
                     self.temp_file = output_file
-                    output_callback("Enhance process completed successfully.\n")
+                    self.signal = None
+                    output_info = sf.info(output_file)
+                    self.sample_rate = output_info.samplerate
+                    self.channels = output_info.channels
+                    self.history += (stage,)
+                    self._save_checkpoint('wav')
+                    output_callback(f"{operation.capitalize()} process completed successfully.\n")
                 else:
                     output_callback("Error: Output file is empty.\n")
             else:
                 output_callback("Error: No output file was created.\n")
         except subprocess.CalledProcessError as e:
-            output_callback(f"Error during enhance process: {e.stderr}\n")
+            output_callback(f"Error during {operation} process: {e.stderr}\n")
         except Exception as e:
             output_callback(f"Unexpected error: {str(e)}\n")
 
@@ -205,55 +261,167 @@ class Audio:
                 shutil.rmtree(output_dir)
         except Exception as e:
             output_callback(f"Error during cleanup: {str(e)}\n")
-            
-            
-    def _remove_silence(self, input_file, output_file, silence_duration=1, silence_threshold=-50):
-        if not os.path.exists(input_file):
-            print("Ошибка: входной файл не существует")
-            return input_file
-        if os.path.getsize(input_file) == 0:
-            print("Ошибка: входной файл пустой")
-            return input_file
-
-        output_dir = os.path.dirname(output_file)
-        if not os.access(output_dir, os.W_OK):
-            print(f"Ошибка: нет прав на запись в директорию {output_dir}")
-            return input_file
 
+    def _enhance_in_process(self, stage, output_callback):
+        # Модели уже загружены в процессе; False — движок недоступен или упал и нужен CLI
+        operation, lambd, tau, solver, nfe = stage
+        window_seconds = self.settings.get_setting('enhancer_window_seconds')
+        if self.signal is not None:
+            duration = len(self.signal[1]) / self.signal[0]
+        else:
+            duration = sf.info(self.temp_file).duration
+        try:
+            if self.settings.get_setting('enhancer_windowed') and duration > window_seconds:
+                # Длинные записи обрабатываются окнами: память не зависит от длины входа
+                def report(done, total):
+                    output_callback(f"{operation.capitalize()}: window {done}/{total} processed.\n")
+
+                self._render('wav')
+                output_file = self._path(self.history + (stage,), 'wav')
+                output_rate = enhancer.process_windowed(
+                    self.temp_file, output_file, operation, (nfe, solver, lambd, tau),
+                    window_seconds=window_seconds, progress_callback=report
+                )
+                self.temp_file = output_file
+                self.signal = None
+            else:
+                if self.signal is not None:
+                    sample_rate, samples = self.signal
+                else:
+                    samples, sample_rate = sf.read(self.temp_file, dtype='float32')
+                output, output_rate = enhancer.process(operation, samples, sample_rate, (nfe, solver, lambd, tau))
+                self.signal = (output_rate, dsp.to_float(output))
+                self.temp_file = None
+        except ImportError:
+            output_callback("resemble-enhance is not importable, falling back to the CLI.\n")
+            return False
+        except Exception as e:
+            output_callback(f"Error during in-process {operation}: {str(e)}; falling back to the CLI.\n")
+            return False
+
+        self.sample_rate = output_rate
+        self.channels = 1
+        self.history += (stage,)
+        self._save_checkpoint('wav' if self.signal is None else None)
+        output_callback(f"{operation.capitalize()} process completed successfully.\n")
+        return True
+
+    def _silence_threshold(self, silence_threshold=-50):
         try:
             if isinstance(silence_threshold, str):
                 threshold_db = float(silence_threshold.replace('dB', '').strip())
             else:
                 threshold_db = float(silence_threshold)
-            threshold_amplitude = 10 ** (threshold_db / 20)
         except ValueError:
             print(f"Ошибка: неверный формат порога тишины: {silence_threshold}")
-            return input_file
+            return None
+        return 10 ** (threshold_db / 20)
 
-        command = [
+    @staticmethod
+    def _numpy_operation(filter_str):
+        # Фильтры, которые умеет выполнять backend в памяти; None — нужен ffmpeg
+        name, _, args = filter_str.partition('=')
+        try:
+            if name == 'aresample':
+                new_rate = int(args)
+                return lambda rate, samples: (new_rate, dsp.resample(samples, rate, new_rate))
+            if filter_str == 'aformat=channel_layouts=mono':
+                return lambda rate, samples: (rate, dsp.to_mono(samples))
+            if name == 'volume':
+                factor = 10 ** (float(args[:-2]) / 20) if args.endswith('dB') else float(args)
+                return lambda rate, samples: (rate, dsp.gain(samples, factor))
+        except ValueError:
+            pass
+        return None
+
+    def _run_plan_in_memory(self):
+        # Выполняет план над сигналом в памяти без запуска ffmpeg и записи на диск
+        if self._restore_checkpoint(self.history, None):
+            self.plan = []
+            return True
+        self._restore_longest_prefix()
+        if self.signal is None:
+            return False
+        operations = [self._numpy_operation(filter_str) for filter_str in self.plan]
+        if None in operations:
+            return False
+        rate, samples = self.signal
+        applied = len(self.history) - len(self.plan)
+        for index, operation in enumerate(operations, 1):
+            rate, samples = operation(rate, samples)
+            # Промежуточные состояния тоже сохраняются: форк с тем же началом
+            # плана продолжит с них, а не с исходного сигнала
+            self.checkpoints[(self.history[:applied + index], None)] = (None, rate, samples.shape[1], (rate, samples), self.time_map)
+        self.signal = (rate, samples)
+        if self.plan:
+            self.temp_file = None
+        self.plan = []
+        self._save_checkpoint(None)
+        return True
+
+    def _encode(self, output_file, output_format):
+        # Единственная запись на диск в in-memory пути: WAV пишется напрямую,
+        # остальные форматы кодирует ffmpeg из stdin
+        rate, samples = self.signal
+        if output_format == 'wav':
+            sf.write(output_file, samples, rate, subtype='PCM_16')
+            return
+        ffmpeg_command = [
+            'ffmpeg', '-f', 'f32le', '-ar', str(rate), '-ac', str(samples.shape[1]), '-i', 'pipe:0', '-y'
+        ]
+        ffmpeg_command.extend(self.CODEC_ARGS[output_format])
+        ffmpeg_command.append(output_file)
+        subprocess.run(ffmpeg_command, input=np.ascontiguousarray(samples, dtype='<f4').tobytes(),
+                       check=True, capture_output=True)
+
+    def _render(self, output_format='wav'):
+        # Все накопленные операции выполняются одним проходом с одним кодированием:
+        # в памяти, если backend NumPy поддерживает весь план, иначе через ffmpeg
+        if not self.plan and self.temp_file and os.path.splitext(self.temp_file)[1][1:].lower() == output_format.lower():
+            return self.temp_file
+        if self._restore_checkpoint(self.history, output_format):
+            self.plan = []
+            return self.temp_file
+
+        output_file = self._path(self.history, output_format)
+        if self._run_plan_in_memory():
+            try:
+                self._encode(output_file, output_format)
+                self.temp_file = output_file
+                self._save_checkpoint(output_format)
+            except subprocess.CalledProcessError as e:
+                print(f"Error during audio rendering: {e.stderr}")
+            return self.temp_file
+
+        self._restore_longest_prefix((None, 'wav'))
+        if self.temp_file is None:
+            # Состояние до плана есть только в памяти: сохраняем его как вход для ffmpeg
+            self.temp_file = self._path(self.history[:len(self.history) - len(self.plan)], 'wav')
+            sf.write(self.temp_file, self.signal[1], self.signal[0], subtype='PCM_16')
+
+        ffmpeg_command = [
             'ffmpeg',
-            '-i', input_file,
-            '-af', f'silenceremove=stop_periods=-1:stop_duration={silence_duration}:stop_threshold={threshold_amplitude}',
-            '-c:a', 'pcm_s16le',
-            output_file
+            '-i', self.temp_file,
+            '-y'  # Overwrite output file if it exists
         ]
+        if self.plan:
+            ffmpeg_command.extend(['-af', ','.join(self.plan)])
+        ffmpeg_command.extend(['-ar', str(self.sample_rate), '-ac', str(self.channels)])
+        ffmpeg_command.extend(self.CODEC_ARGS[output_format])
+        ffmpeg_command.append(output_file)
 
+        self.plan = []
         try:
-            result = subprocess.run(command, check=True, capture_output=True, text=True)
-            print(f"FFmpeg stdout: {result.stdout}")
-            print(f"FFmpeg stderr: {result.stderr}")
-
+            subprocess.run(ffmpeg_command, check=True, capture_output=True, text=True)
             if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
-                print(f"Тишина удалена, файл сохранен как {output_file}")
-                return output_file
+                self.temp_file = output_file
+                self.signal = None
+                self._save_checkpoint(output_format)
             else:
-                print("Ошибка: выходной файл не создан или пустой")
-                return input_file
-
+                print(f"Error: Output file {output_file} was not created or is empty.")
         except subprocess.CalledProcessError as e:
-            print(f"FFmpeg error: {e.stderr}")
-            return input_file
-
+            print(f"Error during audio rendering: {e.stderr}")
+        return self.temp_file
 
     def _run_process(self, command, output_callback):
         process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
@@ -263,22 +431,116 @@ class Audio:
         process.wait()
         
     def get_audio_data(self):
+        if self._run_plan_in_memory():
+            rate, samples = self.signal
+            return (samples[:, 0] if samples.shape[1] == 1 else samples), rate
+        self._render('wav')
         data, rate = sf.read(self.temp_file)
         return data, rate
+
+    def _whisper_samples(self):
+        # Whisper принимает моно float32 16 кГц: из памяти готовим его без файла и ffmpeg
+        if self._run_plan_in_memory():
+            rate, samples = self.signal
+            return np.ascontiguousarray(dsp.resample(dsp.to_mono(samples), rate, WHISPER_SAMPLE_RATE)[:, 0])
+        self._render('wav')
+        import whisper
+        return whisper.load_audio(self.temp_file)
     
-    def transcribe(self, model_language, model_size, language):
-        model_name = f"{model_language}.{model_size}" if model_language == "english-only" else model_size
-        model = whisper.load_model(model_name)
-        
+    def transcribe(self, model_language, model_size, language, document_id=None):
         transcribe_options = {}
         if language != "original":
             transcribe_options["task"] = "translate"
         
-        result = model.transcribe(self.temp_file, **transcribe_options)
+        samples = self._whisper_samples()
+        # Экземпляр модели общий для запросов: декодируем под его локом
+        with whisper_registry.use(model_language, model_size) as model:
+            result = model.transcribe(samples, **transcribe_options)
         text = result["text"]
-        PROVIDER  = self.settings.get_setting('provider')
+        edited_text = self.edit_transcript(text, self.settings, document_id)
+        timestamp_view, timestamp_table, json_output, json_raw = self.format_transcript(result, self.time_map)
+
+        return text, edited_text, timestamp_view, timestamp_table, json_output, json_raw
+
+    def transcribe_stream(self, model_language, model_size, language, window_seconds=30):
+        # Декодируем аудио окнами, разрезанными по паузам, и после каждого окна
+        # отдаём список его сегментов с глобальными таймкодами. Модель занята запросом
+        # до конца записи; лок снимается и при досрочном закрытии генератора.
+        transcribe_options = {}
+        if language != "original":
+            transcribe_options["task"] = "translate"
+
+        samples = self._whisper_samples()
+        sample_rate = WHISPER_SAMPLE_RATE
+        segment_id = 0
+        previous_text = ""
+        # Язык определяется по первому окну с речью и передаётся остальным: иначе
+        # Whisper заново определяет его в каждом окне, тратя лишний проход
+        # декодера, и на тихом или музыкальном окне может сменить язык записи
+        source_language = None
+        with whisper_registry.use(model_language, model_size) as model:
+            for start, end in self._split_on_silence(samples, sample_rate, window_seconds):
+                offset = start / sample_rate
+                result = model.transcribe(samples[start:end], initial_prompt=previous_text[-200:] or None,
+                                          language=source_language, **transcribe_options)
+                if source_language is None and result['text'].strip():
+                    source_language = result.get('language')
+                for segment in result['segments']:
+                    segment['id'] = segment_id
+                    segment['start'] += offset
+                    segment['end'] += offset
+                    segment['seek'] += start // WHISPER_HOP_LENGTH
+                    segment_id += 1
+                yield result['segments']
+                previous_text = result['text']
+
+    def _split_on_silence(self, samples, sample_rate, window_seconds, frame_ms=30):
+        window = int(window_seconds * sample_rate)
+        if len(samples) <= window:
+            return [(0, len(samples))]
+
+        # Энергия по кадрам считается одним векторным проходом
+        frame = int(sample_rate * frame_ms / 1000)
+        frame_count = len(samples) // frame
+        frames = samples[:frame_count * frame].reshape(frame_count, frame)
+        energy = np.sqrt(np.mean(frames ** 2, axis=1))
+
+        # Границу окна ищем в последней четверти окна, в самом тихом кадре
+        search = max(1, window // (4 * frame))
+        windows = []
+        start = 0
+        while len(samples) - start > window:
+            last_frame = (start + window) // frame
+            first_frame = max(start // frame + 1, last_frame - search)
+            cut = (first_frame + int(np.argmin(energy[first_frame:last_frame]))) * frame
+            windows.append((start, cut))
+            start = cut
+        windows.append((start, len(samples)))
+        return windows
+
+    @staticmethod
+    def edit_transcript(text, settings, document_id=None):
+        edited_text = text
+        for edited_text in Audio.edit_transcript_stream(text, settings, document_id):
+            pass
+        return edited_text
+
+    @staticmethod
+    def edit_transcript_stream(text, settings, document_id=None):
+        # Отредактированный текст по мере генерации; последний элемент — итоговый.
+        # document_id связывает повторные редактирования одной записи: заново
+        # отправляются только чанки, в которых изменился текст
+        try:
+            yield from Audio._edit_transcript_stream(text, settings, document_id)
+        except ProviderUnavailable as e:
+            print(f"{e}. Returning original text.")
+            yield text
+
+    @staticmethod
+    def _edit_transcript_stream(text, settings, document_id=None):
+        PROVIDER  = settings.get_setting('provider')
         if PROVIDER == "ollama":
-            LLM_MODEL = self.settings.get_setting('ollama_model')
+            LLM_MODEL = settings.get_setting('ollama_model')
             LLM_SYSTEM_PROMPT = """You are an experienced editor tasked with improving a given text. Your goal is to correct errors and enhance readability while staying close to the original text and preserving its initial meaning.
             Follow these steps to edit the text:
             Carefully read through the text and identify any grammatical, spelling, or punctuation errors. Correct these errors while maintaining the original word choice as much as possible.
@@ -302,53 +564,52 @@ class Audio:
             LLM_CHUNK_SIZE = 600
             #text = result["text"]
             text_processor = Text()
-            edited_text = text_processor.enhance_text(
+            yield from text_processor.enhance_text_stream(
                 text,
                 LLM_MODEL,
-                LLM_SYSTEM_PROMPT
+                LLM_SYSTEM_PROMPT,
+                document_id=document_id
         )
-        elif PROVIDER == "together":
-            os.environ['TOGETHER_API_KEY'] = self.settings.get_setting('together_api_key')
-            model=self.settings.get_setting('togetherai_model')
-            # Вызовем TogetherAI API для обработки текста
-            edited_text = together_process_chunk(
-                text)
-        elif PROVIDER == "groq":
-            os.environ['GROQ_API_KEY'] = self.settings.get_setting('groq_api_key')
-            model_name = self.settings.get_setting('groq_model')
-            edited_text = groq_process_chunk(text)
-        elif PROVIDER == "openAI":
-            os.environ['OPENAI_API_KEY'] = self.settings.get_setting('openAI_api_key')
-            model_name = self.settings.get_setting('openAI_model')
-            edited_text = openAI_process_chunk(text)
-            
+        elif PROVIDER in PROVIDERS:
+            # TogetherAI, Groq, OpenAI и заглушка получают текст целиком со своим приглашением
+            yield from Text(PROVIDER).edit_text_stream(text)
         else:
             # Если указанный провайдер не поддерживается, вернуть оригинальный текст
             print(f"Provider '{PROVIDER}' is not supported. Returning original text.")
-            edited_text = text
-        # Дополнительные обработки для получения других форматов вывода
-        timestamp_view = self.whisper_to_timestamp_view(result)
-        timestamp_table = self.whisper_to_timestamp_table(result)
-        json_output = self.whisper_to_json(result)
-        json_raw = self.whisper_to_json_raw(result)
-        
-        return text, edited_text, timestamp_view, timestamp_table, json_output, json_raw
-
-    def whisper_to_timestamp_view(self, whisper_output):
+            yield text
+
+    @staticmethod
+    def format_transcript(whisper_output, time_map=None):
+        # Дополнительные обработки для получения других форматов вывода.
+        # time_map переводит таймкоды обрезанного аудио во время исходной записи
+        if time_map is not None:
+            whisper_output = time_map.remap(whisper_output)
+        timestamp_view = Audio.whisper_to_timestamp_view(whisper_output)
+        timestamp_table = Audio.whisper_to_timestamp_table(whisper_output)
+        json_output = Audio.whisper_to_json(whisper_output)
+        json_raw = Audio.whisper_to_json_raw(whisper_output)
+        return timestamp_view, timestamp_table, json_output, json_raw
+
+    @staticmethod
+    def whisper_to_timestamp_view(whisper_output):
         output = [
             "| Start | End | Text |",
             "|----|----|----|"
         ]
-        for segment in whisper_output['segments']:
-            output.append(
-                f"| {segment['start']:.2f} | {segment['end']:.2f} | {segment['text']} |")
+        output.extend(Audio.timestamp_view_row(segment) for segment in whisper_output['segments'])
         return "\n".join(output)
 
-    def whisper_to_timestamp_table(self, whisper_output):
+    @staticmethod
+    def timestamp_view_row(segment):
+        return f"| {segment['start']:.2f} | {segment['end']:.2f} | {segment['text']} |"
+
+    @staticmethod
+    def whisper_to_timestamp_table(whisper_output):
         return [[round(segment['start'], 2), round(segment['end'], 2), segment['text']]
                 for segment in whisper_output['segments']]
 
-    def whisper_to_json(self, whisper_output):
+    @staticmethod
+    def whisper_to_json(whisper_output):
         output = []
         for segment in whisper_output['segments']:
             output.append({
@@ -358,7 +619,8 @@ class Audio:
             })
         return output
 
-    def whisper_to_json_raw(self, whisper_output):
+    @staticmethod
+    def whisper_to_json_raw(whisper_output):
         output = []
         for segment in whisper_output['segments']:
             output.append({
@@ -375,45 +637,10 @@ class Audio:
         return output
 
     def get_file_path(self, output_format='wav'):
-        supported_formats = ['wav', 'mp3', 'ogg', 'flac', 'aac', 'm4a']
-        
-        if output_format not in supported_formats:
-            raise ValueError(f"Unsupported format: {output_format}. Supported formats are: {', '.join(supported_formats)}")
-
-        if os.path.splitext(self.temp_file)[1][1:].lower() == output_format.lower():
-            return self.temp_file
-
-        output_file = f"{os.path.splitext(self.temp_file)[0]}.{output_format}"
+        if output_format not in self.CODEC_ARGS:
+            raise ValueError(f"Unsupported format: {output_format}. Supported formats are: {', '.join(self.CODEC_ARGS)}")
 
-        ffmpeg_command = [
-            'ffmpeg',
-            '-i', self.temp_file,
-            '-y'  # Overwrite output file if it exists
-        ]
-
-        if output_format == 'mp3':
-            ffmpeg_command.extend(['-acodec', 'libmp3lame', '-b:a', '192k'])
-        elif output_format == 'ogg':
-            ffmpeg_command.extend(['-acodec', 'libvorbis', '-q:a', '4'])
-        elif output_format == 'flac':
-            ffmpeg_command.extend(['-acodec', 'flac', '-compression_level', '5'])
-        elif output_format == 'aac':
-            ffmpeg_command.extend(['-acodec', 'aac', '-b:a', '192k'])
-        elif output_format == 'm4a':
-            ffmpeg_command.extend(['-acodec', 'aac', '-b:a', '192k', '-f', 'mp4'])
-
-        ffmpeg_command.append(output_file)
-
-        try:
-            subprocess.run(ffmpeg_command, check=True, capture_output=True, text=True)
-            if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
-                return output_file
-            else:
-                print(f"Error: Output file {output_file} was not created or is empty.")
-                return self.temp_file
-        except subprocess.CalledProcessError as e:
-            print(f"Error during file conversion: {e.stderr}")
-            return self.temp_file
+        return self._render(output_format)
 
 
 #    def __del__(self):
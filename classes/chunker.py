@@ -0,0 +1,173 @@
+# classes/chunker.py
+import re
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Граница предложения: знак конца, возможно закрывающие кавычки или скобки,
+# пробел и заглавная буква или цифра следующего предложения. Сокращения вроде
+# «т. е.» и «e.g.» со строчной буквой после точки не режутся, частые сокращения
+# («Mr.», «г.», «ул.», «т.е.») — тоже, в любом регистре: слово перед точкой
+# сравнивается со списком в нижнем регистре. Пустая строка — всегда граница.
+ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'st', 'jr', 'sr', 'vs', 'e.g', 'i.e',
+    'г', 'гг', 'им', 'ул', 'проф', 'др', 'т.е', 'т.к', 'т.н', 'см', 'напр',
+})
+_NEXT_SENTENCE = r'\s+(?=["«“(\[]?[A-ZА-ЯЁ0-9])'
+SENTENCE_BOUNDARY = re.compile(
+    rf'(?<=[.!?…]){_NEXT_SENTENCE}|(?<=[.!?…]["»”\')\]]){_NEXT_SENTENCE}|\n\s*\n'
+)
+# Слово перед точкой: проверяется по ABBREVIATIONS
+_LAST_WORD = re.compile(r'[^\s"«“(\[]+$')
+WORD = re.compile(r'\S+\s*')
+
+# Символов на токен для оценки без токенизатора; для BPE-словарей современных
+# моделей кириллица кодируется примерно вдвое плотнее латиницы
+CHARS_PER_TOKEN = (
+    (re.compile(r'[Ѐ-ӿ]'), 2.5),
+    (re.compile(r'[぀-ヿ㐀-鿿가-힯]'), 1.0),
+    (re.compile(r'[A-Za-z0-9]'), 4.0),
+)
+OTHER_CHARS_PER_TOKEN = 3.0
+# Ответ редактора примерно равен входу; запас на перефразирование
+OUTPUT_RATIO = 1.2
+
+
+@lru_cache(maxsize=None)
+def _encoding(name):
+    # tiktoken — необязательная зависимость; без неё используется оценка
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning(f"tiktoken encoding {name} unavailable: {e}")
+        return None
+
+
+def estimate_tokens(text):
+    tokens = 0.0
+    counted = 0
+    for pattern, chars_per_token in CHARS_PER_TOKEN:
+        count = len(pattern.findall(text))
+        tokens += count / chars_per_token
+        counted += count
+    tokens += (len(text) - counted - text.count(' ')) / OTHER_CHARS_PER_TOKEN
+    return int(tokens) + 1
+
+
+def count_tokens(text, encoding=None):
+    tokenizer = _encoding(encoding) if encoding else None
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def _after_abbreviation(text, position):
+    # position — конец точки, за которой найдена граница
+    if text[position - 1:position] != '.':
+        return False
+    word = _LAST_WORD.search(text, max(0, position - 16), position - 1)
+    return word is not None and word.group().lower() in ABBREVIATIONS
+
+
+def split_sentences(text):
+    sentences, start = [], 0
+    for boundary in SENTENCE_BOUNDARY.finditer(text):
+        if boundary.group().count('\n') < 2 and _after_abbreviation(text, boundary.start()):
+            continue
+        sentences.append(text[start:boundary.start()])
+        start = boundary.end()
+    sentences.append(text[start:])
+    return [sentence.strip() for sentence in sentences if sentence and sentence.strip()]
+
+
+def token_budget(context_window, prompt_tokens, max_tokens, output_ratio=OUTPUT_RATIO):
+    # Наибольший чанк, при котором в окно контекста помещаются приглашение, чанк
+    # и ответ, а ответ укладывается в max_tokens
+    available = context_window - prompt_tokens
+    budget = min(available / (1 + output_ratio), max_tokens / output_ratio if max_tokens else available)
+    return max(1, int(budget))
+
+
+class Chunk:
+    # text редактируется; context — предыдущие предложения только для справки;
+    # sentences — предложения (или части длинных предложений), из которых собран text
+    def __init__(self, text, context="", tokens=0, sentences=None):
+        self.text = text
+        self.context = context
+        self.tokens = tokens
+        self.sentences = sentences if sentences is not None else [text]
+
+    def __repr__(self):
+        return f"Chunk(tokens={self.tokens}, text={self.text[:40]!r})"
+
+
+class TokenChunker:
+    def __init__(self, budget, encoding=None, overlap_sentences=0):
+        self.budget = budget
+        self.encoding = encoding
+        self.overlap_sentences = overlap_sentences
+
+    def count(self, text):
+        return count_tokens(text, self.encoding)
+
+    def _split_long(self, sentence):
+        # Предложение длиннее бюджета режется по словам
+        pieces, current, size = [], [], 0
+        for word in WORD.findall(sentence):
+            tokens = self.count(word)
+            if current and size + tokens > self.budget:
+                pieces.append(''.join(current).strip())
+                current, size = [], 0
+            current.append(word)
+            size += tokens
+        if current:
+            pieces.append(''.join(current).strip())
+        return pieces
+
+    def units(self, sentences):
+        # Единицы деления: предложения, а длинные — по частям не длиннее бюджета
+        for sentence in sentences:
+            tokens = self.count(sentence)
+            if tokens <= self.budget:
+                yield sentence, tokens
+            else:
+                for piece in self._split_long(sentence):
+                    yield piece, self.count(piece)
+
+    def _context(self, previous):
+        # Последние предложения предыдущего чанка; занимают бюджет входа вместе с чанком
+        if not self.overlap_sentences or not previous:
+            return "", 0
+        context = ' '.join(previous[-self.overlap_sentences:])
+        tokens = self.count(context)
+        if tokens >= self.budget // 2:
+            return "", 0
+        return context, tokens
+
+    def chunk(self, text):
+        return self.chunk_units(self.units(split_sentences(text)))
+
+    def chunk_units(self, units, previous=None):
+        # previous — предложения перед первой единицей, из них берётся контекст
+        # первого чанка при повторном делении участка документа
+        chunks = []
+        current = []
+        context, size = self._context(previous)
+        for sentence, tokens in units:
+            # Пробел между предложениями тоже занимает токен
+            if current and size + tokens + 1 > self.budget:
+                chunks.append(Chunk(' '.join(current), context, size, current))
+                context, size = self._context(current)
+                current = []
+            if not current and size + tokens > self.budget:
+                context, size = "", 0
+            size += tokens + (1 if current else 0)
+            current.append(sentence)
+        if current:
+            chunks.append(Chunk(' '.join(current), context, size, current))
+        return chunks
@@ -0,0 +1,258 @@
+# classes/downloader.py
+import os
+import re
+import json
+import hashlib
+import logging
+import time
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from classes.settings import Settings, resolve_path
+
+logger = logging.getLogger(__name__)
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+CHUNK_SIZE = 1024 * 1024
+PROGRESS_LOG_INTERVAL = 10
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+# Загрузчик больших файлов моделей. Файл качается в <путь>.part сегментами по
+# HTTP Range в несколько потоков; готовые сегменты записываются в <путь>.part.json,
+# поэтому прерванная загрузка продолжается с места остановки. После проверки
+# SHA256 (из манифеста или заголовка X-Linked-Etag) файл атомарно переименовывается,
+# а рядом записывается <путь>.sha256 — признак завершённой загрузки.
+class DownloadManager:
+    def __init__(self, workers=None, segment_mb=None, manifest_path=None):
+        settings = Settings()
+        self.workers = workers or settings.get_setting('download_workers')
+        self.segment_size = (segment_mb or settings.get_setting('download_segment_mb')) * 1024 * 1024
+        self.manifest_path = manifest_path or resolve_path(settings.get_setting('model_manifest_path'))
+        self.timeout = settings.get_setting('download_timeout')
+        self._executor = ThreadPoolExecutor(max_workers=2)
+        self._futures = {}
+        self._progress = {}
+        self._logged_at = {}
+        self._lock = threading.Lock()
+
+    def manifest_sha256(self, destination):
+        # Манифест — JSON {имя файла: sha256}
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get(os.path.basename(destination))
+
+    def is_complete(self, destination, sha256=None):
+        # Файл без .part готов, если хэш из манифеста совпадает с маркером .sha256.
+        # Без маркера (файл прежнего загрузчика мог остаться усечённым) файл
+        # проверяется по манифесту один раз; без хэша в манифесте проверить нечем
+        if not os.path.exists(destination) or os.path.exists(f"{destination}.part"):
+            return False
+        sha256 = sha256 or self.manifest_sha256(destination)
+        if not sha256:
+            return True
+        try:
+            with open(f"{destination}.sha256", 'r', encoding='utf-8') as f:
+                if f.read().strip() == sha256:
+                    return True
+        except OSError:
+            pass
+        actual = self._file_sha256(destination)
+        if actual != sha256:
+            logger.warning(f"Checksum mismatch for existing {destination}: expected {sha256}, got {actual}; downloading again")
+            return False
+        self._write_marker(destination, sha256)
+        return True
+
+    @staticmethod
+    def _write_marker(destination, sha256):
+        with open(f"{destination}.sha256", 'w', encoding='utf-8') as f:
+            f.write(sha256)
+
+    def submit(self, url, destination, sha256=None):
+        # Фоновая загрузка; повторный вызов для того же пути возвращает ту же задачу
+        with self._lock:
+            future = self._futures.get(destination)
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._executor.submit(self.download, url, destination, sha256)
+                self._futures[destination] = future
+            return future
+
+    def status(self):
+        with self._lock:
+            return dict(self._progress)
+
+    def _report(self, destination, done, total, progress_callback):
+        # Прогресс пишется в лог не чаще раза в PROGRESS_LOG_INTERVAL секунд
+        now = time.monotonic()
+        with self._lock:
+            self._progress[destination] = (done, total)
+            log = now - self._logged_at.get(destination, 0) >= PROGRESS_LOG_INTERVAL or done == total
+            if log:
+                self._logged_at[destination] = now
+        if log:
+            of_total = f" of {total // 2 ** 20} MB ({done * 100 // total}%)" if total else " MB"
+            logger.info(f"Downloading {os.path.basename(destination)}: {done // 2 ** 20}{of_total}")
+        if progress_callback:
+            progress_callback(done, total)
+
+    def download(self, url, destination, sha256=None, progress_callback=None):
+        if self.is_complete(destination, sha256):
+            return destination
+        os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+        size, ranges, linked_sha256 = self._probe(url)
+        sha256 = sha256 or self.manifest_sha256(destination) or linked_sha256
+        part_path = f"{destination}.part"
+        logger.info(f"Downloading {url} to {destination} ({size or 'unknown'} bytes)")
+
+        if size and ranges:
+            self._download_segments(url, destination, part_path, size, progress_callback)
+        else:
+            self._download_stream(url, destination, part_path, progress_callback)
+
+        if sha256:
+            actual = self._file_sha256(part_path)
+            if actual != sha256:
+                os.remove(part_path)
+                self._remove_state(part_path)
+                raise RuntimeError(f"Checksum mismatch for {destination}: expected {sha256}, got {actual}")
+        else:
+            logger.warning(f"No SHA256 known for {destination}, skipping verification")
+
+        os.replace(part_path, destination)
+        self._remove_state(part_path)
+        if sha256:
+            self._write_marker(destination, sha256)
+        logger.info(f"Download completed: {destination}")
+        return destination
+
+    def _open(self, request, follow_redirects=True):
+        if follow_redirects:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        return urllib.request.build_opener(_NoRedirect).open(request, timeout=self.timeout)
+
+    def _probe(self, url):
+        # HEAD по цепочке редиректов: X-Linked-Etag (sha256 LFS-файла) отдаёт только
+        # первый ответ, размер и Accept-Ranges — конечный
+        linked_sha256 = None
+        for _ in range(10):
+            try:
+                response = self._open(urllib.request.Request(url, method='HEAD'), follow_redirects=False)
+            except urllib.error.HTTPError as e:
+                if e.code not in (301, 302, 303, 307, 308):
+                    raise
+                response = e
+            with response:
+                headers = response.headers
+                etag = (headers.get('X-Linked-Etag') or '').strip('"').lower()
+                if linked_sha256 is None and SHA256_PATTERN.match(etag):
+                    linked_sha256 = etag
+                location = headers.get('Location')
+                if not location:
+                    size = int(headers.get('Content-Length') or 0)
+                    ranges = headers.get('Accept-Ranges', '').lower() == 'bytes'
+                    return size, ranges, linked_sha256
+            url = urllib.parse.urljoin(url, location)
+        raise RuntimeError(f"Too many redirects for {url}")
+
+    @staticmethod
+    def _state_path(part_path):
+        return f"{part_path}.json"
+
+    def _load_state(self, part_path, size):
+        try:
+            with open(self._state_path(part_path), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        if state.get('size') != size or state.get('segment_size') != self.segment_size:
+            return set()
+        if not os.path.exists(part_path) or os.path.getsize(part_path) != size:
+            return set()
+        return set(state.get('done', []))
+
+    def _save_state(self, part_path, size, done):
+        state_path = self._state_path(part_path)
+        with open(f"{state_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({'size': size, 'segment_size': self.segment_size, 'done': sorted(done)}, f)
+        os.replace(f"{state_path}.tmp", state_path)
+
+    def _remove_state(self, part_path):
+        try:
+            os.remove(self._state_path(part_path))
+        except FileNotFoundError:
+            pass
+
+    def _download_segments(self, url, destination, part_path, size, progress_callback):
+        segments = [(start, min(start + self.segment_size, size) - 1) for start in range(0, size, self.segment_size)]
+        done = self._load_state(part_path, size)
+        if not done:
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+        downloaded = sum(end - start + 1 for index, (start, end) in enumerate(segments) if index in done)
+        lock = threading.Lock()
+        self._report(destination, downloaded, size, progress_callback)
+
+        fd = os.open(part_path, os.O_WRONLY)
+        try:
+            def fetch(index):
+                nonlocal downloaded
+                start, end = segments[index]
+                request = urllib.request.Request(url, headers={'Range': f"bytes={start}-{end}"})
+                with self._open(request) as response:
+                    if response.status != 206:
+                        raise RuntimeError(f"Server ignored Range request for {url}")
+                    offset = start
+                    while True:
+                        chunk = response.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        os.pwrite(fd, chunk, offset)
+                        offset += len(chunk)
+                        with lock:
+                            downloaded += len(chunk)
+                            current = downloaded
+                        self._report(destination, current, size, progress_callback)
+                if offset != end + 1:
+                    raise RuntimeError(f"Segment {start}-{end} of {url} is truncated")
+                with lock:
+                    done.add(index)
+                    self._save_state(part_path, size, done)
+
+            pending = [index for index in range(len(segments)) if index not in done]
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for future in [executor.submit(fetch, index) for index in pending]:
+                    future.result()
+        finally:
+            os.close(fd)
+
+    def _download_stream(self, url, destination, part_path, progress_callback):
+        # Сервер без Range: качаем одним запросом заново
+        downloaded = 0
+        with self._open(urllib.request.Request(url)) as response, open(part_path, 'wb') as f:
+            total = int(response.headers.get('Content-Length') or 0)
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+                downloaded += len(chunk)
+                self._report(destination, downloaded, total, progress_callback)
+
+    @staticmethod
+    def _file_sha256(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+downloads = DownloadManager()
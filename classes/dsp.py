@@ -0,0 +1,147 @@
+# classes/dsp.py
+import math
+import numpy as np
+
+# Векторные операции над сигналом в памяти. Сигнал — массив float32 формы
+# (кадры, каналы) со значениями в [-1, 1].
+
+RESAMPLE_ZERO_CROSSINGS = 16
+RESAMPLE_ROLLOFF = 0.94
+RESAMPLE_KAISER_BETA = 8.0
+BLOCK_ELEMENTS = 1 << 22
+
+
+def to_float(data):
+    data = np.asarray(data)
+    if data.dtype == np.uint8:
+        samples = (data.astype(np.float32) - 128) / 128
+    elif np.issubdtype(data.dtype, np.integer):
+        samples = data.astype(np.float32) / float(-np.iinfo(data.dtype).min)
+    else:
+        samples = data.astype(np.float32)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    return samples
+
+
+def to_mono(samples):
+    return samples.mean(axis=1, keepdims=True, dtype=np.float32)
+
+
+def gain(samples, factor):
+    return samples * np.float32(factor)
+
+
+def _resample_table(up, down):
+    # Фильтр windowed-sinc с окном Кайзера на сетке, повышенной в up раз,
+    # разложенный по up фазам: table[p, j] — вес отсчёта base + j - taps + 1
+    cutoff = RESAMPLE_ROLLOFF / max(up, down)
+    half_width = RESAMPLE_ZERO_CROSSINGS / cutoff
+    taps = int(math.ceil(half_width / up)) + 1
+    offsets = np.arange(-taps + 1, taps + 1)
+    n = np.arange(up)[:, None] - offsets[None, :] * up
+    window = np.where(
+        np.abs(n) <= half_width,
+        np.i0(RESAMPLE_KAISER_BETA * np.sqrt(np.clip(1 - (n / half_width) ** 2, 0, None))) / np.i0(RESAMPLE_KAISER_BETA),
+        0.0
+    )
+    table = up * cutoff * np.sinc(cutoff * n) * window
+    return table.astype(np.float32), offsets, taps
+
+
+def resample(samples, orig_rate, new_rate):
+    # Полифазная передискретизация в рациональное число раз up/down
+    orig_rate, new_rate = int(orig_rate), int(new_rate)
+    if orig_rate == new_rate:
+        return samples
+    divisor = math.gcd(orig_rate, new_rate)
+    up, down = new_rate // divisor, orig_rate // divisor
+    table, offsets, taps = _resample_table(up, down)
+
+    frames, channels = samples.shape
+    padded = np.pad(samples, ((taps, taps + 1), (0, 0)))
+    length = -(-frames * up // down)
+    output = np.empty((length, channels), dtype=np.float32)
+
+    # Сбор отсчётов блоками, чтобы промежуточный массив не рос с длиной сигнала
+    block = max(1, BLOCK_ELEMENTS // (len(offsets) * channels))
+    for start in range(0, length, block):
+        position = np.arange(start, min(start + block, length), dtype=np.int64) * down
+        base, phase = np.divmod(position, up)
+        gathered = padded[base[:, None] + offsets[None, :] + taps]
+        output[start:start + len(position)] = np.einsum('mj,mjc->mc', table[phase], gathered)
+    return output
+
+
+def silence_mask(samples, sample_rate, min_duration, threshold, frame_ms=20):
+    # Детектор речи по энергии кадров за один векторный проход: True для отсчётов,
+    # которые остаются; удаляются паузы с RMS ниже порога длиннее min_duration секунд
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    frame_count = len(samples) // frame
+    energy = np.square(samples[:frame_count * frame]).reshape(frame_count, -1).mean(axis=1)
+    silent = np.sqrt(energy) < threshold
+
+    starts, ends = mask_segments(silent).T
+    long_runs = (ends - starts) * frame >= min_duration * sample_rate
+    marks = np.zeros(frame_count + 1, dtype=np.int32)
+    np.add.at(marks, starts[long_runs], 1)
+    np.add.at(marks, ends[long_runs], -1)
+    keep_frames = np.cumsum(marks[:-1]) == 0
+
+    keep = np.ones(len(samples), dtype=bool)
+    keep[:frame_count * frame] = np.repeat(keep_frames, frame)
+    return keep
+
+
+def mask_segments(mask):
+    # Интервалы [начало, конец) подряд идущих True
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.stack((np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)), axis=1)
+
+
+def remove_silence(samples, sample_rate, min_duration, threshold):
+    # Возвращает обрезанный сигнал и оставленные интервалы речи в отсчётах
+    keep = silence_mask(samples, sample_rate, min_duration, threshold)
+    return samples[keep], mask_segments(keep)
+
+
+class TimeMap:
+    # Соответствие времени обрезанного сигнала времени исходной записи:
+    # кусочно-линейная функция с единичным наклоном, куски начинаются
+    # в trimmed_starts и соответствуют original_starts исходной шкалы
+    def __init__(self, trimmed_starts=(0.0,), original_starts=(0.0,)):
+        self.trimmed_starts = np.asarray(trimmed_starts, dtype=np.float64)
+        self.original_starts = np.asarray(original_starts, dtype=np.float64)
+
+    def to_original(self, times, end=False):
+        # Конец сегмента, попавший ровно на стык, относится к предыдущему куску
+        times = np.asarray(times, dtype=np.float64)
+        index = np.searchsorted(self.trimmed_starts, times, side='left' if end else 'right') - 1
+        index = np.clip(index, 0, len(self.trimmed_starts) - 1)
+        return self.original_starts[index] + times - self.trimmed_starts[index]
+
+    def cut(self, kept):
+        # Новая карта после вырезания всего, кроме интервалов kept (секунды текущей шкалы)
+        kept = np.asarray(kept, dtype=np.float64).reshape(-1, 2)
+        if not len(kept):
+            return TimeMap()
+        starts, ends = kept[:, 0], kept[:, 1]
+        offsets = np.concatenate(([0.0], np.cumsum(ends - starts)[:-1]))
+        # Стыки текущей карты внутри оставленных интервалов тоже становятся стыками
+        ranges = np.searchsorted(starts, self.trimmed_starts, side='right') - 1
+        clipped = ranges.clip(0)
+        inside = (ranges >= 0) & (self.trimmed_starts > starts[clipped]) & (self.trimmed_starts < ends[clipped])
+        points = np.concatenate((starts, self.trimmed_starts[inside]))
+        ranges = np.concatenate((np.arange(len(starts)), ranges[inside]))
+        order = np.argsort(points, kind='stable')
+        points, ranges = points[order], ranges[order]
+        return TimeMap(offsets[ranges] + points - starts[ranges], self.to_original(points))
+
+    def remap(self, whisper_output):
+        segments = [
+            dict(segment,
+                 start=float(self.to_original(segment['start'])),
+                 end=float(self.to_original(segment['end'], end=True)))
+            for segment in whisper_output['segments']
+        ]
+        return {**whisper_output, 'segments': segments}
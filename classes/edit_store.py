@@ -0,0 +1,95 @@
+# classes/edit_store.py
+import os
+import json
+import hashlib
+import logging
+import threading
+from classes.settings import Settings, resolve_path
+
+logger = logging.getLogger(__name__)
+
+
+# Состояние пошагового редактирования документов. Для каждого документа
+# хранятся границы чанков последнего редактирования (списки предложений) и
+# ответы LLM по ним, а также провайдер, модель и хэш приглашения, с которыми
+# они получены. По этому состоянию Text при повторном редактировании
+# отправляет в LLM только изменившиеся чанки. Один документ — один JSON-файл;
+# время последнего обращения хранится в mtime, по нему вытесняются самые
+# старые документы при превышении лимита их числа.
+class EditStore:
+    def __init__(self, store_dir=None, max_documents=None):
+        settings = Settings()
+        self.store_dir = store_dir or resolve_path(settings.get_setting('llm_edit_store_dir'))
+        self.max_documents = max_documents if max_documents is not None else settings.get_setting('llm_edit_store_max_documents')
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(document_id, provider, model, system_prompt):
+        # Ответы другой модели или по другому приглашению повторно не используются
+        digest = hashlib.sha256()
+        digest.update(json.dumps([document_id, provider, model, system_prompt or ""]).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.store_dir, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                chunks = json.load(f)['chunks']
+            os.utime(path)
+            return chunks
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Corrupted edit state {path}: {e}")
+            self._remove(path)
+            return None
+
+    def put(self, key, chunks):
+        # chunks — список {'sentences': [...], 'context': str, 'edited': str | None};
+        # edited=None у чанков, которые не удалось отредактировать
+        os.makedirs(self.store_dir, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'chunks': chunks}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def _entries(self):
+        if not os.path.isdir(self.store_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.store_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.store_dir, name)
+            try:
+                entries.append((os.stat(path).st_mtime, path))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def evict(self):
+        with self._lock:
+            entries = sorted(self._entries())
+            for _, path in entries[:max(0, len(entries) - self.max_documents)]:
+                self._remove(path)
+
+    def clear(self):
+        with self._lock:
+            entries = self._entries()
+            for _, path in entries:
+                self._remove(path)
+            return len(entries)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+edit_store = EditStore()
@@ -0,0 +1,175 @@
+# classes/enhancer.py
+import os
+import threading
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import soundfile as sf
+from classes.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Каждый процесс пула загружает свою копию моделей денойзера и энхансера,
+# поэтому число процессов по умолчанию не растёт с числом ядер
+DEFAULT_WINDOW_WORKERS = 2
+
+
+# Движок resemble-enhance внутри процесса. Модели денойзера и энхансера
+# загружаются один раз на процесс (resemble_enhance кэширует их в load_enhancer),
+# на вход и выход — массивы NumPy, без копирования файлов и запуска CLI.
+class ResembleEnhancer:
+    def __init__(self, device=None, threads=None):
+        settings = Settings()
+        self.device = device or settings.get_setting('enhancer_device')
+        self.threads = threads if threads is not None else settings.get_setting('enhancer_threads')
+        self._inference = None
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_workers = 0
+
+    def _resolve_device(self):
+        import torch
+        if str(self.device).startswith('cuda') and not torch.cuda.is_available():
+            return 'cpu'
+        return str(self.device)
+
+    def _load(self):
+        # ImportError пробрасывается: вызывающий код переключается на CLI
+        if self._inference is None:
+            import torch
+            from resemble_enhance.enhancer import inference
+            device = self._resolve_device()
+            if device == 'cpu' and self.threads:
+                torch.set_num_threads(self.threads)
+            logger.info(f"Loading resemble-enhance models on {device}...")
+            inference.load_enhancer(None, device)
+            self._inference = inference
+        return self._inference
+
+    @staticmethod
+    def _to_tensor(samples):
+        import torch
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        return torch.from_numpy(np.ascontiguousarray(samples))
+
+    def denoise(self, samples, sample_rate):
+        import torch
+        with self._lock:
+            inference = self._load()
+            with torch.inference_mode():
+                output, output_rate = inference.denoise(self._to_tensor(samples), sample_rate, self._resolve_device())
+        return output.cpu().numpy(), output_rate
+
+    def enhance(self, samples, sample_rate, nfe=32, solver='midpoint', lambd=0.5, tau=0.5):
+        import torch
+        with self._lock:
+            inference = self._load()
+            with torch.inference_mode():
+                output, output_rate = inference.enhance(
+                    self._to_tensor(samples), sample_rate, self._resolve_device(),
+                    nfe=nfe, solver=solver.lower(), lambd=lambd, tau=tau
+                )
+        return output.cpu().numpy(), output_rate
+
+    def process(self, operation, samples, sample_rate, params):
+        if operation == 'denoise':
+            return self.denoise(samples, sample_rate)
+        nfe, solver, lambd, tau = params
+        return self.enhance(samples, sample_rate, nfe, solver, lambd, tau)
+
+    def _executor(self, workers):
+        # Пул живёт между вызовами, чтобы каждый воркер загружал модели один раз
+        if workers <= 1:
+            return ThreadPoolExecutor(max_workers=1), self.process
+        with self._lock:
+            if self._pool is None or self._pool_workers != workers:
+                if self._pool is not None:
+                    self._pool.shutdown(wait=False)
+                threads = max(1, (os.cpu_count() or 1) // workers)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.device, threads)
+                )
+                self._pool_workers = workers
+            return self._pool, _process_window
+
+    def process_windowed(self, input_file, output_file, operation, params=None, window_seconds=None,
+                         overlap_seconds=None, workers=None, progress_callback=None):
+        # Файл читается окнами по window_seconds с перекрытием overlap_seconds, окна
+        # обрабатываются в пуле, а результат склеивается линейным кроссфейдом прямо в
+        # выходной файл. В памяти одновременно не больше 2 * workers окон.
+        settings = Settings()
+        window_seconds = window_seconds or settings.get_setting('enhancer_window_seconds')
+        overlap_seconds = overlap_seconds if overlap_seconds is not None else settings.get_setting('enhancer_window_overlap')
+        workers = workers or settings.get_setting('enhancer_window_workers') or min(DEFAULT_WINDOW_WORKERS, os.cpu_count() or 1)
+        if self._resolve_device() != 'cpu':
+            # На GPU окна выполняются по очереди в уже загруженной модели
+            workers = 1
+
+        with sf.SoundFile(input_file) as source:
+            sample_rate = source.samplerate
+            frames = source.frames
+            hop = int(window_seconds * sample_rate)
+            overlap = int(overlap_seconds * sample_rate)
+            starts = list(range(0, max(frames - overlap, 1), hop))
+            executor, target = self._executor(workers)
+            pending = deque()
+            next_window = 0
+
+            def submit():
+                nonlocal next_window
+                source.seek(starts[next_window])
+                samples = source.read(hop + overlap, dtype='float32', always_2d=True).mean(axis=1)
+                pending.append(executor.submit(target, operation, samples, sample_rate, params))
+                next_window += 1
+
+            sink = None
+            tail = None
+            try:
+                while next_window < len(starts) and len(pending) < 2 * workers:
+                    submit()
+                for index in range(len(starts)):
+                    output, output_rate = pending.popleft().result()
+                    if next_window < len(starts):
+                        submit()
+                    if sink is None:
+                        sink = sf.SoundFile(output_file, 'w', samplerate=output_rate, channels=1, subtype='PCM_16')
+                    output_overlap = int(overlap * output_rate / sample_rate)
+                    if tail is not None:
+                        fade = min(len(tail), len(output))
+                        ramp = (np.arange(fade, dtype=np.float32) + 0.5) / fade
+                        sink.write(tail[:fade] * (1 - ramp) + output[:fade] * ramp)
+                        output = output[fade:]
+                    if index < len(starts) - 1 and output_overlap:
+                        tail = output[-output_overlap:]
+                        output = output[:-output_overlap]
+                    sink.write(output)
+                    if progress_callback:
+                        progress_callback(index + 1, len(starts))
+            finally:
+                for future in pending:
+                    future.cancel()
+                if executor is not self._pool:
+                    executor.shutdown(wait=False)
+                if sink is not None:
+                    sink.close()
+        return output_rate
+
+
+enhancer = ResembleEnhancer()
+
+
+def _init_worker(device, threads):
+    # Выполняется в процессе пула: своя копия движка со своей долей ядер
+    global enhancer
+    enhancer = ResembleEnhancer(device, threads)
+
+
+def _process_window(operation, samples, sample_rate, params):
+    return enhancer.process(operation, samples, sample_rate, params)
@@ -0,0 +1,147 @@
+# classes/image_cache.py
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from classes.settings import Settings, resolve_path
+
+logger = logging.getLogger(__name__)
+
+
+# Кэш сгенерированных изображений под output/. Ключ — хэш параметров запроса
+# вместе с отпечатками файлов модели; index.json хранит для каждого ключа файлы
+# и время последнего обращения, по нему вытесняются самые старые записи.
+class ImageCache:
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir=None, max_entries=None, max_size_mb=None):
+        settings = Settings()
+        # Под output_root, как и каталоги результатов, которые чистит сборщик workspace
+        self.cache_dir = cache_dir or os.path.join(resolve_path(settings.get_setting('output_root')), 'image_cache')
+        self.max_entries = max_entries if max_entries is not None else settings.get_setting('image_cache_max_entries')
+        self.max_size_mb = max_size_mb if max_size_mb is not None else settings.get_setting('image_cache_max_mb')
+        self._lock = threading.Lock()
+
+    def enabled(self):
+        return bool(Settings().get_setting('image_cache_enabled'))
+
+    @staticmethod
+    def model_fingerprint(path):
+        # Хэш из маркера загрузчика, иначе размер и время изменения: хэшировать
+        # многогигабайтный файл на каждый запрос слишком дорого
+        try:
+            with open(f"{path}.sha256", 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        except OSError:
+            pass
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+    @staticmethod
+    def make_key(provider, model_files, prompt, negative_prompt, num_inference_steps, guidance_scale, width, height,
+                 seed, image_format, num_images):
+        payload = json.dumps([
+            provider, [ImageCache.model_fingerprint(path) for path in model_files], prompt, negative_prompt or "",
+            int(num_inference_steps), float(guidance_scale), int(width), int(height), int(seed), image_format,
+            int(num_images)
+        ], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, self.INDEX_FILE)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Corrupted image cache index: {e}")
+            return {}
+
+    def _save_index(self, index):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{self._index_path()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temp_path, self._index_path())
+
+    def get(self, key):
+        if not self.enabled():
+            return None
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+            paths = [os.path.join(self.cache_dir, name) for name in entry['files']]
+            if not all(os.path.exists(path) for path in paths):
+                self._remove_entry(index, key)
+                self._save_index(index)
+                return None
+            entry['accessed_at'] = time.time()
+            self._save_index(index)
+        return paths
+
+    def put(self, key, image_paths):
+        if not self.enabled() or not image_paths:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        files = []
+        size = 0
+        for i, path in enumerate(image_paths):
+            name = f"{key[:16]}_{i}{os.path.splitext(path)[1]}"
+            target = os.path.join(self.cache_dir, name)
+            if os.path.exists(target):
+                os.remove(target)
+            try:
+                # Жёсткая ссылка не занимает места и переживает очистку каталога запроса
+                os.link(path, target)
+            except OSError:
+                shutil.copy2(path, target)
+            files.append(name)
+            size += os.path.getsize(target)
+        now = time.time()
+        with self._lock:
+            index = self._load_index()
+            index[key] = {'files': files, 'size': size, 'created_at': now, 'accessed_at': now}
+            self._evict(index)
+            self._save_index(index)
+
+    def _remove_entry(self, index, key):
+        for name in index.pop(key, {}).get('files', []):
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self, index):
+        entries = sorted(index.items(), key=lambda item: item[1]['accessed_at'])
+        total = sum(entry['size'] for _, entry in entries)
+        limit = self.max_size_mb * 1024 * 1024 if self.max_size_mb else None
+        for key, entry in entries:
+            over_count = self.max_entries and len(index) > self.max_entries
+            over_size = limit is not None and total > limit
+            if not (over_count or over_size):
+                break
+            self._remove_entry(index, key)
+            total -= entry['size']
+
+    def clear(self):
+        with self._lock:
+            index = self._load_index()
+            removed = len(index)
+            for key in list(index):
+                self._remove_entry(index, key)
+            self._save_index(index)
+        return removed
+
+
+image_cache = ImageCache()
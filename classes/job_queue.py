@@ -0,0 +1,145 @@
+# classes/job_queue.py
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from classes.settings import Settings, resolve_path
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# Таблица заданий в SQLite. Используется и основным процессом, и воркерами,
+# поэтому соединение открывается на каждую операцию.
+class JobStore:
+    FINISHED = ('done', 'failed', 'cancelled', 'interrupted')
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, name TEXT, status TEXT, stage TEXT, progress REAL, "
+                "params TEXT, result TEXT, error TEXT, created_at REAL, updated_at REAL)"
+            )
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def create(self, kind, name, params):
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, kind, name, status, stage, progress, params, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', '', 0, ?, ?, ?)",
+                (job_id, kind, name, json.dumps(params), now, now)
+            )
+        return job_id
+
+    def update(self, job_id, **fields):
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'], ensure_ascii=False)
+        fields['updated_at'] = time.time()
+        columns = ", ".join(f"{key} = ?" for key in fields)
+        with self._connect() as connection:
+            connection.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def status(self, job_id):
+        job = self.get(job_id)
+        return job['status'] if job else None
+
+    def list(self, limit=100):
+        with self._connect() as connection:
+            rows = connection.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_interrupted(self):
+        # Задания, не завершённые к моменту остановки приложения, уже не выполнятся
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'interrupted', updated_at = ? WHERE status IN ('queued', 'running', 'cancelling')",
+                (time.time(),)
+            )
+
+
+# Очередь заданий с пулом процессов-воркеров. target должен быть функцией уровня
+# модуля с сигнатурой target(db_path, job_id, params), чтобы её можно было передать в процесс.
+class JobQueue:
+    def __init__(self, db_path=None, workers=None):
+        settings = Settings()
+        self.db_path = db_path or resolve_path(settings.get_setting('job_db_path'))
+        self.workers = workers or settings.get_setting('job_workers')
+        self.store = JobStore(self.db_path)
+        self.store.mark_interrupted()
+        # spawn вместо fork: воркеры используют torch/CUDA
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, name, params, target):
+        job_id = self.store.create(kind, name, params)
+        future = self.executor.submit(target, self.db_path, job_id, params)
+        future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+        with self._lock:
+            self._futures[job_id] = future
+        return job_id
+
+    def _on_done(self, job_id, future):
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if future.cancelled():
+            self.store.update(job_id, status='cancelled')
+            return
+        error = future.exception()
+        if error is not None and self.store.status(job_id) not in JobStore.FINISHED:
+            # Воркер упал, не успев записать статус (например, процесс был убит)
+            self.store.update(job_id, status='failed', error=str(error))
+
+    def cancel(self, job_id):
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            return True
+        if self.store.status(job_id) in ('queued', 'running'):
+            # Воркер проверяет статус между этапами и остановится на ближайшей границе
+            self.store.update(job_id, status='cancelling')
+            return True
+        return False
+
+    def list(self, limit=100):
+        return self.store.list(limit)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    # Пул создаётся лениво и только в основном процессе
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
@@ -0,0 +1,118 @@
+# classes/model_registry.py
+import sys
+import threading
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from classes.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+# Общий для процесса кэш моделей Whisper с ключом (model_language, model_size).
+# Вытеснение по LRU при превышении числа моделей или бюджета памяти; загрузка
+# одной модели из параллельных запросов выполняется один раз под отдельным локом.
+# Модель используют только через use: Whisper на время transcribe вешает на
+# модули декодера хуки kv-кэша, поэтому один экземпляр декодирует одну запись.
+class WhisperModelRegistry:
+    def __init__(self, max_models=None, memory_budget_mb=None):
+        settings = Settings()
+        self.max_models = max_models or settings.get_setting('whisper_cache_max_models')
+        self.memory_budget_mb = memory_budget_mb if memory_budget_mb is not None else settings.get_setting('whisper_cache_memory_mb')
+        self._models = OrderedDict()
+        self._model_locks = {}
+        self._usage_locks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def model_name(model_language, model_size):
+        # У large нет англоязычного варианта, используем мультиязычную модель
+        if model_language == "english-only" and model_size != "large":
+            return f"{model_size}.en"
+        return model_size
+
+    def get(self, model_language, model_size):
+        key = (model_language, model_size)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+            model_lock = self._model_locks.setdefault(key, threading.Lock())
+
+        with model_lock:
+            # Пока ждали лок, модель мог загрузить другой запрос
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key][0]
+
+            model_name = self.model_name(model_language, model_size)
+            logger.info(f"Loading Whisper model '{model_name}'...")
+            import whisper
+            model = whisper.load_model(model_name)
+            size_mb = self._model_size_mb(model)
+            logger.info(f"Whisper model '{model_name}' loaded ({size_mb:.0f} MB)")
+
+            with self._lock:
+                self._models[key] = (model, size_mb)
+                self._evict()
+        return model
+
+    @contextmanager
+    def use(self, model_language, model_size):
+        # Монопольное использование модели на время распознавания
+        with self._lock:
+            usage_lock = self._usage_locks.setdefault((model_language, model_size), threading.Lock())
+        with usage_lock:
+            yield self.get(model_language, model_size)
+
+    def _model_size_mb(self, model):
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors) / (1024 * 1024)
+
+    def _evict(self):
+        evicted = False
+        while len(self._models) > 1 and (
+                len(self._models) > self.max_models or
+                (self.memory_budget_mb and self.total_size_mb() > self.memory_budget_mb)):
+            key, _ = self._models.popitem(last=False)
+            logger.info(f"Evicted Whisper model {key} from cache")
+            evicted = True
+        if evicted:
+            _empty_cuda_cache()
+
+    def total_size_mb(self):
+        return sum(size_mb for _, size_mb in self._models.values())
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+        _empty_cuda_cache()
+
+    def warm_up(self, background=True):
+        settings = Settings()
+        model_language = settings.get_setting('whisper_model_language')
+        model_size = settings.get_setting('whisper_model_size')
+
+        def load():
+            try:
+                self.get(model_language, model_size)
+            except Exception as e:
+                logger.error(f"Whisper warm-up failed: {e}")
+
+        if not background:
+            load()
+            return None
+        thread = threading.Thread(target=load, name="whisper-warmup", daemon=True)
+        thread.start()
+        return thread
+
+
+def _empty_cuda_cache():
+    # torch импортируется вместе с первой моделью; без загруженных моделей чистить нечего
+    torch = sys.modules.get('torch')
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+whisper_registry = WhisperModelRegistry()
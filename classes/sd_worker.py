@@ -0,0 +1,132 @@
+# classes/sd_worker.py
+import queue
+import logging
+import importlib.util
+import itertools
+import threading
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+
+def bindings_available():
+    return importlib.util.find_spec('stable_diffusion_cpp') is not None
+
+
+def _serve(config, requests, results):
+    # Процесс-воркер: модель загружается один раз и обслуживает запросы по очереди
+    try:
+        from stable_diffusion_cpp import StableDiffusion
+        model = StableDiffusion(**config)
+    except Exception as e:
+        results.put((None, 'failed', str(e)))
+        return
+    results.put((None, 'ready', None))
+
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, params, seeds, output_paths = request
+        try:
+            # По одному изображению за вызов, чтобы отдавать их по мере готовности
+            for seed, output_path in zip(seeds, output_paths):
+                image = model.txt_to_img(**params, seed=seed, batch_count=1)[0]
+                image.save(output_path)
+                results.put((request_id, 'image', output_path))
+            results.put((request_id, 'done', None))
+        except Exception as e:
+            results.put((request_id, 'done', str(e)))
+
+
+# Долгоживущий процесс генерации изображений через привязки stable-diffusion.cpp.
+# Перед ним очередь запросов; ответы раздаёт поток-диспетчер по очередям запросов.
+class ResidentImageWorker:
+    def __init__(self, config):
+        self.config = config
+        context = multiprocessing.get_context('spawn')
+        self._requests = context.Queue()
+        self._results = context.Queue()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self.error = None
+        self._process = context.Process(target=_serve, args=(config, self._requests, self._results), daemon=True)
+        self._process.start()
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+    def alive(self):
+        return self.error is None and self._process.is_alive()
+
+    def _dispatch(self):
+        while True:
+            try:
+                request_id, event, value = self._results.get(timeout=1)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    self._fail(f"sd worker exited with code {self._process.exitcode}")
+                    return
+                continue
+            if request_id is None:
+                if event == 'failed':
+                    self._fail(value)
+                    return
+                logger.info("sd worker is ready")
+                continue
+            with self._lock:
+                events = self._pending.get(request_id)
+                if event == 'done':
+                    self._pending.pop(request_id, None)
+            if events is not None:
+                events.put((event, value))
+
+    def _fail(self, error):
+        logger.error(f"sd worker failed: {error}")
+        with self._lock:
+            self.error = error
+            pending, self._pending = self._pending, {}
+        for events in pending.values():
+            events.put(('done', error))
+
+    def generate(self, params, seeds, output_paths):
+        # Генератор: список готовых путей после каждого изображения
+        events = queue.Queue()
+        with self._lock:
+            if self.error is not None:
+                raise RuntimeError(self.error)
+            request_id = next(self._ids)
+            self._pending[request_id] = events
+        self._requests.put((request_id, params, list(seeds), list(output_paths)))
+
+        image_paths = []
+        while True:
+            event, value = events.get()
+            if event == 'image':
+                image_paths.append(value)
+                yield list(image_paths)
+            elif value is not None:
+                raise RuntimeError(value)
+            else:
+                return
+
+    def close(self):
+        self._requests.put(None)
+        self._process.join(timeout=10)
+        if self._process.is_alive():
+            self._process.terminate()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_image_worker(config):
+    # Воркер перезапускается при смене модели или параметров загрузки
+    global _worker
+    with _worker_lock:
+        if _worker is not None and (_worker.config != config or not _worker.alive()):
+            _worker.close()
+            _worker = None
+        if _worker is None:
+            _worker = ResidentImageWorker(config)
+        return _worker
@@ -1,70 +1,326 @@
 # classes/settings.py
 import json
 import os
+import time
+import logging
+import threading
 
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def resolve_path(path):
+    # Относительные пути из настроек отсчитываются от корня проекта, а не от
+    # текущего каталога процесса
+    if not path:
+        return path
+    return os.path.join(PROJECT_ROOT, os.path.expanduser(path))
+
+
+DEFAULT_SETTINGS = {
+    'sample_rate': 44100,
+    'file_format': 'wav',
+    'silence_duration': 0.4,
+    'silence_threshold': -40,
+    'lambd': 0.8,
+    'tau': 0.5,
+    'solver': 'euler',
+    'nfe': 64,
+    'whisper_model_language': 'multilingual',
+    'whisper_model_size': 'base',
+    'whisper_language': 'original',
+    'whisper_cache_max_models': 2,
+    'whisper_cache_memory_mb': 4096,
+    'whisper_warmup': True,
+    'whisper_streaming': True,
+    'whisper_window_seconds': 30,
+    'transcription_cache_enabled': True,
+    'transcription_cache_dir': 'cache/transcriptions',
+    'transcription_cache_max_mb': 512,
+    'silero_sample_rate': 24000,
+    'use_llm_for_ssml': False,
+    'tts_language': 'en',
+    'silero_models_dir': 'models/silero',
+    'silero_preload': False,
+    'txt2img_provider': 'SD3',
+        
+    'num_inference_steps_sd3': 28,
+    'num_inference_steps_flux1-dev': 50,
+    'num_inference_steps_flux1-schnell': 4,
+    'guidance_scale_sd3': 7,
+    'guidance_scale_flux1-dev': 3.5,
+    'guidance_scale_flux1-schnell': 0,  
+              
+    'num_images': 1,
+    'width': 1024,
+    'height': 1024,
+    'image_format': 'png',
+    'seed': -1,
+    'sd_processes': 1,
+    'sd_threads': 0,
+    'sd_resident': True,
+    'download_workers': 4,
+    'download_segment_mb': 64,
+    'download_timeout': 60,
+    'model_manifest_path': 'models/manifest.json',
+    'image_cache_enabled': True,
+    'image_cache_max_entries': 500,
+    'image_cache_max_mb': 2048,
+    'provider': 'ollama',  
+    'ollama_model':'aya:35b-23-q8_0',
+    'ollama_url': 'http://192.168.1.70:11434/api/generate',
+    'ollama_num_ctx': 8192,
+    'togetherai_model': 'meta-llama/Meta-Llama-3.1-70B-Instruct-Turbo', 
+    'together_api_key': '',
+    'groq_model':'llama3-8b-8192',
+    'groq_api_key': '',
+    'openAI_model': 'gpt-4o',
+    'openAI_api_key': '',
+    'ollama_concurrency': 4,
+    'together_concurrency': 8,
+    'groq_concurrency': 4,
+    'openAI_concurrency': 8,
+    'llm_chunk_retries': 2,
+    'llm_max_tokens': 2048,
+    'llm_chunk_overlap_sentences': 0,
+    'llm_context_windows': {},
+    'llm_incremental_editing': True,
+    'llm_edit_store_dir': 'cache/edits',
+    'llm_edit_store_max_documents': 200,
+    'llm_pool_size': 16,
+    'llm_timeout': 90,
+    'llm_connect_timeout': 10,
+    'llm_max_retries': 3,
+    'llm_cache_enabled': True,
+    'llm_cache_path': 'cache/llm_cache.sqlite3',
+    'llm_cache_ttl_hours': 720,
+    'llm_cache_max_entries': 50000,
+    'llm_fallback_providers': [],
+    'llm_health_failure_threshold': 3,
+    'llm_health_cooldown': 30,
+    'llm_latency_window': 200,
+    'llm_hedging': False,
+    'llm_hedge_percentile': 95,
+    'llm_hedge_min_samples': 20,
+    'llm_hedge_delay': 10.0,
+    'transcription_provider': 'ollama',
+    'resemble_enhance_path': '',
+    'enhancer_in_process': True,
+    'enhancer_device': 'cuda',
+    'enhancer_threads': 0,
+    'enhancer_windowed': True,
+    'enhancer_window_seconds': 30,
+    'enhancer_window_overlap': 1.0,
+    'enhancer_window_workers': 2,
+    'ui_concurrency': 2,
+    'job_workers': 2,
+    'job_db_path': 'cache/jobs.sqlite3',
+    'workspace_root': '/tmp/tte_webui',
+    'workspace_tmpfs_root': '/dev/shm/tte_webui',
+    'workspace_tmpfs_max_mb': 256,
+    'workspace_tmpfs_quota_mb': 1024,
+    'workspace_max_age_hours': 24,
+    'workspace_quota_mb': 10240,
+    'workspace_gc_interval_seconds': 600,
+    'output_root': 'output',
+    'output_max_age_hours': 168,
+    'output_quota_mb': 20480,
+    'settings_watch_interval': 1.0
+}
+
+
+# Общее для всего процесса хранилище настроек. Файл читается один раз, дальше
+# значения берутся из памяти; словарь заменяется целиком при каждом изменении,
+# поэтому читатели получают согласованный снимок без блокировок. Фоновый поток
+# следит за временем изменения файла и перечитывает его, если файл правили
+# снаружи; подписчики получают словарь изменившихся ключей.
+class SettingsStore:
+    def __init__(self, settings_file, defaults):
+        self.settings_file = settings_file
+        self.defaults = defaults
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._signature = None
+        # Повреждённый файл при запуске — начинаем со значений по умолчанию;
+        # наблюдатель перечитает файл, когда его допишут
+        values = self._read()
+        self._values = values if values is not None else dict(self.defaults)
+        self._watcher = None
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.settings_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self):
+        signature = self._file_signature()
+        values = dict(self.defaults)
+        if signature is not None:
+            try:
+                with open(self.settings_file, 'r') as f:
+                    values.update(json.load(f))
+            except (OSError, ValueError) as e:
+                # Файл могут сохранять в этот момент: оставляем прежние значения
+                logger.warning(f"Failed to read {self.settings_file}: {e}")
+                return None
+        self._signature = signature
+        return values
+
+    def snapshot(self):
+        # Копия: общий словарь не должен меняться у читателей
+        return dict(self._values)
+
+    def get(self, key):
+        return self._values.get(key, self.defaults.get(key))
+
+    def _swap(self, values):
+        # Вызывается под блокировкой; подписчиков уведомляет _notify уже без неё
+        old, self._values = self._values, values
+        return {key: value for key, value in values.items() if old.get(key) != value}
+
+    def _notify(self, changed):
+        if not changed:
+            return changed
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(changed)
+            except Exception as e:
+                logger.warning(f"Settings subscriber failed: {e}")
+        return changed
+
+    def update(self, changes):
+        with self._lock:
+            changed = self._swap({**self._values, **changes})
+        return self._notify(changed)
+
+    def replace(self, values):
+        with self._lock:
+            changed = self._swap({**self.defaults, **values})
+        return self._notify(changed)
+
+    def commit(self, changes, reset=False):
+        # Изменения применяются и записываются в файл под одной блокировкой:
+        # читатели видят либо прежние настройки, либо все новые сразу
+        with self._lock:
+            changed = self._swap({**(self.defaults if reset else self._values), **changes})
+            self.save()
+        return self._notify(changed)
+
+    def save(self):
+        with self._lock:
+            temp_file = f"{self.settings_file}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(self._values, f, indent=4)
+            os.replace(temp_file, self.settings_file)
+            # Собственная запись не должна восприниматься как внешнее изменение
+            self._signature = self._file_signature()
+
+    def reload(self):
+        with self._lock:
+            values = self._read()
+            changed = self._swap(values) if values is not None else {}
+        return self._notify(changed)
+
+    def reload_if_changed(self):
+        if self._file_signature() == self._signature:
+            return {}
+        changed = self.reload()
+        if changed:
+            logger.info(f"Settings reloaded from {self.settings_file}: {', '.join(sorted(changed))}")
+        return changed
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def start_watcher(self):
+        if self._watcher is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.get('settings_watch_interval') or 1.0)
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    logger.warning(f"Settings watcher failed: {e}")
+
+        self._watcher = threading.Thread(target=loop, daemon=True)
+        self._watcher.start()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(settings_file='settings.json'):
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SettingsStore(settings_file, DEFAULT_SETTINGS)
+                _store.start_watcher()
+    return _store
+
+
+# Лёгкий фасад над общим хранилищем: создание и чтение не обращаются к файлу.
+# Изменения копятся в экземпляре и видны только ему, пока save_settings не
+# применит их к общему хранилищу одной заменой.
 class Settings:
     def __init__(self):
         self.settings_file = 'settings.json'
-        self.default_settings = {
-            'sample_rate': 44100,
-            'file_format': 'wav',
-            'silence_duration': 0.4,
-            'silence_threshold': -40,
-            'lambd': 0.8,
-            'tau': 0.5,
-            'solver': 'euler',
-            'nfe': 64,
-            'whisper_model_language': 'multilingual',
-            'whisper_model_size': 'base',
-            'whisper_language': 'original',
-            'silero_sample_rate': 24000,
-            'use_llm_for_ssml': False,
-            'tts_language': 'en',
-            'txt2img_provider': 'SD3',
-                
-            'num_inference_steps_sd3': 28,
-            'num_inference_steps_flux1-dev': 50,
-            'num_inference_steps_flux1-schnell': 4,
-            'guidance_scale_sd3': 7,
-            'guidance_scale_flux1-dev': 3.5,
-            'guidance_scale_flux1-schnell': 0,  
-                      
-            'num_images': 1,
-            'width': 1024,
-            'height': 1024,
-            'image_format': 'png',
-            'provider': 'ollama',  
-            'ollama_model':'aya:35b-23-q8_0',
-            'ollama_url': 'http://192.168.1.70:11434/api/generate',
-            'togetherai_model': 'meta-llama/Meta-Llama-3.1-70B-Instruct-Turbo', 
-            'together_api_key': '',
-            'groq_model':'llama3-8b-8192',
-            'groq_api_key': '',
-            'openAI_model': 'gpt-4o',
-            'openAI_api_key': '',
-            'transcription_provider': 'ollama',
-            'resemble_enhance_path': ''
-            
-        }
-        self.load_settings()
-    
+        self.default_settings = DEFAULT_SETTINGS
+        self._store = get_store(self.settings_file)
+        self._pending = {}
+        self._reset = False
+
+    @property
+    def settings(self):
+        if not self._pending and not self._reset:
+            return self._store.snapshot()
+        return {**(self.default_settings if self._reset else self._store.snapshot()), **self._pending}
+
     def load_settings(self):
-        if os.path.exists(self.settings_file):
-            with open(self.settings_file, 'r') as f:
-                loaded_settings = json.load(f)
-                self.settings = {**self.default_settings, **loaded_settings}
-        else:
-            self.settings = self.default_settings.copy()
+        # Несохранённые изменения отбрасываются, как при прежнем чтении файла
+        self._pending = {}
+        self._reset = False
+        self._store.reload()
 
     def save_settings(self):
-        with open(self.settings_file, 'w') as f:
-            json.dump(self.settings, f, indent=4)
+        self._store.commit(self._pending, reset=self._reset)
+        self._pending = {}
+        self._reset = False
 
     def get_setting(self, key):
-        return self.settings.get(key, self.default_settings.get(key))
+        if key in self._pending:
+            return self._pending[key]
+        if self._reset:
+            return self.default_settings.get(key)
+        return self._store.get(key)
 
     def update_setting(self, key, value):
-        self.settings[key] = value
+        self._pending[key] = value
+
+    def update_settings(self, changes):
+        # Несколько ключей одной заменой при сохранении: подписчики получают одно уведомление
+        self._pending.update(changes)
 
     def reset_to_default(self):
-        self.settings = self.default_settings.copy()
+        self._pending = {}
+        self._reset = True
+
+    def subscribe(self, callback):
+        self._store.subscribe(callback)
+
+    def unsubscribe(self, callback):
+        self._store.unsubscribe(callback)
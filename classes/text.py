@@ -1,35 +1,55 @@
 # classes/text.py
-from abc import ABC, abstractmethod
-import importlib
+import asyncio
+import difflib
 import logging
 import re
+import time
 import langid
-import os
-import subprocess
-import json
-from llm.providers.together import process_chunk 
-from llm.providers.groq import improve_text 
+from classes.settings import Settings
+from llm.providers import runtime
+from llm.providers.base import ProviderError
+from llm.providers.registry import PROVIDERS
+from llm.providers.router import get_llm
+from classes.chunker import Chunk, TokenChunker, count_tokens, split_sentences, token_budget
+from classes.edit_store import edit_store
 
+EDITED_TEXT_TAGS = re.compile(r'</?edited_text>|<[^>]*$')
+# Запас на шаблон чата и заголовки контекста в запросе
+PROMPT_OVERHEAD_TOKENS = 64
 
-class LLM(ABC):
-    @abstractmethod
-    def process_chunk(self, chunk, model, system_prompt, temperature, top_k, top_p, repeat_penalty, max_tokens):
-        pass
 
 class Text:
+    # Параметры выборки для редактирования по чанкам и генерации SSML
+    SAMPLING = {'temperature': 0.3, 'top_k': 40, 'top_p': 0.9, 'repeat_penalty': 1.2}
+
     def _initialize_llm(self, provider):
-        if provider == "ollama":
-            return OllamaLLM()
-        elif provider == "together":
-            return TogetherLLM()
-        else:
-            raise ValueError(f"Unsupported provider: {provider}")
+        # С заданными llm_fallback_providers запросы идут через маршрутизатор
+        return get_llm(provider)
+
     def __init__(self, provider="ollama"):
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unsupported provider: {provider}")
         self.provider = provider
-        self.llm = self._initialize_llm(provider)
+        self._llm = None
         logging.basicConfig(level=logging.DEBUG)
         self.logger = logging.getLogger(__name__)
         self.language = None
+        settings = Settings()
+        # Сколько чанков одновременно отправлять провайдеру и сколько раз повторять неудачный запрос
+        self.concurrency = max(1, int(settings.get_setting(f'{provider}_concurrency') or 1))
+        self.max_retries = max(0, int(settings.get_setting('llm_chunk_retries') or 0))
+        # Предел длины ответа и число предложений предыдущего чанка, передаваемых для контекста
+        self.max_tokens = int(settings.get_setting('llm_max_tokens') or 2048)
+        self.overlap_sentences = max(0, int(settings.get_setting('llm_chunk_overlap_sentences') or 0))
+        # Повторное редактирование документа отправляет в LLM только изменившиеся чанки
+        self.incremental = bool(settings.get_setting('llm_incremental_editing'))
+
+    @property
+    def llm(self):
+        # Провайдер и его SDK загружаются при первом запросе
+        if self._llm is None:
+            self._llm = self._initialize_llm(self.provider)
+        return self._llm
 
     def detect_language(self, text):
         # Здесь langid определит язык текста
@@ -57,8 +77,7 @@ class Text:
 
 
     def split_into_sentences(self, text):
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        return [s.strip() for s in sentences if s.strip()]
+        return split_sentences(text)
 
     def create_chunks(self, sentences, max_chunk_size=1000):
         chunks = []
@@ -80,122 +99,225 @@ class Text:
         return chunks
 
 
-    def enhance_text(self, text, model, system_prompt, chunk_size=1000):
+    def chunker(self, model=None, system_prompt=None):
+        # Чанки по бюджету токенов модели: в окно контекста помещаются приглашение,
+        # чанк и ответ не длиннее max_tokens
+        encoding = self.llm.tokenizer_encoding
+        prompt_tokens = count_tokens(self.llm.prompt_text(system_prompt), encoding) + PROMPT_OVERHEAD_TOKENS
+        budget = token_budget(self.llm.context_window(model), prompt_tokens, self.max_tokens)
+        self.logger.debug(f"Chunk budget for {self.provider}: {budget} tokens")
+        return TokenChunker(budget, encoding, self.overlap_sentences)
+
+    def plan_chunks(self, text, model=None, system_prompt=None):
+        return self.chunker(model, system_prompt).chunk(text)
+
+    def plan_incremental(self, text, previous, model=None, system_prompt=None):
+        # Сравнивает предложения текста с предложениями прошлого редактирования.
+        # Чанк, все предложения которого сохранились подряд и без вставок,
+        # переиспользуется вместе с ответом; остальные предложения между
+        # сохранёнными чанками делятся на новые чанки заново. Возвращает чанки
+        # и ответы по ним, None — чанк нужно отправить в LLM.
+        chunker = self.chunker(model, system_prompt)
+        units = list(chunker.units(split_sentences(text)))
+        sentences = [sentence for sentence, _ in units]
+        old = [sentence for chunk in previous for sentence in chunk['sentences']]
+
+        matched = {}
+        matcher = difflib.SequenceMatcher(None, old, sentences, autojunk=False)
+        for tag, old_start, old_end, new_start, _ in matcher.get_opcodes():
+            if tag == 'equal':
+                for offset in range(old_end - old_start):
+                    matched[old_start + offset] = new_start + offset
+
+        # Начало сохранённого чанка в новом тексте -> чанк
+        kept = {}
+        start = 0
+        for chunk in previous:
+            count = len(chunk['sentences'])
+            positions = [matched.get(index) for index in range(start, start + count)]
+            start += count
+            if chunk['edited'] is None or not count or None in positions:
+                continue
+            if positions == list(range(positions[0], positions[0] + count)):
+                kept[positions[0]] = chunk
+
+        chunks, edited = [], []
+        pending_start = 0
+        index = 0
+        while index <= len(units):
+            chunk = kept.get(index)
+            if chunk is None and index < len(units):
+                index += 1
+                continue
+            # Изменённый участок между сохранёнными чанками делится заново
+            if pending_start < index:
+                for new_chunk in chunker.chunk_units(units[pending_start:index], sentences[:pending_start]):
+                    chunks.append(new_chunk)
+                    edited.append(None)
+            if chunk is None:
+                break
+            count = len(chunk['sentences'])
+            chunks.append(Chunk(' '.join(chunk['sentences']), chunk['context'],
+                                sum(tokens for _, tokens in units[index:index + count]), chunk['sentences']))
+            edited.append(chunk['edited'])
+            index += count
+            pending_start = index
+        return chunks, edited
+
+    @staticmethod
+    def chunk_message(chunk):
+        if not chunk.context:
+            return chunk.text
+        return (f"Preceding text, for context only. Do not edit or repeat it:\n{chunk.context}\n\n"
+                f"Text to edit:\n{chunk.text}")
+
+    @staticmethod
+    def visible_text(response):
+        # Текст ответа без тегов <edited_text>, в том числе недописанного тега в конце
+        return EDITED_TEXT_TAGS.sub('', response)
+
+    def enhance_text(self, text, model, system_prompt, chunk_size=None, document_id=None):
+        cleaned_text = ""
+        for cleaned_text in self.enhance_text_stream(text, model, system_prompt, chunk_size, document_id):
+            pass
+        return cleaned_text
+
+    def enhance_text_stream(self, text, model, system_prompt, chunk_size=None, document_id=None):
+        # Отдаёт текст по мере генерации: чанки редактируются параллельно, и после
+        # каждого фрагмента ответа выводятся все чанки в исходном порядке.
+        # Последний элемент — итоговый очищенный текст. chunk_size задаёт прежнее
+        # деление по числу символов, без него чанки подбираются по токенам модели.
+        # С document_id границы чанков и ответы сохраняются, и при повторном
+        # редактировании того же документа в LLM уходят только изменённые чанки.
         self.logger.debug(f"Starting text enhancement. Text length: {len(text)}")
-        sentences = self.split_into_sentences(text)
-        self.logger.debug(f"Split into {len(sentences)} sentences")
-        chunks = self.create_chunks(sentences, chunk_size)
+        if document_id is not None and self.incremental and not chunk_size:
+            yield from self._enhance_incremental(text, model, system_prompt, document_id)
+            return
+        if chunk_size:
+            chunks = [Chunk(chunk) for chunk in self.create_chunks(self.split_into_sentences(text), chunk_size)]
+        else:
+            chunks = self.plan_chunks(text, model, system_prompt)
         self.logger.debug(f"Created {len(chunks)} chunks")
-        
-        edited_chunks = []
-
-        for i, chunk in enumerate(chunks):
-            self.logger.debug(f"Processing chunk {i+1}/{len(chunks)}")
-            edited_chunk = self.llm.process_chunk(
-                chunk=chunk,
-                model=model,
-                system_prompt=system_prompt,
-                temperature=0.3,
-                top_k=40,
-                top_p=0.9,
-                repeat_penalty=1.2,
-                max_tokens=2048
-            )
-            self.logger.debug(f"Chunk {i+1} processed. Original length: {len(chunk)}, Edited length: {len(edited_chunk)}")
-            self.logger.debug(f"Edited chunk {i+1}: {edited_chunk[:100]}...")  # Логируем начало отредактированного чанка
-            edited_chunks.append(edited_chunk)
-
-        final_edited_text = ' '.join(edited_chunks)
+        if not chunks:
+            yield self.clean_llm_response("")
+            return
+        self.logger.debug(f"Dispatching chunks with concurrency {self.concurrency}")
+        yield from runtime.iterate(self._enhance_chunks(chunks, model, system_prompt))
+
+    def _enhance_incremental(self, text, model, system_prompt, document_id):
+        key = edit_store.make_key(document_id, self.provider, self.llm.resolve_model(model), system_prompt)
+        previous = edit_store.get(key)
+        if previous:
+            chunks, buffers = self.plan_incremental(text, previous, model, system_prompt)
+        else:
+            chunks = self.plan_chunks(text, model, system_prompt)
+            buffers = [None] * len(chunks)
+        pending = sum(buffer is None for buffer in buffers)
+        self.logger.info(f"Incremental editing of {document_id}: {pending} of {len(chunks)} chunks changed")
+        if not chunks:
+            yield self.clean_llm_response("")
+            return
+
+        failed = set()
+        yield from runtime.iterate(self._enhance_chunks(chunks, model, system_prompt, buffers, failed))
+        edit_store.put(key, [
+            {'sentences': chunk.sentences, 'context': chunk.context, 'edited': None if index in failed else buffers[index]}
+            for index, chunk in enumerate(chunks)
+        ])
+
+    async def _enhance_chunks(self, chunks, model, system_prompt, buffers=None, failed=None):
+        # buffers — готовые ответы по чанкам, None — чанк нужно отредактировать;
+        # список заполняется ответами на месте. В failed попадают номера чанков,
+        # для которых после всех попыток оставлен исходный текст.
+        if buffers is None:
+            buffers = [None] * len(chunks)
+        pending = [index for index, buffer in enumerate(buffers) if buffer is None]
+        for index in pending:
+            buffers[index] = ""
+        changed = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def edit(index):
+            async with semaphore:
+                self.logger.debug(f"Processing chunk {index+1}/{len(chunks)}")
+                for attempt in range(self.max_retries + 1):
+                    buffers[index] = ""
+                    try:
+                        async for part in self.llm.stream(self.chunk_message(chunks[index]), model=model, system_prompt=system_prompt,
+                                                          max_tokens=self.max_tokens, **self.SAMPLING):
+                            buffers[index] += part
+                            changed.set()
+                        self.logger.debug(f"Chunk {index+1} processed. Original length: {len(chunks[index].text)}, Edited length: {len(buffers[index])}")
+                        return
+                    except ProviderError as e:
+                        self.logger.warning(f"Attempt {attempt + 1} failed with {self.provider}: {e}")
+                        if attempt < self.max_retries:
+                            await asyncio.sleep(2 ** attempt)
+                self.logger.error(f"Chunk {index+1}/{len(chunks)} failed after {self.max_retries + 1} attempts, keeping original text")
+                buffers[index] = chunks[index].text
+                if failed is not None:
+                    failed.add(index)
+                changed.set()
+
+        runner = asyncio.ensure_future(asyncio.gather(*(edit(index) for index in pending)))
+        preview = ""
+        try:
+            while not runner.done():
+                waiter = asyncio.ensure_future(changed.wait())
+                await asyncio.wait({runner, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                if changed.is_set() and not runner.done():
+                    changed.clear()
+                    current = ' '.join(' '.join(self.visible_text(buffer).split()) for buffer in buffers if buffer)
+                    if current.strip() and current != preview:
+                        preview = current
+                        yield preview
+            runner.result()
+        finally:
+            runner.cancel()
+
+        # Каждый ответ оборачивается в теги, как и раньше: clean_llm_response склеивает их
+        final_edited_text = ' '.join(f"<edited_text>{buffer}</edited_text>" for buffer in buffers)
         self.logger.debug(f"All chunks processed. Final text length: {len(final_edited_text)}")
-        self.logger.debug(f"Final edited text before cleaning: {final_edited_text[:200]}...")  # Логируем начало финального текста перед очисткой
         cleaned_text = self.clean_llm_response(final_edited_text)
         self.logger.debug(f"Text cleaned. Final cleaned text length: {len(cleaned_text)}")
-        self.logger.debug(f"Final cleaned text: {cleaned_text[:200]}...")  # Логируем начало очищенного текста
-        return cleaned_text
+        yield cleaned_text
+
+    def edit_text_stream(self, text):
+        # Весь текст одним запросом с приглашением провайдера по умолчанию; при ошибке
+        # возвращается исходный текст
+        response = preview = ""
+        try:
+            for part in runtime.iterate(self.llm.stream(text)):
+                response += part
+                current = self.visible_text(response)
+                if current.strip() and current != preview:
+                    preview = current
+                    yield preview
+        except ProviderError as e:
+            self.logger.error(f"Error editing text with {self.provider}: {e}")
+            yield text
+            return
+        yield self.visible_text(response).strip()
+
+    def _process_chunk_with_retry(self, chunk, model, system_prompt):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return runtime.run(self.llm.complete(chunk, model=model, system_prompt=system_prompt,
+                                                     max_tokens=self.max_tokens, **self.SAMPLING))
+            except ProviderError as e:
+                self.logger.warning(f"Attempt {attempt + 1} failed with {self.provider}: {e}")
+                if attempt < self.max_retries:
+                    time.sleep(2 ** attempt)
+        return None
 
     def generate_ssml(self, text, model):
         # Обновляем системное приглашение для корректной генерации SSML
         ssml_prompt = "You are an expert in generating SSML (Speech Synthesis Markup Language) for text-to-speech systems. Your task is to take the given text and convert it into SSML format, adding appropriate tags to enhance the speech output. Focus on adding tags for emphasis, pauses, and pronunciation where necessary."
         
         self.logger.debug(f"Generating SSML for text: {text[:100]}...")
-        ssml = self.llm.process_chunk(
-            chunk=text,
-            model=model,
-            system_prompt=ssml_prompt,  # Используем ssml_prompt
-            temperature=0.3,
-            top_k=40,
-            top_p=0.9,
-            repeat_penalty=1.2,
-            max_tokens=2048
-        )
+        ssml = self._process_chunk_with_retry(text, model, ssml_prompt)
+        if ssml is None:
+            ssml = text
         self.logger.debug(f"Generated SSML: {ssml[:100]}...")
         return ssml
-
-
-class OllamaLLM(LLM):
-    def process_chunk(self, chunk, model, system_prompt, temperature, top_k, top_p, repeat_penalty, max_tokens):
-        logger = logging.getLogger(__name__)
-        logger.debug(f"Processing chunk with Ollama. Chunk length: {len(chunk)}")
-        try:
-            from llm.providers import ollama
-            result = ollama.process_chunk(
-                chunk=chunk,
-                model=model,
-                system_prompt=system_prompt,
-                temperature=temperature,
-                top_k=top_k,
-                top_p=top_p,
-                repeat_penalty=repeat_penalty,
-                max_tokens=max_tokens
-            )
-            logger.debug(f"Chunk processed successfully. Result length: {len(result)}")
-            return result
-        except Exception as e:
-            logger.error(f"Error processing chunk with Ollama: {e}")
-            return chunk
-class TogetherLLM(LLM):
-    def process_chunk(self, chunk, model, system_prompt, temperature, top_k, top_p, repeat_penalty, max_tokens):
-        logger = logging.getLogger(__name__)
-        logger.debug(f"Processing chunk with Together. Chunk length: {len(chunk)}")
-        try:
-            # Импортируйте библиотеку или используйте API для работы с Together.
-            from llm.providers import together
-            result = together.process_chunk(
-                chunk=chunk,
-                model=model,
-                system_prompt=system_prompt,
-                temperature=temperature,
-                top_k=top_k,
-                top_p=top_p,
-                repeat_penalty=repeat_penalty,
-                max_tokens=max_tokens
-            )
-            logger.debug(f"Chunk processed successfully. Result length: {len(result)}")
-            return result
-        except Exception as e:
-            logger.error(f"Error processing chunk with Together: {e}")
-            return chunk
-
-class GROQLLM(LLM):
-    def process_chunk(self, chunk, model, system_prompt, temperature, top_k, top_p, repeat_penalty, max_tokens):
-        logger = logging.getLogger(__name__)
-        logger.debug(f"Processing chunk with Groq. Chunk length: {len(chunk)}")
-        try:
-            # Импортируйте библиотеку или используйте API для работы с Together.
-            from llm.providers import groq
-            result = groq.improve_text(
-                chunk=chunk,
-                model=model,
-                system_prompt=system_prompt,
-                temperature=temperature,
-                top_k=top_k,
-                top_p=top_p,
-                repeat_penalty=repeat_penalty,
-                max_tokens=max_tokens
-            )
-            logger.debug(f"Chunk processed successfully. Result length: {len(result)}")
-            return result
-        except Exception as e:
-            logger.error(f"Error processing chunk with Groq: {e}")
-            return chunk
-
@@ -0,0 +1,103 @@
+# classes/transcription_cache.py
+import os
+import json
+import hashlib
+import logging
+import threading
+import numpy as np
+from classes.settings import Settings, resolve_path
+
+logger = logging.getLogger(__name__)
+
+
+# Дисковый кэш результатов Whisper. Ключ — хэш PCM входного аудио вместе с
+# параметрами предобработки и модели, значение — текст и сегменты в формате
+# whisper_to_json_raw. Время последнего обращения хранится в mtime файла,
+# по нему вытесняются самые старые записи при превышении лимита размера.
+class TranscriptionCache:
+    def __init__(self, cache_dir=None, max_size_mb=None):
+        settings = Settings()
+        self.cache_dir = cache_dir or resolve_path(settings.get_setting('transcription_cache_dir'))
+        self.max_size_mb = max_size_mb if max_size_mb is not None else settings.get_setting('transcription_cache_max_mb')
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(audio_input, params):
+        rate, data = audio_input
+        data = np.ascontiguousarray(data)
+        digest = hashlib.sha256()
+        digest.update(f"{rate}:{data.dtype}:{data.shape}".encode())
+        digest.update(memoryview(data).cast('B'))
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Corrupted transcription cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+    def put(self, key, text, segments):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'text': text, 'segments': segments}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            limit = self.max_size_mb * 1024 * 1024
+            for _, size, path in entries:
+                if total <= limit:
+                    break
+                self._remove(path)
+                total -= size
+
+    def clear(self):
+        with self._lock:
+            entries = self._entries()
+            for _, _, path in entries:
+                self._remove(path)
+            return len(entries)
+
+    def size_mb(self):
+        return sum(size for _, size, _ in self._entries()) / (1024 * 1024)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+transcription_cache = TranscriptionCache()
@@ -1,10 +1,19 @@
 # classes/txt2img.py
 import os
+import re
+import queue
+import random
 import subprocess
-import shutil
-from datetime import datetime
+import threading
+from concurrent.futures import wait
 from classes.settings import Settings
-import urllib.request
+from classes.workspace import workspaces
+from classes.sd_worker import bindings_available, get_image_worker
+from classes.downloader import downloads
+from classes.image_cache import image_cache
+
+# sd печатает путь каждого сохранённого изображения пачки
+SAVED_IMAGE_PATTERN = re.compile(r"save result (?:\w+ )?image to '(.+)'")
 
 
 class Text2ImageProcessor:
@@ -56,25 +65,21 @@ class Text2ImageProcessor:
         self.model_file = model_info.get("model_file") if self.provider == "SD3" else model_info.get("model_file")
         self.model_path = model_path if model_path else os.path.join(self.models_dir, self.model_file)
 
-        # Проверка и загрузка основной модели
-        if not os.path.exists(self.model_path):
+        # Недостающие файлы качаются в фоне, генерация дожидается их в wait_for_models()
+        self.downloads = []
+        if not downloads.is_complete(self.model_path):
             self.download_model(model_info)
 
         # Дополнительные файлы для Flux
         self.additional_files = model_info.get("additional_files", {})
         for file_name, url in self.additional_files.items():
             file_path = os.path.join(self.models_dir, file_name)
-            if not os.path.exists(file_path):
+            if not downloads.is_complete(file_path):
                 self.download_file(url, file_path)
 
     def download_file(self, url, destination):
         print(f"Скачивание {url} в {destination}...")
-        try:
-            with urllib.request.urlopen(url) as response, open(destination, 'wb') as out_file:
-                shutil.copyfileobj(response, out_file)
-            print(f"Скачивание завершено: {destination}")
-        except Exception as e:
-            raise RuntimeError(f"Не удалось скачать файл {url}. Ошибка: {e}")
+        self.downloads.append((url, downloads.submit(url, destination)))
 
     def download_model(self, model_info):
         download_url = model_info.get("download_url")
@@ -82,28 +87,154 @@ class Text2ImageProcessor:
             raise ValueError(f"No download URL provided for provider {self.provider}")
         self.download_file(download_url, self.model_path)
 
+    def wait_for_models(self, progress_callback=None):
+        # progress_callback(файл, скачано байт, всего байт) вызывается раз в секунду,
+        # пока идут загрузки
+        for url, future in self.downloads:
+            while progress_callback and not wait([future], timeout=1).done:
+                for destination, (done, total) in downloads.status().items():
+                    if done != total:
+                        progress_callback(os.path.basename(destination), done, total)
+            try:
+                future.result()
+            except Exception as e:
+                raise RuntimeError(f"Не удалось скачать файл {url}. Ошибка: {e}")
+
     def generate_image(self, prompt, negative_prompt, num_inference_steps, guidance_scale, width, height, num_images=1,
-                       image_format="png"):
-        output_dir = "output"
-        os.makedirs(output_dir, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+                       image_format="png", seed=None):
+        image_paths = []
+        for image_paths in self.generate_image_stream(prompt, negative_prompt, num_inference_steps, guidance_scale,
+                                                      width, height, num_images, image_format, seed):
+            pass
+        return image_paths
+
+    def generate_image_stream(self, prompt, negative_prompt, num_inference_steps, guidance_scale, width, height,
+                              num_images=1, image_format="png", seed=None, progress_callback=None):
+        # После каждого сохранённого изображения отдаётся список готовых путей.
+        self.wait_for_models(progress_callback)
+        num_images = int(num_images)
+        # sd выбирает случайный seed по времени, поэтому базовый seed задаём сами:
+        # изображение i получает seed + i. seed=None — значение из настроек,
+        # отрицательный — случайный
+        if seed is None:
+            seed = self.settings.get_setting('seed')
+        seed = int(seed) if seed is not None else -1
+        cache_key = None
+        if seed < 0:
+            seed = random.randrange(2 ** 31 - num_images)
+        elif image_cache.enabled():
+            # С фиксированным seed результат детерминирован и берётся из кэша
+            cache_key = image_cache.make_key(self.provider, self.model_files(), prompt, negative_prompt,
+                                             num_inference_steps, guidance_scale, width, height, seed, image_format,
+                                             num_images)
+            cached = image_cache.get(cache_key)
+            if cached:
+                yield cached
+                return
 
         image_paths = []
-        for i in range(num_images):
-            output_path = os.path.join(output_dir, f"generated_image_{timestamp}_{i}.{image_format}")
-            command = self.build_command(prompt, negative_prompt, num_inference_steps, guidance_scale, width, height,
-                                         output_path)
+        for image_paths in self._generate(prompt, negative_prompt, num_inference_steps, guidance_scale, width, height,
+                                          num_images, image_format, seed):
+            yield image_paths
+        if cache_key and len(image_paths) == num_images:
+            image_cache.put(cache_key, image_paths)
 
+    def model_files(self):
+        return [self.model_path] + [os.path.join(self.models_dir, file_name) for file_name in self.additional_files]
+
+    def _generate(self, prompt, negative_prompt, num_inference_steps, guidance_scale, width, height, num_images,
+                  image_format, seed):
+        output_dir = workspaces.create_output('images')
+        if self.settings.get_setting('sd_resident') and bindings_available():
+            # Модель живёт в процессе-воркере, запрос стоит только сэмплирования
+            image_paths = []
             try:
-                print(f"Выполнение команды: {' '.join(command)}")
-                subprocess.run(command, check=True)
-                image_paths.append(output_path)
-            except subprocess.CalledProcessError as e:
-                print(f"Ошибка при генерации изображения {i + 1}: {e}")
+                worker = get_image_worker(self.resident_config())
+                params = {
+                    'prompt': prompt,
+                    'negative_prompt': negative_prompt or "",
+                    'cfg_scale': guidance_scale,
+                    'width': int(width),
+                    'height': int(height),
+                    'sample_method': "euler",
+                    'sample_steps': int(num_inference_steps),
+                }
+                output_paths = [os.path.join(output_dir, f"generated_image_{i}.{image_format}") for i in range(num_images)]
+                for image_paths in worker.generate(params, range(seed, seed + num_images), output_paths):
+                    yield image_paths
+                return
+            except RuntimeError as e:
+                print(f"Ошибка резидентного sd: {e}")
+                if image_paths:
+                    return
+                print("Переключение на запуск bin/sd")
 
-        return image_paths
+        yield from self._generate_with_cli(prompt, negative_prompt, num_inference_steps, guidance_scale, width, height,
+                                           num_images, image_format, output_dir, seed)
+
+    def resident_config(self):
+        config = {'n_threads': self.settings.get_setting('sd_threads') or -1}
+        if self.provider == "SD3":
+            config.update(model_path=self.model_path, keep_clip_on_cpu=True)
+        else:
+            config.update(
+                diffusion_model_path=self.model_path,
+                clip_l_path=os.path.join(self.models_dir, "clip_l.safetensors"),
+                t5xxl_path=os.path.join(self.models_dir, "t5xxl_fp16.safetensors"),
+                vae_path=os.path.join(self.models_dir, "ae.safetensors")
+            )
+        return config
+
+    def _generate_with_cli(self, prompt, negative_prompt, num_inference_steps, guidance_scale, width, height,
+                           num_images, image_format, output_dir, seed):
+        # Изображения делятся между sd_processes процессами sd, каждый генерирует свою
+        # пачку за один запуск (--batch-count), так что модели загружаются один раз на процесс.
+        # Внутри пачки sd использует seed + i, пачки не пересекаются.
+        processes = max(1, min(int(self.settings.get_setting('sd_processes') or 1), num_images))
+        threads = self.settings.get_setting('sd_threads') or max(1, (os.cpu_count() or 1) // processes)
+
+        events = queue.Queue()
+        first_image = 0
+        for index in range(processes):
+            batch_count = num_images // processes + (1 if index < num_images % processes else 0)
+            output_path = os.path.join(output_dir, f"generated_image_{index}.{image_format}")
+            command = self.build_command(prompt, negative_prompt, num_inference_steps, guidance_scale, width, height,
+                                         output_path, batch_count=batch_count, seed=seed + first_image, threads=threads)
+            print(f"Выполнение команды: {' '.join(command)}")
+            threading.Thread(target=self._run_sd, args=(command, events), daemon=True).start()
+            first_image += batch_count
+
+        image_paths = []
+        running = processes
+        while running:
+            event, value = events.get()
+            if event == 'image':
+                image_paths.append(value)
+                yield list(image_paths)
+            else:
+                running -= 1
+                if value != 0:
+                    print(f"Ошибка при генерации изображений: sd завершился с кодом {value}")
+        yield image_paths
+
+    @staticmethod
+    def _run_sd(command, events):
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                       errors='replace')
+        except OSError as e:
+            print(f"Ошибка запуска sd: {e}")
+            events.put(('done', -1))
+            return
+        for line in process.stdout:
+            match = SAVED_IMAGE_PATTERN.search(line)
+            if match and os.path.exists(match.group(1)):
+                events.put(('image', match.group(1)))
+        process.stdout.close()
+        events.put(('done', process.wait()))
 
-    def build_command(self, prompt, negative_prompt, num_inference_steps, guidance_scale, width, height, output_path):
+    def build_command(self, prompt, negative_prompt, num_inference_steps, guidance_scale, width, height, output_path,
+                      batch_count=1, seed=None, threads=None):
         sd_executable = os.path.join(os.getcwd(), "bin", "sd")
         if not os.path.exists(sd_executable):
             raise FileNotFoundError(f"Исполняемый файл 'sd' не найден по пути: {sd_executable}")
@@ -119,7 +250,8 @@ class Text2ImageProcessor:
                 "--sampling-method", "euler",
                 "-H", str(height),
                 "-W", str(width),
-                "--seed", str(self.settings.get_setting('seed') or -1),
+                "--seed", str(seed if seed is not None else self.settings.get_setting('seed') or -1),
+                "--batch-count", str(batch_count),
                 "-o", output_path,
                 "--clip-on-cpu"
             ]
@@ -135,7 +267,8 @@ class Text2ImageProcessor:
                 "--sampling-method", "euler",
                 "-H", str(height),
                 "-W", str(width),
-                "--seed", str(self.settings.get_setting('seed') or -1),
+                "--seed", str(seed if seed is not None else self.settings.get_setting('seed') or -1),
+                "--batch-count", str(batch_count),
                 "-o", output_path,
                 "-v"
             ]
@@ -143,4 +276,6 @@ class Text2ImageProcessor:
         else:
             raise ValueError(f"Unsupported provider: {self.provider}")
 
+        if threads:
+            base_command += ["--threads", str(threads)]
         return base_command
\ No newline at end of file
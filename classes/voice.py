@@ -1,17 +1,114 @@
-import torch
 import soundfile as sf
 import os
-from datetime import datetime
 from pathlib import Path
 import numpy as np
 import logging
+import threading
+from contextlib import contextmanager
+from classes.settings import Settings, resolve_path
+from classes.workspace import workspaces
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Модель Silero для каждого языка и её спикеры; список спикеров доступен без загрузки модели
+SILERO_MODELS = {
+    'ru': 'v4_ru',
+    'en': 'v3_en',
+    'de': 'v3_de',
+    'es': 'v3_es',
+    'fr': 'v3_fr',
+}
+
+SILERO_SPEAKERS = {
+    'ru': ['aidar', 'baya', 'kseniya', 'xenia', 'eugene', 'random'],
+    'en': [f'en_{i}' for i in range(118)] + ['random'],
+    'de': ['bernd_ungerer', 'eva_k', 'friedrich', 'hokuspokus', 'karlsson', 'random'],
+    'es': ['es_0', 'es_1', 'es_2', 'random'],
+    'fr': ['fr_0', 'fr_1', 'fr_2', 'fr_3', 'fr_4', 'fr_5', 'random'],
+}
+
+
+class SileroModelPool:
+    def __init__(self, models_dir=None):
+        self.models_dir = models_dir or resolve_path(Settings().get_setting('silero_models_dir'))
+        self._models = {}
+        self._model_locks = {}
+        self._usage_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, language, device):
+        key = (language, str(device))
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+            model_lock = self._model_locks.setdefault(key, threading.Lock())
+
+        with model_lock:
+            with self._lock:
+                if key in self._models:
+                    return self._models[key]
+            model, utils = self.load_model(language)
+            model.to(device)
+            with self._lock:
+                self._models[key] = (model, utils)
+        return model, utils
+
+    @contextmanager
+    def use(self, language, device):
+        # Модель общая для всех запросов: синтез на ней выполняется по одному
+        with self._lock:
+            usage_lock = self._usage_locks.setdefault((language, str(device)), threading.Lock())
+        with usage_lock:
+            yield self.get(language, device)
+
+    def load_model(self, language):
+        if language not in SILERO_MODELS:
+            raise ValueError(f"Unsupported TTS language: {language}")
+        model_id = SILERO_MODELS[language]
+
+        # Локальный файл модели избавляет от обращения к torch.hub
+        local_file = os.path.join(self.models_dir, f"{model_id}.pt") if self.models_dir else None
+        if local_file and os.path.exists(local_file):
+            print(f"Loading Silero TTS model {model_id} from {local_file}...")
+            from torch.package import PackageImporter
+            importer = PackageImporter(local_file)
+            model = importer.load_pickle("tts_models", "model")
+            return model, None
+
+        print(f"Loading Silero TTS model {model_id} for language {language}...")
+        import torch
+        model, utils = torch.hub.load(
+            repo_or_dir='snakers4/silero-models',
+            model='silero_tts',
+            language=language,
+            speaker=model_id
+        )
+        print("Model loaded successfully.")
+        return model, utils
+
+    def preload(self, languages, device='cuda'):
+        device = resolve_device(device)
+        for language in languages:
+            try:
+                self.get(language, device)
+            except Exception as e:
+                logger.error(f"Failed to preload Silero model for {language}: {e}")
+
+
+def resolve_device(device):
+    import torch
+    if str(device).startswith('cuda') and not torch.cuda.is_available():
+        return torch.device('cpu')
+    return torch.device(device)
+
+
+silero_pool = SileroModelPool()
+
+
 class Voice:
     def __init__(self, language='ru', speaker=None, device='cuda'):
-        self.device = torch.device(device)
+        self.device = resolve_device(device)
         self.sample_rate = 48000
         self.language = language
         self.speaker = speaker
@@ -23,30 +120,19 @@ class Voice:
         self.project_root = Path(__file__).parent.parent
 
     def load_model(self):
-        print(f"Loading Silero TTS model for language {self.language} and speaker {self.speaker}...")
-        model, utils = torch.hub.load(
-            repo_or_dir='snakers4/silero-models',
-            model='silero_tts',
-            language=self.language,
-            speaker=self.speaker
-        )
-        model.to(self.device)
-        print("Model loaded successfully.")
-        return model, utils
+        return silero_pool.get(self.language, self.device)
 
     def generate_audio(self, text):
         print(f"Generating audio for text: {text[:30]}...")
-        audio = self.model.apply_tts(text=text, 
-                                     speaker=self.speaker, 
-                                     sample_rate=self.sample_rate)
+        with silero_pool.use(self.language, self.device) as (model, _):
+            audio = model.apply_tts(text=text,
+                                    speaker=self.speaker,
+                                    sample_rate=self.sample_rate)
         self.save_raw_audio(audio)
         return audio
     
     def save_raw_audio(self, audio):
-        timestamp = datetime.now().strftime("%d%m%y_%H%M%S")
-        output_dir = self.project_root / "output" / "tts" / timestamp
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
+        output_dir = Path(workspaces.create_output('tts'))
         output_path = output_dir / "output.wav"
         audio_numpy = audio.cpu().numpy()
 
@@ -63,7 +149,8 @@ class Voice:
         return self.audio_file
 
     def get_available_speakers(self):
-        # Код для получения списка спикеров
-#       return ['v4_ru', 'v3_1_ru', 'ru_v3', 'aidar_v2', 'aidar_8khz', 'aidar_16khz', 'baya_v2', 'baya_8khz', 'baya_16khz', 'irina_v2', 'irina_8khz', 'irina_16khz', 'kseniya_v2', 'kseniya_8khz', 'kseniya_16khz', 'natasha_v2', 'natasha_8khz', 'natasha_16khz', 'ruslan_v2', 'ruslan_8khz', 'ruslan_16khz', 'v3_en', 'v3_en_indic', 'lj_v2', 'lj_8khz', 'lj_16khz', 'v3_de', 'thorsten_v2', 'thorsten_8khz', 'thorsten_16khz', 'v3_es', 'tux_v2', 'tux_8khz', 'tux_16khz', 'v3_fr', 'gilles_v2', 'gilles_8khz', 'gilles_16khz', 'aigul_v2', 'v3_xal', 'erdni_v2', 'v3_tt', 'dilyara_v2', 'v4_uz', 'v3_uz', 'dilnavoz_v2', 'v4_ua', 'v3_ua', 'mykyta_v2', 'v4_indic', 'v3_indic', 'v4_cyrillic', 'multi_v2']
+        return get_available_speakers(self.language)
+
 
-        return ['aidar', 'baya', 'kseniya', 'xenia', 'eugene', 'random']
+def get_available_speakers(language='ru'):
+    return SILERO_SPEAKERS.get(language, SILERO_SPEAKERS['ru'])
@@ -0,0 +1,126 @@
+# classes/workspace.py
+import os
+import time
+import uuid
+import shutil
+import logging
+import threading
+from datetime import datetime
+from classes.settings import Settings, resolve_path
+
+logger = logging.getLogger(__name__)
+
+
+# Рабочие каталоги запросов. Каждый запрос получает свой уникальный каталог
+# <корень>/<вид>/<время>_<uuid>; небольшие временные данные можно разместить
+# на tmpfs. Фоновый сборщик удаляет каталоги старше заданного возраста и самые
+# старые каталоги при превышении квоты корня.
+class WorkspaceManager:
+    def __init__(self):
+        settings = Settings()
+        self.scratch_root = resolve_path(settings.get_setting('workspace_root'))
+        self.tmpfs_root = resolve_path(settings.get_setting('workspace_tmpfs_root'))
+        self.tmpfs_max_mb = settings.get_setting('workspace_tmpfs_max_mb')
+        self.output_root = resolve_path(settings.get_setting('output_root'))
+        self.policies = {
+            self.scratch_root: (settings.get_setting('workspace_max_age_hours'), settings.get_setting('workspace_quota_mb')),
+            self.tmpfs_root: (settings.get_setting('workspace_max_age_hours'), settings.get_setting('workspace_tmpfs_quota_mb')),
+            self.output_root: (settings.get_setting('output_max_age_hours'), settings.get_setting('output_quota_mb')),
+        }
+        self.gc_interval = settings.get_setting('workspace_gc_interval_seconds')
+        self._lock = threading.Lock()
+        self._gc_thread = None
+
+    @staticmethod
+    def _unique_dir(root, kind):
+        name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        path = os.path.join(root, kind, name)
+        os.makedirs(path)
+        return path
+
+    def _tmpfs_fits(self, expected_mb):
+        if not self.tmpfs_root or expected_mb is None or expected_mb > self.tmpfs_max_mb:
+            return False
+        parent = os.path.dirname(os.path.abspath(self.tmpfs_root))
+        if not os.path.isdir(parent) or not os.access(parent, os.W_OK):
+            return False
+        return shutil.disk_usage(parent).free / (1024 * 1024) > expected_mb * 2
+
+    def create(self, kind, expected_mb=None):
+        # Временный каталог; expected_mb — оценка объёма, по ней выбирается tmpfs
+        if self._tmpfs_fits(expected_mb):
+            try:
+                return self._unique_dir(self.tmpfs_root, kind)
+            except OSError as e:
+                logger.warning(f"tmpfs workspace unavailable, using disk: {e}")
+        return self._unique_dir(self.scratch_root, kind)
+
+    def create_output(self, kind):
+        # Каталог для результатов, которые отдаются пользователю
+        return self._unique_dir(self.output_root, kind)
+
+    @staticmethod
+    def _workspaces(root):
+        # (время последнего изменения, размер, путь) для каждого каталога корня
+        if not os.path.isdir(root):
+            return []
+        entries = []
+        for kind in os.listdir(root):
+            kind_dir = os.path.join(root, kind)
+            if not os.path.isdir(kind_dir):
+                continue
+            for name in os.listdir(kind_dir):
+                path = os.path.join(kind_dir, name)
+                if not os.path.isdir(path):
+                    continue
+                latest, size = os.stat(path).st_mtime, 0
+                for directory, _, files in os.walk(path):
+                    for file_name in files:
+                        try:
+                            stat = os.stat(os.path.join(directory, file_name))
+                        except FileNotFoundError:
+                            continue
+                        latest = max(latest, stat.st_mtime)
+                        size += stat.st_size
+                entries.append((latest, size, path))
+        return entries
+
+    def collect(self):
+        removed = 0
+        now = time.time()
+        with self._lock:
+            for root, (max_age_hours, quota_mb) in self.policies.items():
+                if not root:
+                    continue
+                entries = sorted(self._workspaces(root))
+                total = sum(size for _, size, _ in entries)
+                for latest, size, path in entries:
+                    expired = max_age_hours and now - latest > max_age_hours * 3600
+                    # Каталоги, изменённые с прошлого прохода, считаются занятыми и по квоте не удаляются
+                    over_quota = quota_mb and total > quota_mb * 1024 * 1024 and now - latest > self.gc_interval
+                    if not (expired or over_quota):
+                        continue
+                    shutil.rmtree(path, ignore_errors=True)
+                    total -= size
+                    removed += 1
+        if removed:
+            logger.info(f"Workspace GC removed {removed} directories")
+        return removed
+
+    def start_gc(self):
+        if self._gc_thread is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.collect()
+                except Exception as e:
+                    logger.warning(f"Workspace GC failed: {e}")
+                time.sleep(self.gc_interval)
+
+        self._gc_thread = threading.Thread(target=loop, daemon=True)
+        self._gc_thread.start()
+
+
+workspaces = WorkspaceManager()
@@ -0,0 +1,152 @@
+# llm/providers/base.py
+import time
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from classes.settings import Settings
+from llm.providers.cache import llm_cache
+from llm.providers.clients import get_timeout
+from llm.providers.health import health
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderError(RuntimeError):
+    pass
+
+
+class ProviderTimeout(ProviderError):
+    pass
+
+
+# Общий асинхронный интерфейс провайдеров LLM. Провайдер реализует _stream —
+# асинхронный генератор фрагментов ответа; stream и complete добавляют к нему
+# кэш ответов, таймаут ожидания очередного фрагмента и единое исключение
+# ProviderError для любых ошибок сети и API. Задержка до первого фрагмента
+# и ошибки запросов без кэша учитываются в health для маршрутизации.
+# Параметры выборки, равные None, провайдеру не передаются — действуют
+# значения по умолчанию его API.
+class LLMProvider(ABC):
+    name = None
+    model_setting = None
+    default_prompt = None
+    cacheable = True
+    # Окно контекста по умолчанию и кодировка tiktoken для подсчёта токенов
+    # (None — оценка по числу символов)
+    default_context_window = 8192
+    tokenizer_encoding = None
+
+    def resolve_model(self, model=None):
+        return model or Settings().get_setting(self.model_setting)
+
+    def context_window(self, model=None):
+        # Окна отдельных моделей задаются в настройке llm_context_windows
+        windows = Settings().get_setting('llm_context_windows') or {}
+        return int(windows.get(self.resolve_model(model)) or self.default_context_window)
+
+    def prompt_text(self, system_prompt=None):
+        # Текст, который провайдер добавляет к чанку в каждом запросе
+        return system_prompt or self.default_prompt or ""
+
+    async def health_check(self):
+        # Быстрая проверка доступности без генерации текста
+        return True
+
+    @abstractmethod
+    def _stream(self, chunk, model, system_prompt, options):
+        pass
+
+    async def stream(self, chunk, model=None, system_prompt=None, temperature=None, top_k=None, top_p=None,
+                     repeat_penalty=None, max_tokens=None):
+        model = self.resolve_model(model)
+        options = {
+            key: value for key, value in (
+                ('temperature', temperature), ('top_k', top_k), ('top_p', top_p),
+                ('repeat_penalty', repeat_penalty), ('max_tokens', max_tokens)
+            ) if value is not None
+        }
+        cache_key = llm_cache.make_key(self.name, model, system_prompt or self.default_prompt, chunk,
+                                       temperature, top_k, top_p, max_tokens)
+        cached = await asyncio.to_thread(llm_cache.get, cache_key) if self.cacheable else None
+        if cached is not None:
+            yield cached
+            return
+
+        _, read_timeout = get_timeout()
+        parts = []
+        started = time.monotonic()
+        iterator = self._stream(chunk, model, system_prompt, options)
+        try:
+            while True:
+                try:
+                    part = await asyncio.wait_for(iterator.__anext__(), read_timeout)
+                except StopAsyncIteration:
+                    break
+                if part:
+                    if not parts:
+                        health.record_latency(self.name, time.monotonic() - started)
+                    parts.append(part)
+                    yield part
+        except ProviderError:
+            health.record_failure(self.name)
+            raise
+        except asyncio.TimeoutError as e:
+            health.record_failure(self.name)
+            raise ProviderTimeout(f"{self.name}: no response for {read_timeout}s") from e
+        except Exception as e:
+            health.record_failure(self.name)
+            # Таймауты httpx и SDK (ReadTimeout, APITimeoutError) не наследуют TimeoutError
+            error = ProviderTimeout if 'Timeout' in type(e).__name__ else ProviderError
+            raise error(f"{self.name}: {str(e) or type(e).__name__}") from e
+        finally:
+            await iterator.aclose()
+        health.record_success(self.name)
+
+        if parts and self.cacheable:
+            await asyncio.to_thread(llm_cache.put, cache_key, self.name, model, ''.join(parts))
+
+    async def complete(self, chunk, **options):
+        return ''.join([part async for part in self.stream(chunk, **options)])
+
+
+# Провайдеры с API чатов в стиле OpenAI (Groq, OpenAI, TogetherAI)
+class ChatProvider(LLMProvider):
+    # Параметры выборки, которые принимает API провайдера: имя у нас -> имя в API
+    supported_options = {'temperature': 'temperature', 'top_p': 'top_p', 'max_tokens': 'max_tokens'}
+    # Приглашение по умолчанию отправляется системным сообщением, иначе — префиксом к тексту
+    prompt_as_system = False
+
+    @abstractmethod
+    def client(self):
+        pass
+
+    async def health_check(self):
+        # Список моделей — самый дешёвый запрос, проверяющий и сеть, и ключ API
+        if not Settings().get_setting(f'{self.name}_api_key'):
+            return False
+        try:
+            await self.client().models.list()
+            return True
+        except Exception as e:
+            logger.debug(f"Health check of {self.name} failed: {e}")
+            return False
+
+    def _messages(self, chunk, system_prompt):
+        if system_prompt or self.prompt_as_system:
+            return [
+                {"role": "system", "content": system_prompt or self.default_prompt},
+                {"role": "user", "content": chunk},
+            ]
+        return [{"role": "user", "content": f"{self.default_prompt} {chunk}"}]
+
+    async def _stream(self, chunk, model, system_prompt, options):
+        kwargs = {self.supported_options[key]: value for key, value in options.items() if key in self.supported_options}
+        stream = await self.client().chat.completions.create(
+            model=model,
+            messages=self._messages(chunk, system_prompt),
+            stream=True,
+            **kwargs
+        )
+        async for part in stream:
+            if part.choices and part.choices[0].delta.content:
+                yield part.choices[0].delta.content
@@ -0,0 +1,123 @@
+# llm/providers/cache.py
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from classes.settings import Settings, resolve_path
+
+logger = logging.getLogger(__name__)
+
+
+# Постоянный кэш ответов LLM перед всеми провайдерами. Ключ — хэш
+# (provider, model, prompt, chunk, temperature, top_k, top_p, max_tokens),
+# записи устаревают по TTL и вытесняются по времени последнего обращения.
+class LLMCache:
+    EVICT_EVERY = 100
+
+    def __init__(self, path=None, ttl_hours=None, max_entries=None):
+        settings = Settings()
+        self.path = path or resolve_path(settings.get_setting('llm_cache_path'))
+        self.ttl_hours = ttl_hours if ttl_hours is not None else settings.get_setting('llm_cache_ttl_hours')
+        self.max_entries = max_entries if max_entries is not None else settings.get_setting('llm_cache_max_entries')
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._initialized = False
+
+    def enabled(self):
+        return bool(Settings().get_setting('llm_cache_enabled'))
+
+    @staticmethod
+    def make_key(provider, model, prompt, chunk, temperature=None, top_k=None, top_p=None, max_tokens=None):
+        payload = json.dumps(
+            [provider, model, prompt, chunk, temperature, top_k, top_p, max_tokens],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        with self._lock:
+            if not self._initialized:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, provider TEXT, model TEXT, response TEXT, "
+                    "created_at REAL, accessed_at REAL)"
+                )
+                connection.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+                connection.commit()
+                self._initialized = True
+        return connection
+
+    def get(self, key):
+        if not self.enabled():
+            return None
+        try:
+            connection = self._connection()
+            row = connection.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            now = time.time()
+            if self.ttl_hours and now - created_at > self.ttl_hours * 3600:
+                connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                connection.commit()
+                return None
+            connection.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            connection.commit()
+            logger.debug(f"LLM cache hit for {key[:12]}")
+            return response
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+
+    def put(self, key, provider, model, response):
+        if not self.enabled() or response is None:
+            return
+        try:
+            connection = self._connection()
+            now = time.time()
+            connection.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, provider, model, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, provider, model, response, now, now)
+            )
+            connection.commit()
+            with self._lock:
+                self._puts += 1
+                evict = self._puts % self.EVICT_EVERY == 0
+            if evict:
+                self.evict()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def evict(self):
+        connection = self._connection()
+        if self.ttl_hours:
+            connection.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_hours * 3600,))
+        if self.max_entries:
+            connection.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        connection.commit()
+
+    def clear(self):
+        connection = self._connection()
+        removed = connection.execute("DELETE FROM llm_cache").rowcount
+        connection.commit()
+        return removed
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,92 @@
+# llm/providers/clients.py
+import inspect
+import threading
+import logging
+from classes.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Долгоживущие HTTP-сессии и клиенты SDK, общие для всех провайдеров.
+# Соединения переиспользуются между чанками, поэтому TCP/TLS-рукопожатие
+# выполняется один раз на соединение пула, а не на каждый запрос.
+_async_sessions = {}
+_clients = {}
+_lock = threading.Lock()
+
+POOL_SETTINGS = ('llm_pool_size', 'llm_timeout', 'llm_connect_timeout', 'llm_max_retries')
+
+
+def get_timeout():
+    settings = Settings()
+    return settings.get_setting('llm_connect_timeout'), settings.get_setting('llm_timeout')
+
+
+def get_async_session(provider):
+    # Асинхронный клиент httpx для фонового цикла событий llm.providers.runtime
+    with _lock:
+        session = _async_sessions.get(provider)
+        if session is None:
+            session = _create_http_client(asynchronous=True)
+            _async_sessions[provider] = session
+            logger.debug(f"Created pooled async HTTP client for {provider}")
+        return session
+
+
+def get_client(provider, api_key, factory, pooled_http_client=False, asynchronous=False):
+    # asynchronous — клиент SDK вида AsyncGroq/AsyncOpenAI, ему нужен асинхронный httpx
+    key = (provider, api_key, asynchronous)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            settings = Settings()
+            kwargs = {
+                'api_key': api_key,
+                'timeout': settings.get_setting('llm_timeout'),
+                'max_retries': settings.get_setting('llm_max_retries'),
+            }
+            if pooled_http_client:
+                kwargs['http_client'] = _create_http_client(asynchronous)
+            client = factory(**kwargs)
+            _clients[key] = client
+            logger.debug(f"Created {provider} client")
+        return client
+
+
+def _create_http_client(asynchronous=False):
+    # httpx приходит зависимостью SDK groq/openai
+    import httpx
+    settings = Settings()
+    pool_size = settings.get_setting('llm_pool_size')
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    timeout = httpx.Timeout(settings.get_setting('llm_timeout'), connect=settings.get_setting('llm_connect_timeout'))
+    if asynchronous:
+        # Транспорт повторяет только неудавшиеся соединения: повтор по таймауту
+        # чтения заново запустил бы уже идущую генерацию
+        transport = httpx.AsyncHTTPTransport(limits=limits, retries=settings.get_setting('llm_max_retries'))
+        return httpx.AsyncClient(transport=transport, timeout=timeout)
+    return httpx.Client(limits=limits, timeout=timeout)
+
+
+def close_all():
+    with _lock:
+        # Асинхронные клиенты закрываются вместе со своим циклом событий
+        _async_sessions.clear()
+        for client in _clients.values():
+            close = getattr(client, 'close', None)
+            if close and not inspect.iscoroutinefunction(close):
+                close()
+        _clients.clear()
+
+
+def _on_settings_changed(changed):
+    # Пулы создаются с параметрами из настроек: при их изменении следующие запросы
+    # получат новые клиенты. Старые не закрываются — ими могут пользоваться
+    # идущие запросы, они освободятся сборщиком мусора
+    if any(key in changed for key in POOL_SETTINGS):
+        with _lock:
+            _async_sessions.clear()
+            _clients.clear()
+        logger.debug("LLM HTTP pools will be recreated with new settings")
+
+
+Settings().subscribe(_on_settings_changed)
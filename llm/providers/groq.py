@@ -1,22 +1,13 @@
-import os
 import logging
-from groq import Groq
 from classes.settings import Settings
+from llm.providers.base import ChatProvider, ProviderError
+from llm.providers.clients import get_client
+from llm.providers import runtime
 
 logger = logging.getLogger(__name__)
 settings = Settings()
-os.environ['GROQ_API_KEY'] = settings.get_setting('groq_api_key')
-model_name = settings.get_setting('groq_model')
 
-groq_client = Groq(api_key=os.environ.get('GROQ_API_KEY'))
-
-def improve_text(chunk):
-    try:
-        response = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"""Please edit this text and Follow these steps to edit the text:
+EDIT_PROMPT = """Please edit this text and Follow these steps to edit the text:
             Carefully read through the text and identify any grammatical, spelling, or punctuation errors. Correct these errors while maintaining the original word choice as much as possible.
             Improve the readability of the text by:
             a. Breaking up overly long sentences into shorter, clearer ones.
@@ -29,15 +20,28 @@ def improve_text(chunk):
             Provide your edited version of the text within <edited_text> tags. Do not include any explanations, comments, or lists of changes made.
             Remember, your goal is to improve the text while keeping it as close to the original as possible. Make only necessary changes to correct errors and enhance readability.
             IMPORTANT: Always respond in the language of the original text. Do not translate or switch to any other language under any circumstances.
-            Here is the original text you will be working with: {chunk}""",
-                }
-            ],
-            model=model_name,
-        )
-        
-        improved_text = response.choices[0].message.content
-        return improved_text
-    
-    except Exception as e:
+            Here is the original text you will be working with:"""
+
+
+class GroqProvider(ChatProvider):
+    name = 'groq'
+    model_setting = 'groq_model'
+    default_prompt = EDIT_PROMPT
+    default_context_window = 8192
+
+    def client(self):
+        # SDK импортируется при первом запросе, а не при загрузке приложения
+        from groq import AsyncGroq
+        return get_client('groq', settings.get_setting('groq_api_key'), AsyncGroq, pooled_http_client=True, asynchronous=True)
+
+
+provider = GroqProvider()
+
+
+def improve_text(chunk):
+    # Прежний синхронный интерфейс: при ошибке возвращает None
+    try:
+        return runtime.run(provider.complete(chunk))
+    except ProviderError as e:
         logger.error(f"Error improving text: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,100 @@
+# llm/providers/health.py
+import math
+import time
+import logging
+import threading
+from collections import deque
+from classes.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+# Состояние провайдеров LLM, общее для всех запросов процесса: задержка до
+# первого фрагмента ответа по последним запросам и счётчик ошибок подряд.
+# После llm_health_failure_threshold ошибок подряд провайдер считается
+# недоступным и пропускается маршрутизатором; через llm_health_cooldown секунд
+# его снова проверяет health_check провайдера.
+class ProviderHealth:
+    def __init__(self):
+        self._latencies = {}
+        self._failures = {}
+        self._retry_at = {}
+        self._lock = threading.Lock()
+
+    def record_latency(self, provider, seconds):
+        window = int(Settings().get_setting('llm_latency_window') or 200)
+        with self._lock:
+            latencies = self._latencies.get(provider)
+            if latencies is None or latencies.maxlen != window:
+                latencies = deque(latencies or (), maxlen=window)
+                self._latencies[provider] = latencies
+            latencies.append(seconds)
+
+    def record_success(self, provider):
+        with self._lock:
+            self._failures.pop(provider, None)
+            self._retry_at.pop(provider, None)
+
+    def record_failure(self, provider):
+        settings = Settings()
+        threshold = int(settings.get_setting('llm_health_failure_threshold') or 1)
+        with self._lock:
+            failures = self._failures.get(provider, 0) + 1
+            self._failures[provider] = failures
+            if failures >= threshold:
+                if provider not in self._retry_at:
+                    logger.warning(f"LLM provider {provider} marked unhealthy after {failures} consecutive failures")
+                self._retry_at[provider] = time.monotonic() + float(settings.get_setting('llm_health_cooldown') or 0)
+
+    def is_healthy(self, provider):
+        with self._lock:
+            return provider not in self._retry_at
+
+    def claim_probe(self, provider):
+        # True, если пора проверить недоступного провайдера; остальные запросы
+        # до конца проверки продолжают его пропускать
+        cooldown = float(Settings().get_setting('llm_health_cooldown') or 0)
+        with self._lock:
+            retry_at = self._retry_at.get(provider)
+            if retry_at is None or time.monotonic() < retry_at:
+                return False
+            self._retry_at[provider] = time.monotonic() + cooldown
+            return True
+
+    def percentile(self, provider, percent):
+        with self._lock:
+            return self._percentile(provider, percent)
+
+    def _percentile(self, provider, percent):
+        # Вызывается под блокировкой
+        latencies = sorted(self._latencies.get(provider, ()))
+        if not latencies:
+            return None
+        return latencies[max(0, math.ceil(percent / 100 * len(latencies)) - 1)]
+
+    def hedge_delay(self, provider):
+        # Сколько ждать первого фрагмента, прежде чем отправить запрос запасному
+        # провайдеру: перцентиль задержки, пока статистики мало — llm_hedge_delay
+        settings = Settings()
+        with self._lock:
+            samples = len(self._latencies.get(provider, ()))
+        if samples < int(settings.get_setting('llm_hedge_min_samples') or 1):
+            return float(settings.get_setting('llm_hedge_delay'))
+        return self.percentile(provider, float(settings.get_setting('llm_hedge_percentile')))
+
+    def status(self):
+        # Снимок под блокировкой: record_* меняют состояние из потока цикла событий
+        with self._lock:
+            return {
+                provider: {
+                    'healthy': provider not in self._retry_at,
+                    'failures': self._failures.get(provider, 0),
+                    'samples': len(self._latencies.get(provider, ())),
+                    'p50': self._percentile(provider, 50),
+                    'p95': self._percentile(provider, 95),
+                }
+                for provider in sorted(set(self._latencies) | set(self._failures))
+            }
+
+
+health = ProviderHealth()
@@ -1,40 +1,94 @@
-import requests
+import json
 import logging
+from urllib.parse import urlsplit
 from classes.settings import Settings  # Импорт класса Settings
+from llm.providers.base import LLMProvider, ProviderError
+from llm.providers.clients import get_async_session
+from llm.providers import runtime
 
 logger = logging.getLogger(__name__)
 settings = Settings()
-ollama_url = settings.get_setting('ollama_url')
-model = settings.get_setting('ollama_model')
 
-def process_chunk(chunk, model, system_prompt=None, temperature=0.3, top_k=40, top_p=0.9, repeat_penalty=1.2, max_tokens=2048):
-    logger.debug(f"Sending request to Ollama API. Chunk length: {len(chunk)}")
-
-    payload = {
-        "model": model,
-        "prompt": f"Please edit this text, correcting any errors and improving its clarity and coherence:\n\n{chunk}",
-        "stream": False,
-        "options": {
-            "temperature": temperature,
-            "top_k": top_k,
-            "top_p": top_p,
-            "repeat_penalty": repeat_penalty,
-            "num_predict": max_tokens
+EDIT_PROMPT = "Please edit this text, correcting any errors and improving its clarity and coherence:"
+
+# Имена параметров выборки в API Ollama
+OLLAMA_OPTIONS = {
+    'temperature': 'temperature',
+    'top_k': 'top_k',
+    'top_p': 'top_p',
+    'repeat_penalty': 'repeat_penalty',
+    'max_tokens': 'num_predict',
+}
+
+
+class OllamaProvider(LLMProvider):
+    name = 'ollama'
+    model_setting = 'ollama_model'
+
+    def url(self):
+        return settings.get_setting('ollama_url')
+
+    async def health_check(self):
+        # /api/tags отвечает сразу, не загружая модель
+        parts = urlsplit(self.url())
+        try:
+            response = await get_async_session(self.name).get(f"{parts.scheme}://{parts.netloc}/api/tags", timeout=5)
+            return response.status_code == 200
+        except Exception as e:
+            logger.debug(f"Health check of {self.name} failed: {e}")
+            return False
+
+    def context_window(self, model=None):
+        # Ollama обрезает запрос по num_ctx, поэтому окно задаётся явно и передаётся в запросе
+        windows = settings.get_setting('llm_context_windows') or {}
+        return int(windows.get(self.resolve_model(model)) or settings.get_setting('ollama_num_ctx') or self.default_context_window)
+
+    def prompt_text(self, system_prompt=None):
+        return f"{EDIT_PROMPT}\n{system_prompt or ''}"
+
+    async def _stream(self, chunk, model, system_prompt, options):
+        logger.debug(f"Sending request to Ollama API. Chunk length: {len(chunk)}")
+        payload = {
+            "model": model,
+            "prompt": f"{EDIT_PROMPT}\n\n{chunk}",
+            "stream": True,
+            "options": {
+                "num_ctx": self.context_window(model),
+                **{OLLAMA_OPTIONS[key]: value for key, value in options.items()}
+            }
         }
-    }
+        if system_prompt:
+            payload["system"] = system_prompt
+
+        # Ответ — строки JSON, по одной на фрагмент; последняя с done=true
+        async with get_async_session(self.name).stream('POST', self.url(), json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get('error'):
+                    raise ProviderError(f"{self.name}: {data['error']}")
+                yield data.get('response', '')
+                if data.get('done'):
+                    break
 
-    if system_prompt:
-        payload["system"] = system_prompt
 
-    headers = {'Content-Type': 'application/json'}
+provider = OllamaProvider()
 
+
+def process_chunk(chunk, model, system_prompt=None, temperature=0.3, top_k=40, top_p=0.9, repeat_penalty=1.2, max_tokens=2048):
     try:
-        logger.debug("Sending POST request to Ollama API")
-        response = requests.post(ollama_url, headers=headers, json=payload, timeout=90)
-        response.raise_for_status()
-        result = response.json()['response']
-        logger.debug(f"Received response from Ollama API. Response length: {len(result)}")
+        result = request_chunk(chunk, model, system_prompt, temperature, top_k, top_p, repeat_penalty, max_tokens)
         return f"<edited_text>{result}</edited_text>"
-    except requests.RequestException as e:
+    except ProviderError as e:
         logger.error(f"Error in Ollama API call: {e}")
         return f"<edited_text>{chunk}</edited_text>"
+
+def request_chunk(chunk, model, system_prompt=None, temperature=0.3, top_k=40, top_p=0.9, repeat_penalty=1.2, max_tokens=2048):
+    # В отличие от process_chunk не подменяет ответ исходным текстом при ошибке,
+    # чтобы вызывающий код мог повторить запрос
+    return runtime.run(provider.complete(
+        chunk, model=model, system_prompt=system_prompt, temperature=temperature, top_k=top_k, top_p=top_p,
+        repeat_penalty=repeat_penalty, max_tokens=max_tokens
+    ))
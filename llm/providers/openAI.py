@@ -1,22 +1,13 @@
-from openai import OpenAI
-import os
 import logging
-from groq import Groq
 from classes.settings import Settings
+from llm.providers.base import ChatProvider, ProviderError
+from llm.providers.clients import get_client
+from llm.providers import runtime
 
 logger = logging.getLogger(__name__)
 settings = Settings()
-os.environ['OPENAI_API_KEY'] = settings.get_setting('openAI_api_key')
-model_name = settings.get_setting('groq_model')
 
-client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
-def improve_text(chunk):
-    try:
-        
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "user", "content": f"""Please edit this text and Follow these steps to edit the text:
+EDIT_PROMPT = """Please edit this text and Follow these steps to edit the text:
                     Carefully read through the text and identify any grammatical, spelling, or punctuation errors. Correct these errors while maintaining the original word choice as much as possible.
                     Improve the readability of the text by:
                     a. Breaking up overly long sentences into shorter, clearer ones.
@@ -29,12 +20,29 @@ def improve_text(chunk):
                     Provide your edited version of the text within <edited_text> tags. Do not include any explanations, comments, or lists of changes made.
                     Remember, your goal is to improve the text while keeping it as close to the original as possible. Make only necessary changes to correct errors and enhance readability.
                     IMPORTANT: Always respond in the language of the original text. Do not translate or switch to any other language under any circumstances.
-                    Here is the original text you will be working with: {chunk}""",
-                        }
-            ]
-        )
-        improved_text = response.choices[0].message.content
-        return improved_text
-    except Exception as e:
+                    Here is the original text you will be working with:"""
+
+
+class OpenAIProvider(ChatProvider):
+    name = 'openAI'
+    model_setting = 'openAI_model'
+    default_prompt = EDIT_PROMPT
+    default_context_window = 128000
+    tokenizer_encoding = 'o200k_base'
+
+    def client(self):
+        # SDK импортируется при первом запросе, а не при загрузке приложения
+        from openai import AsyncOpenAI
+        return get_client('openAI', settings.get_setting('openAI_api_key'), AsyncOpenAI, pooled_http_client=True, asynchronous=True)
+
+
+provider = OpenAIProvider()
+
+
+def improve_text(chunk):
+    # Прежний синхронный интерфейс: при ошибке возвращает None
+    try:
+        return runtime.run(provider.complete(chunk))
+    except ProviderError as e:
         logger.error(f"Error improving text: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,55 @@
+# llm/providers/registry.py
+import importlib
+import importlib.util
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Реестр провайдеров LLM: имя -> (модуль, пакет SDK). Каждый модуль объявляет
+# экземпляр LLMProvider в атрибуте provider. Модуль провайдера и его SDK
+# импортируются при первом обращении, поэтому запуск приложения не ждёт
+# загрузки SDK, а отсутствие SDK одного провайдера не мешает работать остальным.
+PROVIDERS = {
+    'ollama': ('llm.providers.ollama', 'httpx'),
+    'together': ('llm.providers.together', 'together'),
+    'groq': ('llm.providers.groq', 'groq'),
+    'openAI': ('llm.providers.openAI', 'openai'),
+    'stub': ('llm.providers.stub', 'httpx'),
+}
+
+_providers = {}
+_lock = threading.Lock()
+
+
+class ProviderUnavailable(RuntimeError):
+    pass
+
+
+def is_available(provider):
+    # Проверка без импорта: find_spec только ищет пакет
+    if provider not in PROVIDERS:
+        return False
+    return importlib.util.find_spec(PROVIDERS[provider][1]) is not None
+
+
+def available_providers():
+    return [provider for provider in PROVIDERS if is_available(provider)]
+
+
+def get_provider(provider):
+    instance = _providers.get(provider)
+    if instance is not None:
+        return instance
+    if provider not in PROVIDERS:
+        raise ProviderUnavailable(f"Unsupported provider: {provider}")
+    module_name, sdk = PROVIDERS[provider]
+    if not is_available(provider):
+        raise ProviderUnavailable(f"Provider '{provider}' requires the '{sdk}' package, which is not installed")
+    with _lock:
+        instance = _providers.get(provider)
+        if instance is None:
+            instance = importlib.import_module(module_name).provider
+            _providers[provider] = instance
+            logger.debug(f"Loaded LLM provider {provider}")
+    return instance
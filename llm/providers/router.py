@@ -0,0 +1,143 @@
+# llm/providers/router.py
+import asyncio
+import logging
+from classes.settings import Settings
+from llm.providers.base import ProviderError
+from llm.providers.health import health
+from llm.providers.registry import ProviderUnavailable, get_provider
+
+logger = logging.getLogger(__name__)
+
+
+# Маршрутизатор запросов между провайдерами LLM с интерфейсом LLMProvider.
+# Основной провайдер — первый в маршруте, за ним llm_fallback_providers в
+# порядке приоритета. Запрос уходит первому доступному провайдеру; если тот
+# отвечает ошибкой до первого фрагмента, запрос повторяется у следующего.
+# При llm_hedging, если первый фрагмент не пришёл за время, в которое
+# укладываются llm_hedge_percentile процентов прошлых ответов провайдера,
+# тот же запрос параллельно отправляется следующему провайдеру, и ответ
+# берётся у того, кто начнёт отвечать первым; второй запрос отменяется.
+class Router:
+    def __init__(self, provider, fallbacks=None):
+        settings = Settings()
+        if fallbacks is None:
+            fallbacks = settings.get_setting('llm_fallback_providers') or []
+        self.hedging = bool(settings.get_setting('llm_hedging'))
+        self.providers = []
+        for name in [provider] + [name for name in fallbacks if name != provider]:
+            try:
+                self.providers.append(get_provider(name))
+            except ProviderUnavailable as e:
+                logger.warning(f"Skipping LLM provider in route: {e}")
+        if not self.providers:
+            raise ProviderUnavailable(f"No LLM provider available for route {[provider] + list(fallbacks)}")
+        self.primary = self.providers[0]
+        self.name = self.primary.name
+        self.cacheable = self.primary.cacheable
+        self.tokenizer_encoding = self.primary.tokenizer_encoding
+
+    def resolve_model(self, model=None):
+        return self.primary.resolve_model(model)
+
+    def context_window(self, model=None):
+        # Чанк должен поместиться в окно любого провайдера маршрута
+        return min(provider.context_window(model if provider is self.primary else None)
+                   for provider in self.providers)
+
+    def prompt_text(self, system_prompt=None):
+        return self.primary.prompt_text(system_prompt)
+
+    async def _candidates(self):
+        # Доступные провайдеры в порядке приоритета; недоступный после паузы
+        # проверяется health_check. Если недоступны все, пробуем всех по порядку.
+        candidates = []
+        for provider in self.providers:
+            if health.is_healthy(provider.name):
+                candidates.append(provider)
+            elif health.claim_probe(provider.name):
+                if await provider.health_check():
+                    logger.info(f"LLM provider {provider.name} is healthy again")
+                    health.record_success(provider.name)
+                    candidates.append(provider)
+        return candidates or list(self.providers)
+
+    @staticmethod
+    async def _first_part(iterator):
+        try:
+            return await iterator.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    async def stream(self, chunk, model=None, system_prompt=None, **options):
+        # Модель, заданная вызывающим кодом, относится к основному провайдеру;
+        # запасные берут модель из своих настроек
+        queue = await self._candidates()
+        attempts = {}
+        errors = []
+
+        def launch():
+            provider = queue.pop(0)
+            iterator = provider.stream(chunk, model=model if provider is self.primary else None,
+                                       system_prompt=system_prompt, **options)
+            attempts[asyncio.ensure_future(self._first_part(iterator))] = (provider, iterator)
+            return provider
+
+        leader = launch()
+        winner = None
+        try:
+            while attempts and winner is None:
+                timeout = health.hedge_delay(leader.name) if self.hedging and queue and len(attempts) == 1 else None
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"No response from {leader.name} within {timeout:.2f}s, hedging with {queue[0].name}")
+                    leader = launch()
+                    continue
+                # Из одновременно ответивших выбирается более приоритетный
+                for task in sorted(done, key=lambda task: self.providers.index(attempts[task][0])):
+                    provider, iterator = attempts.pop(task)
+                    if winner is not None:
+                        await iterator.aclose()
+                        continue
+                    try:
+                        winner = (provider, iterator, task.result())
+                    except ProviderError as e:
+                        logger.warning(f"LLM provider {provider.name} failed: {e}")
+                        errors.append(e)
+                        await iterator.aclose()
+                if winner is None and attempts:
+                    # Основной запрос упал, ответа ждём от уже отправленного запасного
+                    leader = next(iter(attempts.values()))[0]
+                elif winner is None and queue:
+                    leader = launch()
+        finally:
+            for task in attempts:
+                task.cancel()
+            if attempts:
+                await asyncio.gather(*attempts, return_exceptions=True)
+                for _, iterator in attempts.values():
+                    await iterator.aclose()
+
+        if winner is None:
+            raise errors[-1]
+        provider, iterator, part = winner
+        if provider is not self.primary:
+            logger.debug(f"Request served by fallback provider {provider.name}")
+        try:
+            if part is not None:
+                yield part
+                async for part in iterator:
+                    yield part
+        finally:
+            await iterator.aclose()
+
+    async def complete(self, chunk, **options):
+        return ''.join([part async for part in self.stream(chunk, **options)])
+
+
+def get_llm(provider):
+    # Провайдер для редактирования текста: сам провайдер, если запасные не
+    # заданы, иначе маршрутизатор с ним во главе
+    fallbacks = [name for name in Settings().get_setting('llm_fallback_providers') or [] if name != provider]
+    if not fallbacks:
+        return get_provider(provider)
+    return Router(provider, fallbacks)
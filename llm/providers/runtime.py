@@ -0,0 +1,52 @@
+# llm/providers/runtime.py
+import queue
+import asyncio
+import threading
+
+# Фоновый цикл событий для асинхронных провайдеров. Синхронный код (обработчики
+# Gradio, пулы потоков) выполняет на нём корутины через run и читает асинхронные
+# генераторы через iterate; все асинхронные HTTP-клиенты живут на этом цикле.
+_loop = None
+_lock = threading.Lock()
+_DONE = object()
+
+
+def get_loop():
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-event-loop", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def run(coroutine):
+    return asyncio.run_coroutine_threadsafe(coroutine, get_loop()).result()
+
+
+def iterate(async_iterable):
+    # Синхронный генератор поверх асинхронного; если потребитель прекращает
+    # чтение раньше, задача на цикле отменяется
+    items = queue.Queue()
+
+    async def consume():
+        try:
+            async for item in async_iterable:
+                items.put((item, None))
+        except Exception as e:
+            items.put((_DONE, e))
+            return
+        items.put((_DONE, None))
+
+    future = asyncio.run_coroutine_threadsafe(consume(), get_loop())
+    try:
+        while True:
+            item, error = items.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        future.cancel()
@@ -0,0 +1,122 @@
+# llm/providers/stub.py
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from llm.providers import runtime
+from llm.providers.base import ProviderError
+from llm.providers.ollama import EDIT_PROMPT, OllamaProvider
+
+logger = logging.getLogger(__name__)
+
+
+# Локальный сервер с протоколом Ollama (/api/generate) для проверки без сети и GPU:
+# возвращает присланный текст в тегах <edited_text> по одному слову на фрагмент.
+# delay — пауза между фрагментами, status — код ответа для проверки ошибок.
+class StubServer:
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0, status=200):
+        self.delay = delay
+        self.status = status
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logger.debug(f"Stub LLM server: {format % args}")
+
+            def do_GET(self):
+                # /api/tags — проверка доступности; status влияет и на неё
+                body = json.dumps({'models': [{'name': 'stub'}]}).encode('utf-8')
+                self.send_response(server.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                if server.status != 200:
+                    body = json.dumps({'error': f"stub status {server.status}"}).encode('utf-8')
+                    self.send_response(server.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                text = payload.get('prompt', '')
+                if text.startswith(EDIT_PROMPT):
+                    text = text[len(EDIT_PROMPT):].strip()
+                # Контекст предыдущего чанка не редактируется
+                text = text.split("Text to edit:\n", 1)[-1]
+                parts = ['<edited_text>'] + [f"{word} " for word in text.split()] + ['</edited_text>']
+                if not payload.get('stream', True):
+                    parts = [''.join(parts)]
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for part in parts:
+                    # Пауза перед фрагментом, как у модели, генерирующей ответ
+                    if server.delay:
+                        time.sleep(server.delay)
+                    self._write_chunk(json.dumps({'response': part, 'done': False}) + '\n')
+                self._write_chunk(json.dumps({'response': '', 'done': True}) + '\n')
+                self.wfile.write(b'0\r\n\r\n')
+
+            def _write_chunk(self, line):
+                data = line.encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+                self.wfile.flush()
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://{host}:{self._server.server_address[1]}/api/generate"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="llm-stub-server", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_stub_server():
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = StubServer()
+            logger.info(f"Stub LLM server listening on {_server.url}")
+        return _server
+
+
+# Провайдер Ollama, направленный на локальный сервер-заглушку
+class StubProvider(OllamaProvider):
+    name = 'stub'
+    # Ответы заглушки не кэшируются, чтобы проверки не зависели от прошлых запусков
+    cacheable = False
+
+    def __init__(self, server=None):
+        self.server = server
+
+    def resolve_model(self, model=None):
+        return model or 'stub'
+
+    def url(self):
+        return (self.server or get_stub_server()).url
+
+
+provider = StubProvider()
+
+
+def process_chunk(chunk):
+    try:
+        return runtime.run(provider.complete(chunk))
+    except ProviderError as e:
+        logger.error(f"Error in stub LLM request: {e}")
+        return chunk
@@ -1,19 +1,14 @@
 import logging
-from together import Together
 from classes.settings import Settings
-import os
+from llm.providers.base import ChatProvider, ProviderError
+from llm.providers.clients import get_client
+from llm.providers import runtime
 
 settings = Settings()
-model = settings.get_setting('togetherai_model')
 
 logger = logging.getLogger(__name__)
-os.environ['TOGETHER_API_KEY'] = settings.get_setting('together_api_key')
 
-def process_chunk(chunk):
-    logger.debug(f"Processing chunk with TogetherAI. Chunk length: {len(chunk)}")
-
-    messages = [
-        {"role": "system", "content": """You are an experienced editor tasked with improving a given text. Your goal is to correct errors and enhance readability while staying close to the original text and preserving its initial meaning.
+SYSTEM_PROMPT = """You are an experienced editor tasked with improving a given text. Your goal is to correct errors and enhance readability while staying close to the original text and preserving its initial meaning.
             Follow these steps to edit the text:
             Carefully read through the text and identify any grammatical, spelling, or punctuation errors. Correct these errors while maintaining the original word choice as much as possible.
 
@@ -30,30 +25,39 @@ def process_chunk(chunk):
             Provide your edited version of the text within <edited_text> tags. Do not include any explanations, comments, or lists of changes made.
             Remember, your goal is to improve the text while keeping it as close to the original as possible. Make only necessary changes to correct errors and enhance readability.
             IMPORTANT: Always respond in the language of the original text. Do not translate or switch to any other language under any circumstances.
-            Here is the original text you will be working with:"""},
-        {"role": "user", "content": chunk}
-    ]
+            Here is the original text you will be working with:"""
+
+
+class TogetherProvider(ChatProvider):
+    name = 'together'
+    model_setting = 'togetherai_model'
+    default_prompt = SYSTEM_PROMPT
+    prompt_as_system = True
+    default_context_window = 131072
+    supported_options = {
+        'temperature': 'temperature',
+        'top_k': 'top_k',
+        'top_p': 'top_p',
+        'repeat_penalty': 'repetition_penalty',
+        'max_tokens': 'max_tokens',
+    }
+
+    def client(self):
+        # SDK импортируется при первом запросе, а не при загрузке приложения
+        from together import AsyncTogether
+        return get_client('together', settings.get_setting('together_api_key'), AsyncTogether, asynchronous=True)
 
+
+provider = TogetherProvider()
+
+
+def process_chunk(chunk):
+    # Прежний синхронный интерфейс: при ошибке возвращает исходный текст
+    logger.debug(f"Processing chunk with TogetherAI. Chunk length: {len(chunk)}")
     try:
-        together_ai = Together(api_key=os.environ['TOGETHER_API_KEY'])
-        stream = together_ai.chat.completions.create(
-            model=model,
-            messages=messages,
-            #temperature=temperature,
-            #top_k=top_k,
-            #top_p=top_p,
-            #max_tokens=max_tokens,
-            stream=True
-        )
-
-        output = ""
-        for chunk in stream:
-            content1 = chunk.choices[0].delta.content
-            if content1:
-                output += content1
-
-        logger.debug(f"Received output from TogetherAI. Output length: {len(output)}")
-        return output
-    except Exception as e:
+        output = runtime.run(provider.complete(chunk))
+    except ProviderError as e:
         logger.error(f"Error in TogetherAI request: {e}")
-        return chunk
\ No newline at end of file
+        return chunk
+    logger.debug(f"Received output from TogetherAI. Output length: {len(output)}")
+    return output
@@ -2,10 +2,16 @@
 from classes.audio import Audio
 
 def process_audio(file, change_sample_rate, new_sample_rate, to_mono, apply_filter, filter_choice,
-                  remove_silence, silence_duration, silence_threshold, audio_processing, lambd, tau, solver, nfe, output_format):
-    audio = Audio(file)
+                  remove_silence, silence_duration, silence_threshold, audio_processing, lambd, tau, solver, nfe, output_format,
+                  progress_callback=None, source=None):
+    # source — уже загруженный Audio, общий с транскрипцией: совпадающие этапы не пересчитываются
+    audio = source.fork() if source is not None else Audio(file)
     log = []
 
+    def report(stage):
+        if progress_callback:
+            progress_callback(stage)
+
     if change_sample_rate:
         audio.change_sample_rate(new_sample_rate)
         log.append(f"Changed sample rate to {new_sample_rate}")
@@ -19,9 +25,11 @@ def process_audio(file, change_sample_rate, new_sample_rate, to_mono, apply_filt
         log.append(f"Applied filter: {filter_choice}")
 
     if audio_processing == "Denoise":
+        report("Denoising")
         audio.denoise_audio(lambd, tau, solver, nfe, lambda msg: log.append(msg))
         log.append("Applied denoising")
     elif audio_processing == "Enhance":
+        report("Enhancing")
         audio.enhance_audio(lambd, tau, solver, nfe, lambda msg: log.append(msg))
         log.append("Applied audio enhancement")
 
@@ -30,6 +38,7 @@ def process_audio(file, change_sample_rate, new_sample_rate, to_mono, apply_filt
         log.append("Removed silence")
 
     # Получаем файл в нужном формате
+    report("Encoding")
     output_file = audio.get_file_path(output_format)
     log.append(f"Converted to {output_format} format")
 
@@ -0,0 +1,131 @@
+# modules/batch_processor.py
+import os
+import json
+import time
+import soundfile as sf
+from classes.job_queue import JobStore, JobCancelled, get_job_queue
+from classes.settings import Settings
+
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.ogg', '.mp3')
+
+
+def run_audio_job(db_path, job_id, params):
+    # Выполняется в процессе-воркере
+    from modules.audio_processor import process_audio
+    from modules.transcription_processor import transcribe_audio
+    from classes.audio import Audio
+
+    store = JobStore(db_path)
+    if store.status(job_id) != 'queued':
+        store.update(job_id, status='cancelled', stage='Cancelled')
+        return
+
+    stages = int(params['process']) + int(params['transcribe'])
+    completed = 0
+
+    def progress(stage):
+        if store.status(job_id) == 'cancelling':
+            raise JobCancelled()
+        store.update(job_id, stage=stage, progress=completed / stages)
+
+    store.update(job_id, status='running', stage='Loading audio', progress=0.0)
+    try:
+        data, rate = sf.read(params['path'], dtype='int16')
+        audio_input = (rate, data)
+        source = Audio(audio_input) if params['process'] and params['transcribe'] else None
+        result = {}
+
+        if params['process']:
+            output_file, log = process_audio(
+                audio_input, params['change_sample_rate'], params['new_sample_rate'], params['to_mono'], False, None,
+                params['remove_silence'], params['silence_duration'], params['silence_threshold'], params['audio_processing'],
+                params['lambd'], params['tau'], params['solver'], params['nfe'], params['output_format'],
+                progress_callback=progress, source=source
+            )
+            result['output_file'] = output_file
+            result['processing_log'] = log
+            completed += 1
+
+        if params['transcribe']:
+            progress("Preprocessing for transcription")
+            text, edited_text, _, _, _, json_raw, log = transcribe_audio(
+                audio_input, params['model_language'], params['model_size'], params['language'],
+                progress_callback=progress, source=source
+            )
+            result['text'] = text
+            result['edited_text'] = edited_text
+            result['segments'] = json.loads(json_raw) if json_raw else None
+            result['transcription_log'] = log
+            completed += 1
+
+        store.update(job_id, status='done', stage='Done', progress=1.0, result=result)
+    except JobCancelled:
+        store.update(job_id, status='cancelled', stage='Cancelled')
+    except Exception as e:
+        store.update(job_id, status='failed', error=str(e))
+
+
+def collect_audio_files(files, folder):
+    paths = list(files or [])
+    if folder:
+        if not os.path.isdir(folder):
+            raise ValueError(f"Folder not found: {folder}")
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                paths.append(os.path.join(folder, name))
+    return paths
+
+
+def submit_batch(files, folder, change_sample_rate, new_sample_rate, to_mono, remove_silence, audio_processing,
+                 output_format, transcribe):
+    settings = Settings()
+    job_queue = get_job_queue()
+    job_ids = []
+    for path in collect_audio_files(files, folder):
+        params = {
+            'path': path,
+            'process': bool(change_sample_rate or to_mono or remove_silence or audio_processing != "None"),
+            'change_sample_rate': change_sample_rate,
+            'new_sample_rate': new_sample_rate or settings.get_setting('sample_rate'),
+            'to_mono': to_mono,
+            'remove_silence': remove_silence,
+            'silence_duration': settings.get_setting('silence_duration'),
+            'silence_threshold': settings.get_setting('silence_threshold'),
+            'audio_processing': audio_processing,
+            'lambd': settings.get_setting('lambd'),
+            'tau': settings.get_setting('tau'),
+            'solver': settings.get_setting('solver'),
+            'nfe': settings.get_setting('nfe'),
+            'output_format': output_format or settings.get_setting('file_format'),
+            'transcribe': transcribe,
+            'model_language': settings.get_setting('whisper_model_language'),
+            'model_size': settings.get_setting('whisper_model_size'),
+            'language': settings.get_setting('whisper_language'),
+        }
+        if not params['process'] and not params['transcribe']:
+            continue
+        job_ids.append(job_queue.submit('audio', os.path.basename(path), params, run_audio_job))
+    return job_ids
+
+
+def list_jobs(limit=100):
+    rows = []
+    for job in get_job_queue().list(limit):
+        result = json.loads(job['result']) if job['result'] else {}
+        rows.append([
+            job['id'],
+            job['name'],
+            job['status'],
+            job['stage'],
+            f"{(job['progress'] or 0) * 100:.0f}%",
+            time.strftime('%d.%m %H:%M:%S', time.localtime(job['updated_at'])),
+            job['error'] or result.get('output_file') or (result.get('edited_text') or '')[:100],
+        ])
+    return rows
+
+
+def cancel_job(job_id):
+    job_id = (job_id or "").strip()
+    if get_job_queue().cancel(job_id):
+        return f"Cancellation requested for job {job_id}."
+    return f"Job {job_id} is not running or queued."
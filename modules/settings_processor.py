@@ -7,8 +7,7 @@ def get_all_settings():
     return settings.settings
 
 def update_settings(new_settings):
-    for key, value in new_settings.items():
-        settings.update_setting(key, value)
+    settings.update_settings(new_settings)
     settings.save_settings()
     return settings.settings
 
@@ -16,3 +15,20 @@ def reset_settings():
     settings.reset_to_default()
     settings.save_settings()
     return settings.settings
+
+# Кэши импортируются в обработчиках кнопок очистки, а не при запуске приложения
+
+def clear_transcription_cache():
+    from classes.transcription_cache import transcription_cache
+    removed = transcription_cache.clear()
+    return f"Transcription cache cleared ({removed} entries removed)."
+
+def clear_llm_cache():
+    from llm.providers.cache import llm_cache
+    removed = llm_cache.clear()
+    return f"LLM cache cleared ({removed} entries removed)."
+
+def clear_image_cache():
+    from classes.image_cache import image_cache
+    removed = image_cache.clear()
+    return f"Image cache cleared ({removed} entries removed)."
@@ -1,6 +1,6 @@
 # modules/text2voice_processor.py
 from classes.text import Text
-from classes.voice import Voice
+from classes.voice import Voice, get_available_speakers
 import numpy as np
 import logging
 
@@ -12,8 +12,8 @@ class Text2VoiceProcessor:
         self.text_processor = Text()
         self.voice_processor = None
 
-    def get_available_speakers(self):
-        return Voice().get_available_speakers()
+    def get_available_speakers(self, language='ru'):
+        return get_available_speakers(language)
 
     def process_text_to_voice(self, text, model, language, speaker):
         self.voice_processor = Voice(language=language, speaker=speaker)
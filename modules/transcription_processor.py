@@ -1,28 +1,59 @@
 # modules/transcription_processor.py
 from classes.audio import Audio
 from classes.settings import Settings
+from classes.transcription_cache import transcription_cache
 from classes.text import Text  # Добавляем импорт Text, если он необходим для использования провайдера
 import json
-from groq import Groq
 import os
-from llm.providers.groq import improve_text as groq_process_chunk
-from llm.providers.together import process_chunk as together_process_chunk
-from llm.providers.ollama import process_chunk as ollama_process_chunk
-from llm.providers.openAI import improve_text as openAI_process_chunk
+from llm.providers.clients import get_client
 
-def transcribe_audio(audio_input, model_language, model_size, language):
-    #settings=Settings()
-    audio = Audio(audio_input)
-    settings = Settings()
-    log = []
+def _preprocessing_params(settings):
+    # Параметры предобработки, они же входят в ключ кэша транскрипций
+    return {
+        'sample_rate': 22050,
+        'mono': True,
+        'lambd': settings.get_setting('lambd'),
+        'tau': settings.get_setting('tau'),
+        'solver': settings.get_setting('solver'),
+        'nfe': settings.get_setting('nfe'),
+        'silence_duration': settings.get_setting('silence_duration'),
+        'silence_threshold': settings.get_setting('silence_threshold'),
+    }
+
+def _cache_key(audio_input, preprocessing, model_language, model_size, language):
+    return transcription_cache.make_key(audio_input, {
+        **preprocessing,
+        'model_language': model_language,
+        'model_size': model_size,
+        'task': "transcribe" if language == "original" else "translate",
+        # Сегменты в кэше хранятся во времени исходной записи
+        'timestamps': "original",
+    })
 
+def _document_id(audio_input, model_language, model_size, language, settings):
+    # Записи отличаются тем же, чем записи кэша транскрипций; по этому ключу
+    # повторное редактирование находит прошлые чанки и ответы LLM
+    return _cache_key(audio_input, _preprocessing_params(settings), model_language, model_size, language)
+
+def _cached_result(cached, settings, log, document_id=None):
+    log.append("Transcription cache hit, skipping preprocessing and Whisper.")
+    result = {'text': cached['text'], 'segments': cached['segments']}
+    edited_text = Audio.edit_transcript(result['text'], settings, document_id)
+    timestamp_view, timestamp_table, json_output, json_raw = Audio.format_transcript(result)
+    log.append("Transcription complete.")
+    return result['text'], edited_text, timestamp_view, timestamp_table, json.dumps(json_output, indent=2), json.dumps(json_raw, indent=2), "\n".join(log)
+
+def _preprocess(audio, preprocessing, log, progress_callback=None):
     def log_callback(msg):
         log.append(msg)
-    
-    
+
+    def report(stage):
+        if progress_callback:
+            progress_callback(stage)
+
     # Предобработка аудио
-    log.append("Changing sample rate to 22050 Hz...")
-    audio.change_sample_rate(22050)
+    log.append(f"Changing sample rate to {preprocessing['sample_rate']} Hz...")
+    audio.change_sample_rate(preprocessing['sample_rate'])
     
     log.append("Converting to mono...")
     audio.stereo_to_mono()
@@ -30,22 +61,37 @@ def transcribe_audio(audio_input, model_language, model_size, language):
     #log.append("Applying volume filter...")
     #audio.apply_filter("volume=2.0")
     
-    # Получаем настройки для улучшения аудио
-    lambd = settings.get_setting('lambd')
-    tau = settings.get_setting('tau')
-    solver = settings.get_setting('solver')
-    nfe = settings.get_setting('nfe')
     log.append("Denoising audio...")
-    audio.denoise_audio(lambd, tau, solver, nfe, log_callback)
+    report("Denoising")
+    audio.denoise_audio(preprocessing['lambd'], preprocessing['tau'], preprocessing['solver'], preprocessing['nfe'], log_callback)
     
-    # Получаем настройки для удаления тишины
-    silence_duration = settings.get_setting('silence_duration')
-    silence_threshold = settings.get_setting('silence_threshold')
     log.append("Removing silence...")
-    audio.remove_silence(silence_duration, silence_threshold, log_callback)
+    audio.remove_silence(preprocessing['silence_duration'], preprocessing['silence_threshold'], log_callback)
+
+def transcribe_audio(audio_input, model_language, model_size, language, progress_callback=None, source=None):
+    #settings=Settings()
+    settings = Settings()
+    log = []
+
+    preprocessing = _preprocessing_params(settings)
+    provider = settings.get_setting('transcription_provider')
+
+    cache_key = None
+    document_id = None
+    if settings.get_setting('llm_incremental_editing'):
+        document_id = _document_id(audio_input, model_language, model_size, language, settings)
+    if provider == "ollama" and settings.get_setting('transcription_cache_enabled'):
+        cache_key = document_id or _cache_key(audio_input, preprocessing, model_language, model_size, language)
+        cached = transcription_cache.get(cache_key)
+        if cached is not None:
+            return _cached_result(cached, settings, log, document_id)
+
+    audio = source.fork() if source is not None else Audio(audio_input)
+    _preprocess(audio, preprocessing, log, progress_callback)
+    if progress_callback:
+        progress_callback("Transcribing")
     
     # Определяем провайдера для транскрипции
-    provider = settings.get_setting('transcription_provider')
     PROVIDER = settings.get_setting('provider')
     log.append(f"Selected transcription provider: {provider}")
     log.append(f"Selected provider: {PROVIDER}")
@@ -54,14 +100,17 @@ def transcribe_audio(audio_input, model_language, model_size, language):
     if provider == "ollama":
         log.append(f"Transcribing with Ollama (model: {model_language}.{model_size}, language: {language})...")
 
-        text, edited_text, timestamp_view, timestamp_table, json_output, json_raw = audio.transcribe(model_language, model_size, language)
+        text, edited_text, timestamp_view, timestamp_table, json_output, json_raw = audio.transcribe(model_language, model_size, language, document_id)
+        if cache_key:
+            transcription_cache.put(cache_key, text, json_raw)
     elif provider == "groq":
         log.append(f"Transcribing with Groq (model: {model_language}.{model_size}, language: {language})...")
     
 
 
     # Установите соединение с Groq
-        client = Groq()
+        from groq import Groq
+        client = get_client('groq', settings.get_setting('groq_api_key'), Groq, pooled_http_client=True)
         file_path = audio.get_file_path('wav')  # Укажите нужный формат файла
 
 # # Получаем имя файла из полного пути
@@ -79,17 +128,7 @@ def transcribe_audio(audio_input, model_language, model_size, language):
             
             text = response
             
-            if PROVIDER=="groq":
-                edited_text = groq_process_chunk(text)
-
-            elif PROVIDER=="together":
-                 edited_text = together_process_chunk(text)
-            elif PROVIDER=="ollama":
-                model = settings.get_setting('ollama_model')
-                edited_text = ollama_process_chunk(text, model)
-            elif PROVIDER == "openAI":
-                edited_text = openAI_process_chunk(text)
-                
+            edited_text = Audio.edit_transcript(text, settings, document_id)
             
             
 #             
@@ -104,4 +143,67 @@ def transcribe_audio(audio_input, model_language, model_size, language):
     log.append("Transcription complete.")
     
     return text, edited_text, timestamp_view, timestamp_table, json.dumps(json_output, indent=2), json.dumps(json_raw, indent=2), "\n".join(log)
-    
+
+def transcribe_audio_stream(audio_input, model_language, model_size, language, source=None):
+    # Потоковый вариант transcribe_audio: отдаёт промежуточные результаты по мере
+    # декодирования окон Whisper. Для Groq результат приходит целиком.
+    settings = Settings()
+    if settings.get_setting('transcription_provider') != "ollama":
+        yield transcribe_audio(audio_input, model_language, model_size, language, source=source)
+        return
+
+    log = []
+    preprocessing = _preprocessing_params(settings)
+
+    cache_key = None
+    document_id = None
+    if settings.get_setting('llm_incremental_editing'):
+        document_id = _document_id(audio_input, model_language, model_size, language, settings)
+    if settings.get_setting('transcription_cache_enabled'):
+        cache_key = document_id or _cache_key(audio_input, preprocessing, model_language, model_size, language)
+        cached = transcription_cache.get(cache_key)
+        if cached is not None:
+            yield _cached_result(cached, settings, log, document_id)
+            return
+
+    audio = source.fork() if source is not None else Audio(audio_input)
+    _preprocess(audio, preprocessing, log)
+
+    window_seconds = settings.get_setting('whisper_window_seconds')
+    log.append(f"Streaming transcription (model: {model_language}.{model_size}, language: {language}, window: {window_seconds}s)...")
+    result = {'text': "", 'segments': []}
+    # Представления дополняются сегментами очередного окна, а не строятся заново
+    # по всей записи; JSON сериализуется один раз, после последнего окна
+    view_lines = [Audio.whisper_to_timestamp_view(result)]
+    timestamp_table = []
+    for segments in audio.transcribe_stream(model_language, model_size, language, window_seconds):
+        result['segments'].extend(segments)
+        result['text'] += ''.join(segment['text'] for segment in segments)
+        window = {'segments': segments}
+        if audio.time_map is not None:
+            window = audio.time_map.remap(window)
+        view_lines.extend(Audio.timestamp_view_row(segment) for segment in window['segments'])
+        timestamp_table.extend(Audio.whisper_to_timestamp_table(window))
+        yield result['text'], "", "\n".join(view_lines), list(timestamp_table), None, None, "\n".join(log)
+
+    text = result['text'].strip()
+    timestamp_view, timestamp_table, json_output, json_raw = Audio.format_transcript(result, audio.time_map)
+    if cache_key:
+        transcription_cache.put(cache_key, text, json_raw)
+    json_output, json_raw = json.dumps(json_output, indent=2), json.dumps(json_raw, indent=2)
+    log.append("Editing transcription...")
+    # Отредактированный текст выводится по мере генерации
+    edited_text = ""
+    for edited_text in Audio.edit_transcript_stream(text, settings, document_id):
+        yield text, edited_text, timestamp_view, timestamp_table, json_output, json_raw, "\n".join(log)
+    log.append("Transcription complete.")
+    yield text, edited_text, timestamp_view, timestamp_table, json_output, json_raw, "\n".join(log)
+
+def reedit_transcript_stream(audio_input, model_language, model_size, language, text):
+    # Повторное редактирование исправленной вручную транскрипции той же записи:
+    # в LLM уходят только чанки с изменёнными предложениями
+    settings = Settings()
+    document_id = None
+    if audio_input is not None and settings.get_setting('llm_incremental_editing'):
+        document_id = _document_id(audio_input, model_language, model_size, language, settings)
+    yield from Audio.edit_transcript_stream(text, settings, document_id)
@@ -1,7 +1,7 @@
 # txt2img_processor.py
 from classes.txt2img import Text2ImageProcessor
 
-def generate_images(prompt, negative_prompt, num_inference_steps, guidance_scale, num_images, width, height, image_format):
+def generate_images(prompt, negative_prompt, num_inference_steps, guidance_scale, num_images, width, height, image_format, seed=None):
     processor = Text2ImageProcessor()
     try:
         image_paths = processor.generate_image(
@@ -12,8 +12,26 @@ def generate_images(prompt, negative_prompt, num_inference_steps, guidance_scale
             width=width,
             height=height,
             num_images=num_images,
-            image_format=image_format
+            image_format=image_format,
+            seed=seed
         )
         return image_paths
     finally:
-        processor = None  # Удаление ссылки на процессор для очистки памяти
\ No newline at end of file
+        processor = None  # Удаление ссылки на процессор для очистки памяти
+
+def generate_images_stream(prompt, negative_prompt, num_inference_steps, guidance_scale, num_images, width, height, image_format, seed=None, progress_callback=None):
+    # Отдаёт список готовых изображений после каждого сохранённого;
+    # progress_callback получает прогресс загрузки недостающих моделей
+    processor = Text2ImageProcessor()
+    yield from processor.generate_image_stream(
+        prompt=prompt,
+        negative_prompt=negative_prompt,
+        num_inference_steps=num_inference_steps,
+        guidance_scale=guidance_scale,
+        width=width,
+        height=height,
+        num_images=num_images,
+        image_format=image_format,
+        seed=seed,
+        progress_callback=progress_callback
+    )
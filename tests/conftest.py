@@ -0,0 +1,7 @@
+# tests/conftest.py
+import os
+import sys
+
+# Пакеты проекта (classes, llm, modules) импортируются из корня репозитория,
+# а не из одноимённых пакетов в site-packages
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,49 @@
+# tests/test_audio_enhance.py
+import os
+import shutil
+import subprocess
+import numpy as np
+import pytest
+from classes import audio as audio_module
+from classes.audio import Audio
+
+
+def make_input(seconds=1.0, rate=44100):
+    rng = np.random.default_rng(0)
+    return rate, (rng.standard_normal((int(seconds * rate), 1)) * 3000).astype(np.int16)
+
+
+def fake_cli(monkeypatch):
+    # CLI resemble-enhance подменяется копированием входного файла в выходную папку
+    commands = []
+
+    def run(command, **kwargs):
+        commands.append(command)
+        input_dir, output_dir = [part for part in command[1:] if not part.startswith('-')][:2]
+        for name in os.listdir(input_dir):
+            shutil.copy2(os.path.join(input_dir, name), os.path.join(output_dir, name))
+        return subprocess.CompletedProcess(command, 0, stdout="", stderr="")
+
+    monkeypatch.setattr(audio_module.shutil, 'which', lambda name: "/usr/bin/resemble-enhance")
+    monkeypatch.setattr(audio_module.subprocess, 'run', run)
+    return commands
+
+
+@pytest.mark.parametrize('operation', ['denoise', 'enhance'])
+def test_failed_in_process_run_falls_back_to_cli(monkeypatch, operation):
+    commands = fake_cli(monkeypatch)
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("CUDA out of memory")
+
+    monkeypatch.setattr(audio_module.enhancer, 'process', broken)
+    monkeypatch.setattr(audio_module.enhancer, 'process_windowed', broken)
+    audio = Audio(make_input())
+    log = []
+
+    getattr(audio, f"{operation}_audio")(0.5, 0.5, "midpoint", 64, log.append)
+
+    assert len(commands) == 1
+    assert ("--denoise_only" in commands[0]) == (operation == 'denoise')
+    assert audio.history[-1][0] == operation
+    assert f"{operation.capitalize()} process completed successfully.\n" in log
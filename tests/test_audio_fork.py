@@ -0,0 +1,66 @@
+# tests/test_audio_fork.py
+import numpy as np
+from classes import dsp
+from classes.audio import Audio
+
+
+def make_input(seconds=1.0, rate=44100):
+    rng = np.random.default_rng(0)
+    return rate, (rng.standard_normal((int(seconds * rate), 2)) * 3000).astype(np.int16)
+
+
+def count_resamples(monkeypatch):
+    calls = []
+    resample = dsp.resample
+
+    def counting(samples, rate, new_rate):
+        calls.append((rate, new_rate))
+        return resample(samples, rate, new_rate)
+
+    monkeypatch.setattr(dsp, 'resample', counting)
+    return calls
+
+
+def test_fork_reuses_shared_prefix_of_longer_plan(monkeypatch):
+    calls = count_resamples(monkeypatch)
+    source = Audio(make_input())
+
+    # Обработка: общий с транскрипцией префикс и своя операция в одном плане
+    processing = source.fork()
+    processing.change_sample_rate(22050)
+    processing.stereo_to_mono()
+    processing.apply_filter("volume=2.0")
+    processing.get_audio_data()
+    assert len(calls) == 1
+
+    # Транскрипция начинается с того же префикса и не пересчитывает его
+    transcription = source.fork()
+    transcription.change_sample_rate(22050)
+    transcription.stereo_to_mono()
+    samples, rate = transcription.get_audio_data()
+    assert len(calls) == 1
+    assert rate == 22050
+
+    direct = Audio(make_input())
+    direct.change_sample_rate(22050)
+    direct.stereo_to_mono()
+    np.testing.assert_allclose(samples, direct.get_audio_data()[0])
+
+
+def test_fork_continues_after_common_prefix(monkeypatch):
+    source = Audio(make_input())
+    processing = source.fork()
+    processing.change_sample_rate(22050)
+    processing.stereo_to_mono()
+    processing.get_audio_data()
+
+    calls = count_resamples(monkeypatch)
+    branch = source.fork()
+    branch.change_sample_rate(22050)
+    branch.stereo_to_mono()
+    branch.apply_filter("volume=0.5")
+    samples, rate = branch.get_audio_data()
+
+    assert calls == []
+    assert rate == 22050
+    assert samples.ndim == 1
@@ -0,0 +1,39 @@
+# tests/test_chunker.py
+from classes.chunker import TokenChunker, split_sentences
+
+
+def test_capitalised_abbreviations_do_not_end_sentence():
+    text = "Ул. Ленина перекрыта. Т.е. Иван опоздает. Mr. Smith arrived. DR. Who left."
+    assert split_sentences(text) == [
+        "Ул. Ленина перекрыта.",
+        "Т.е. Иван опоздает.",
+        "Mr. Smith arrived.",
+        "DR. Who left.",
+    ]
+
+
+def test_lowercase_abbreviations_do_not_end_sentence():
+    assert split_sentences("Живём на ул. Пушкина. Встреча в г. Москве!") == [
+        "Живём на ул. Пушкина.",
+        "Встреча в г. Москве!",
+    ]
+
+
+def test_ordinary_words_end_sentence():
+    assert split_sentences('Он сказал «Да.» Потом ушёл. (Ул. была пуста.) Конец.') == [
+        'Он сказал «Да.»',
+        'Потом ушёл.',
+        '(Ул. была пуста.)',
+        'Конец.',
+    ]
+
+
+def test_paragraph_break_is_always_a_boundary():
+    assert split_sentences("Дом на ул.\n\nНовый абзац") == ["Дом на ул.", "Новый абзац"]
+
+
+def test_chunks_do_not_split_on_capitalised_abbreviation():
+    text = "Т.е. Иван опоздает на встречу. " * 3
+    chunker = TokenChunker(budget=12)
+    for chunk in chunker.chunk(text):
+        assert not chunk.text.endswith("Т.е.")
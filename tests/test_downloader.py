@@ -0,0 +1,120 @@
+# tests/test_downloader.py
+import json
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from classes.downloader import DownloadManager
+
+PAYLOAD = bytes(range(256)) * 40
+SEGMENT_SIZE = 1000
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Локальная замена хостинга моделей; ranges=False — сервер без поддержки Range
+    ranges = True
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _headers(self, status, length):
+        self.send_response(status)
+        self.send_header('Content-Length', str(length))
+        if self.ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._headers(200, len(PAYLOAD))
+
+    def do_GET(self):
+        requested = self.headers.get('Range')
+        self.requests.append(requested)
+        if requested and self.ranges:
+            start, end = (int(value) for value in requested[len('bytes='):].split('-'))
+            self._headers(206, end - start + 1)
+            self.wfile.write(PAYLOAD[start:end + 1])
+        else:
+            self._headers(200, len(PAYLOAD))
+            self.wfile.write(PAYLOAD)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(Handler, 'requests', [])
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/model.bin"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_manager(tmp_path):
+    manager = DownloadManager(workers=3, segment_mb=1, manifest_path=str(tmp_path / "manifest.json"))
+    manager.segment_size = SEGMENT_SIZE
+    return manager
+
+
+def test_downloads_in_range_segments(server, tmp_path):
+    destination = tmp_path / "model.bin"
+    sha256 = hashlib.sha256(PAYLOAD).hexdigest()
+
+    make_manager(tmp_path).download(server, str(destination), sha256=sha256)
+
+    assert destination.read_bytes() == PAYLOAD
+    assert (tmp_path / "model.bin.sha256").read_text() == sha256
+    assert not (tmp_path / "model.bin.part").exists()
+    assert len(Handler.requests) == -(-len(PAYLOAD) // SEGMENT_SIZE)
+
+
+def test_resumes_from_part_file(server, tmp_path):
+    destination = tmp_path / "model.bin"
+    part_path = tmp_path / "model.bin.part"
+    # Прерванная загрузка: первые два сегмента уже записаны
+    part_path.write_bytes(PAYLOAD[:2 * SEGMENT_SIZE] + bytes(len(PAYLOAD) - 2 * SEGMENT_SIZE))
+    (tmp_path / "model.bin.part.json").write_text(
+        json.dumps({'size': len(PAYLOAD), 'segment_size': SEGMENT_SIZE, 'done': [0, 1]}))
+
+    make_manager(tmp_path).download(server, str(destination), sha256=hashlib.sha256(PAYLOAD).hexdigest())
+
+    assert destination.read_bytes() == PAYLOAD
+    assert f"bytes=0-{SEGMENT_SIZE - 1}" not in Handler.requests
+    assert f"bytes={SEGMENT_SIZE}-{2 * SEGMENT_SIZE - 1}" not in Handler.requests
+    assert not (tmp_path / "model.bin.part.json").exists()
+
+
+def test_checksum_mismatch_removes_part_file(server, tmp_path):
+    destination = tmp_path / "model.bin"
+
+    with pytest.raises(RuntimeError, match="Checksum mismatch"):
+        make_manager(tmp_path).download(server, str(destination), sha256="0" * 64)
+
+    assert not destination.exists()
+    assert not (tmp_path / "model.bin.part").exists()
+    assert not (tmp_path / "model.bin.part.json").exists()
+
+
+def test_falls_back_to_single_request_without_ranges(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(Handler, 'ranges', False)
+    destination = tmp_path / "model.bin"
+
+    make_manager(tmp_path).download(server, str(destination))
+
+    assert destination.read_bytes() == PAYLOAD
+    assert Handler.requests == [None]
+
+
+def test_truncated_file_is_downloaded_again(server, tmp_path):
+    destination = tmp_path / "model.bin"
+    # Файл, оборванный прежним загрузчиком: без .part и без маркера .sha256
+    destination.write_bytes(PAYLOAD[:100])
+    (tmp_path / "manifest.json").write_text(json.dumps({'model.bin': hashlib.sha256(PAYLOAD).hexdigest()}))
+    manager = make_manager(tmp_path)
+
+    assert not manager.is_complete(str(destination))
+    manager.download(server, str(destination))
+
+    assert destination.read_bytes() == PAYLOAD
+    assert manager.is_complete(str(destination))
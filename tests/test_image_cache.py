@@ -0,0 +1,62 @@
+# tests/test_image_cache.py
+import os
+from classes import txt2img
+from classes.image_cache import ImageCache
+from classes.settings import Settings
+from classes.txt2img import Text2ImageProcessor
+
+
+def make_processor(tmp_path, monkeypatch):
+    # Процессор без загрузки моделей: генерация подменяется записью файла
+    processor = Text2ImageProcessor.__new__(Text2ImageProcessor)
+    processor.settings = Settings()
+    processor.provider = "SD3"
+    processor.models_dir = str(tmp_path / "models")
+    processor.model_path = str(tmp_path / "models" / "model.safetensors")
+    processor.additional_files = {}
+    processor.downloads = []
+    os.makedirs(processor.models_dir)
+    with open(processor.model_path, 'wb') as f:
+        f.write(b"weights")
+
+    seeds = []
+
+    def generate(prompt, negative_prompt, num_inference_steps, guidance_scale, width, height, num_images,
+                 image_format, seed):
+        seeds.append(seed)
+        path = tmp_path / f"image_{len(seeds)}.{image_format}"
+        path.write_bytes(f"{prompt}:{seed}".encode())
+        yield [str(path)]
+
+    monkeypatch.setattr(processor, '_generate', generate)
+    return processor, seeds
+
+
+def use_cache(tmp_path, monkeypatch):
+    cache = ImageCache(cache_dir=str(tmp_path / "cache"), max_entries=10, max_size_mb=0)
+    monkeypatch.setattr(cache, 'enabled', lambda: True)
+    monkeypatch.setattr(txt2img, 'image_cache', cache)
+    return cache
+
+
+def test_fixed_seed_is_served_from_cache(tmp_path, monkeypatch):
+    use_cache(tmp_path, monkeypatch)
+    processor, seeds = make_processor(tmp_path, monkeypatch)
+
+    first = processor.generate_image("a cat", "", 4, 7.0, 512, 512, num_images=1, seed=42)
+    second = processor.generate_image("a cat", "", 4, 7.0, 512, 512, num_images=1, seed=42)
+
+    assert seeds == [42]
+    assert second != first
+    assert open(second[0], 'rb').read() == b"a cat:42"
+
+
+def test_random_seed_bypasses_cache(tmp_path, monkeypatch):
+    use_cache(tmp_path, monkeypatch)
+    processor, seeds = make_processor(tmp_path, monkeypatch)
+
+    processor.generate_image("a cat", "", 4, 7.0, 512, 512, num_images=1, seed=-1)
+    processor.generate_image("a cat", "", 4, 7.0, 512, 512, num_images=1, seed=-1)
+
+    assert len(seeds) == 2
+    assert all(seed >= 0 for seed in seeds)
@@ -0,0 +1,64 @@
+# tests/test_llm_providers.py
+import pytest
+from llm.providers import base, runtime, stub
+from llm.providers.base import ProviderError, ProviderTimeout
+from llm.providers.stub import StubProvider, StubServer
+
+
+@pytest.fixture
+def make_provider():
+    # Провайдер с собственным сервером-заглушкой, чтобы тесты не делили задержку и статус
+    servers = []
+
+    def make(**options):
+        server = StubServer(**options)
+        servers.append(server)
+        return StubProvider(server)
+
+    yield make
+    for server in servers:
+        server.close()
+
+
+def test_complete_returns_whole_answer(make_provider):
+    provider = make_provider()
+
+    answer = runtime.run(provider.complete("hello stub world", temperature=0.3, max_tokens=64))
+
+    assert answer == "<edited_text>hello stub world </edited_text>"
+
+
+def test_stream_yields_tokens_as_they_arrive(make_provider):
+    provider = make_provider()
+
+    parts = list(runtime.iterate(provider.stream("hello stub world")))
+
+    assert parts == ['<edited_text>', 'hello ', 'stub ', 'world ', '</edited_text>']
+
+
+def test_slow_fragment_raises_provider_timeout(make_provider, monkeypatch):
+    provider = make_provider(delay=0.5)
+    monkeypatch.setattr(base, 'get_timeout', lambda: (1, 0.1))
+
+    with pytest.raises(ProviderTimeout):
+        runtime.run(provider.complete("hello"))
+
+
+def test_http_error_raises_provider_error(make_provider):
+    provider = make_provider(status=500)
+
+    with pytest.raises(ProviderError) as error:
+        list(runtime.iterate(provider.stream("hello")))
+
+    assert not isinstance(error.value, ProviderTimeout)
+    assert not runtime.run(provider.health_check())
+
+
+def test_health_check_of_running_server(make_provider):
+    assert runtime.run(make_provider().health_check())
+
+
+def test_sync_wrapper_returns_chunk_on_error(make_provider, monkeypatch):
+    monkeypatch.setattr(stub, 'provider', make_provider(status=503))
+
+    assert stub.process_chunk("hello") == "hello"
@@ -0,0 +1,25 @@
+# tests/test_settings_store.py
+from classes.settings import SettingsStore
+
+
+def test_malformed_file_falls_back_to_defaults(tmp_path):
+    settings_file = tmp_path / "settings.json"
+    settings_file.write_text("{bad")
+
+    store = SettingsStore(str(settings_file), {'a': 1})
+
+    assert store.get('a') == 1
+    assert store.snapshot() == {'a': 1}
+
+    # Дописанный файл подхватывается при следующей проверке
+    settings_file.write_text('{"a": 2}')
+    assert store.reload_if_changed() == {'a': 2}
+    assert store.get('a') == 2
+
+
+def test_snapshot_does_not_expose_shared_values(tmp_path):
+    store = SettingsStore(str(tmp_path / "settings.json"), {'a': 1})
+
+    store.snapshot()['a'] = 2
+
+    assert store.get('a') == 1
@@ -1,8 +1,9 @@
 import gradio as gr
 from modules.audio_processor import process_audio
 from modules.settings_processor import get_all_settings
-from modules.transcription_processor import transcribe_audio
+from modules.transcription_processor import transcribe_audio, transcribe_audio_stream, reedit_transcript_stream
 from classes.settings import Settings
+from classes.audio import Audio
 
 
 def create_combined_interface():
@@ -101,6 +102,7 @@ def create_combined_interface():
                                 edited_transcription_output = gr.Textbox(label="Edited Transcription", lines=10)
                             with gr.TabItem("Raw Transcription", id="transcription_tab"):
                                 transcription_output = gr.Textbox(label="Transcription", lines=10)
+                                reedit_button = gr.Button("Re-edit Transcription")
                             with gr.TabItem("Timestamp View", id="timestamp_view_tab"):
                                 timestamp_view = gr.Textbox(label="Timestamp View", lines=10)
                             with gr.TabItem("Timestamp Table", id="timestamp_table_tab"):
@@ -154,22 +156,32 @@ def create_combined_interface():
             json_output = {}
             json_raw_output = {}
 
+            processing_selected = change_sample_rate or to_mono or apply_filter or audio_processing != "None" or remove_silence
+            # Обработка и транскрипция работают от одного Audio и переиспользуют общие этапы
+            source = Audio(audio_file) if processing_selected and transcription_selected else None
+
     # Обработка аудио
-            if change_sample_rate or to_mono or apply_filter or audio_processing != "None" or remove_silence:
+            if processing_selected:
                 output_audio, processing_log = process_audio(
                     audio_file, change_sample_rate, new_sample_rate, to_mono, apply_filter, filter_choice,
-                    remove_silence, silence_duration, silence_threshold, audio_processing, lambd, tau, solver, nfe, output_format
+                    remove_silence, silence_duration, silence_threshold, audio_processing, lambd, tau, solver, nfe, output_format,
+                    source=source
                 )
                 log.append(processing_log)
     
     # Транскрипция
             if transcription_selected:
-                transcription_output, edited_transcription_output, timestamp_view, timestamp_table, json_output, json_raw_output, transcription_log = transcribe_audio(
-                    audio_file, model_language, model_size, language)
-                log.append(transcription_log)
-            
+                # В потоковом режиме сегменты появляются в таблице и JSON по мере декодирования
+                if Settings().get_setting('whisper_streaming'):
+                    transcription_results = transcribe_audio_stream(audio_file, model_language, model_size, language, source=source)
+                else:
+                    transcription_results = [transcribe_audio(audio_file, model_language, model_size, language, source=source)]
+                for (transcription_output, edited_transcription_output, timestamp_view, timestamp_table,
+                     json_output, json_raw_output, transcription_log) in transcription_results:
+                    yield output_audio, "\n".join(log + [transcription_log]), transcription_output, edited_transcription_output, timestamp_view, timestamp_table, json_output, json_raw_output
+                return
     
-            return output_audio, "\n".join(log), transcription_output, edited_transcription_output, timestamp_view, timestamp_table, json_output, json_raw_output
+            yield output_audio, "\n".join(log), transcription_output, edited_transcription_output, timestamp_view, timestamp_table, json_output, json_raw_output
         
 # Вызов функции при нажатии кнопки
         
@@ -184,6 +196,13 @@ def create_combined_interface():
             outputs=[output_audio, output_text, transcription_output, edited_transcription_output, 
                 timestamp_view, timestamp_table, json_output, json_raw_output]
     )
+        # Исправленная вручную транскрипция редактируется заново; для той же
+        # записи в LLM отправляются только изменённые чанки
+        reedit_button.click(
+            fn=reedit_transcript_stream,
+            inputs=[file_input, model_language, model_size, language, transcription_output],
+            outputs=edited_transcription_output
+        )
 
         
 
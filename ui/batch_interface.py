@@ -0,0 +1,57 @@
+# ui/batch_interface.py
+import gradio as gr
+from modules.batch_processor import submit_batch, list_jobs, cancel_job
+
+JOB_HEADERS = ["Job ID", "File", "Status", "Stage", "Progress", "Updated", "Result"]
+
+
+def create_batch_interface():
+    with gr.Blocks() as batch_interface:
+        gr.Markdown("# Batch Processing")
+        with gr.Row():
+            with gr.Column():
+                files = gr.File(label="Upload Audio Files", file_count="multiple", type="filepath")
+                folder = gr.Textbox(label="Or Folder Path", placeholder="/path/to/recordings")
+
+                change_sample_rate = gr.Checkbox(label="Change Sample Rate", value=False)
+                new_sample_rate = gr.Dropdown(label="New Sample Rate", choices=[8000, 11025, 22050, 44100, 48000, 96000])
+                to_mono = gr.Checkbox(label="Convert to Mono", value=False)
+                remove_silence = gr.Checkbox(label="Remove Silence", value=False)
+                audio_processing = gr.Radio(["None", "Denoise", "Enhance"], label="Audio Processing", value="None")
+                output_format = gr.Dropdown(label="Output Format", choices=['wav', 'mp3', 'ogg', 'flac', 'aac', 'm4a'], value='wav')
+                transcribe = gr.Checkbox(label="Transcribe Audio", value=True)
+
+                submit_button = gr.Button("Submit Jobs")
+                submit_result = gr.Textbox(label="Submission Result")
+
+            with gr.Column():
+                jobs_table = gr.Dataframe(label="Jobs", headers=JOB_HEADERS, interactive=False)
+                refresh_button = gr.Button("Refresh")
+                with gr.Row():
+                    job_id = gr.Textbox(label="Job ID")
+                    cancel_button = gr.Button("Cancel Job")
+                cancel_result = gr.Textbox(label="Cancel Result")
+
+        def submit(*args):
+            try:
+                job_ids = submit_batch(*args)
+            except ValueError as e:
+                return str(e), list_jobs()
+            return f"Submitted {len(job_ids)} jobs.", list_jobs()
+
+        submit_button.click(
+            fn=submit,
+            inputs=[files, folder, change_sample_rate, new_sample_rate, to_mono, remove_silence, audio_processing,
+                    output_format, transcribe],
+            outputs=[submit_result, jobs_table]
+        )
+        refresh_button.click(fn=list_jobs, outputs=jobs_table)
+        cancel_button.click(fn=cancel_job, inputs=job_id, outputs=cancel_result).then(fn=list_jobs, outputs=jobs_table)
+
+        def update():
+            return list_jobs()
+
+        batch_interface.update = update
+        batch_interface.load(list_jobs, outputs=jobs_table)
+
+    return batch_interface
@@ -1,6 +1,6 @@
 # ui/settings_interface.py
 import gradio as gr
-from modules.settings_processor import get_all_settings, update_settings, reset_settings
+from modules.settings_processor import get_all_settings, update_settings, reset_settings, clear_transcription_cache, clear_llm_cache, clear_image_cache
 from modules.text2voice_processor import get_available_languages
 from classes.settings import Settings
 
@@ -231,6 +231,9 @@ def create_settings_interface():
         with gr.Row():
             save_button = gr.Button("Save Changes")
             reset_button = gr.Button("Reset to Default")
+            clear_cache_button = gr.Button("Clear Transcription Cache")
+            clear_llm_cache_button = gr.Button("Clear LLM Cache")
+            clear_image_cache_button = gr.Button("Clear Image Cache")
         
         result = gr.Textbox(label="Result")
 
@@ -336,6 +339,19 @@ def create_settings_interface():
                      num_inference_steps_sd3, num_inference_steps_flux1_dev, num_inference_steps_flux1_schnell, guidance_scale_sd3, guidance_scale_flux1_dev, guidance_scale_flux1_schnell, num_images, width, height, image_format, provider, ollama_model, ollama_url, togetherai_model, together_api_key, groq_model, groq_api_key, openAI_model, openAI_api_key, transcription_provider, resemble_enhance_path, txt2img_provider, result]
         )
 
+        clear_cache_button.click(
+            clear_transcription_cache,
+            outputs=result
+        )
+        clear_llm_cache_button.click(
+            clear_llm_cache,
+            outputs=result
+        )
+        clear_image_cache_button.click(
+            clear_image_cache,
+            outputs=result
+        )
+
         # Load current settings on interface initialization
         settings_interface.load(
             load_current_settings,
@@ -19,6 +19,12 @@ def create_text2voice_interface():
                 generate_button = gr.Button("Generate Audio")
                 audio_output = gr.Audio(label="Generated Audio", type="filepath")
 
+        language.change(
+            fn=lambda lang: gr.update(choices=processor.get_available_speakers(lang), value=processor.get_available_speakers(lang)[0]),
+            inputs=[language],
+            outputs=[speaker]
+        )
+
         generate_button.click(
             fn=processor.process_text_to_voice,
             inputs=[input_text, model, language, speaker],
@@ -1,6 +1,6 @@
 # txt2img_interface.py
 import gradio as gr
-from modules.txt2img_processor import generate_images
+from modules.txt2img_processor import generate_images_stream
 from modules.settings_processor import get_all_settings
 from classes.settings import Settings
 
@@ -17,7 +17,8 @@ def create_text2image_interface():
                 gr.update(value=current_settings.get('num_images')),
                 gr.update(value=current_settings.get('width')),
                 gr.update(value=current_settings.get('height')),
-                gr.update(value=current_settings.get('image_format'))
+                gr.update(value=current_settings.get('image_format')),
+                gr.update(value=current_settings.get('seed', -1))
             )
         elif provider == "Flux.1-DEV":
             return (
@@ -26,7 +27,8 @@ def create_text2image_interface():
                 gr.update(value=current_settings.get('num_images')),
                 gr.update(value=current_settings.get('width')),
                 gr.update(value=current_settings.get('height')),
-                gr.update(value=current_settings.get('image_format'))
+                gr.update(value=current_settings.get('image_format')),
+                gr.update(value=current_settings.get('seed', -1))
             )
         elif provider == "Flux.1-SCHNELL":
             return (
@@ -35,7 +37,8 @@ def create_text2image_interface():
                 gr.update(value=current_settings.get('num_images')),
                 gr.update(value=current_settings.get('width')),
                 gr.update(value=current_settings.get('height')),
-                gr.update(value=current_settings.get('image_format'))
+                gr.update(value=current_settings.get('image_format')),
+                gr.update(value=current_settings.get('seed', -1))
             )
         else:
             # Значения по умолчанию, если провайдер не распознан
@@ -45,7 +48,8 @@ def create_text2image_interface():
                 gr.update(value=1),
                 gr.update(value=512),
                 gr.update(value=512),
-                gr.update(value="png")
+                gr.update(value="png"),
+                gr.update(value=-1)
             )
 
     with gr.Blocks() as text2image_tab:
@@ -67,6 +71,8 @@ def create_text2image_interface():
                     height = gr.Slider(minimum=256, maximum=2048, step=64, value=512, label="Высота изображения")
 
                 image_format = gr.Radio(["png", "jpg"], label="Формат изображения", value="png")
+                # С фиксированным seed повторный запрос берётся из кэша изображений
+                seed = gr.Number(value=-1, precision=0, label="Seed (-1 — случайный)")
                 generate_btn = gr.Button("Сгенерировать изображения")
 
             with gr.Column():
@@ -81,8 +87,16 @@ def create_text2image_interface():
                 )
 
         def display_images(prompt, negative_prompt, num_inference_steps, guidance_scale, num_images, width, height,
-                           image_format):
-            image_paths = generate_images(
+                           image_format, seed, progress=gr.Progress()):
+            # Пока скачиваются модели, над галереей показывается прогресс загрузки
+            def show_download(file_name, done, total):
+                if total:
+                    progress(done / total, desc=f"Скачивание {file_name}: {done // 2 ** 20} из {total // 2 ** 20} МБ")
+                else:
+                    progress(None, desc=f"Скачивание {file_name}: {done // 2 ** 20} МБ")
+
+            # Галерея обновляется по мере сохранения каждого изображения
+            for image_paths in generate_images_stream(
                 prompt=prompt,
                 negative_prompt=negative_prompt,
                 num_inference_steps=num_inference_steps,
@@ -90,15 +104,17 @@ def create_text2image_interface():
                 num_images=num_images,
                 width=width,
                 height=height,
-                image_format=image_format
-            )
-            # Возвращаем список кортежей (путь_к_изображению, подпись)
-            return [(path, f"Image {i + 1}") for i, path in enumerate(image_paths)]
+                image_format=image_format,
+                seed=seed,
+                progress_callback=show_download
+            ):
+                # Возвращаем список кортежей (путь_к_изображению, подпись)
+                yield [(path, f"Image {i + 1}") for i, path in enumerate(image_paths)]
 
         generate_btn.click(
             display_images,
             inputs=[prompt, negative_prompt, num_inference_steps, guidance_scale, num_images, width, height,
-                    image_format],
+                    image_format, seed],
             outputs=gallery
         )
 
@@ -108,5 +124,5 @@ def create_text2image_interface():
         text2image_tab.update = update
 
     text2image_tab.load(fn=load_current_settings,
-                        outputs=[num_inference_steps, guidance_scale, num_images, width, height, image_format])
+                        outputs=[num_inference_steps, guidance_scale, num_images, width, height, image_format, seed])
     return text2image_tab